@@ -0,0 +1,478 @@
+"""Benchmark de ponta a ponta de /api/analyze contra servidores locais que imitam os provedores
+
+Sobe servidores HTTP locais no lugar de Serper, Google CSE, Jina, OpenAI e Gemini
+(com latência configurável), aponta o backend para eles via <PROVEDOR>_BASE_URL e mede:
+
+- latência p50/p95/p99 e vazão em níveis crescentes de concorrência;
+- tempo por etapa (busca, montagem do prompt, IA, parsing do JSON);
+- memória alocada por requisição (pico do tracemalloc, em execução sequencial).
+
+Uso (a partir de arqmariav3_enhanced):
+    python benchmarks/bench_pipeline.py --concurrency 1,4,16 --requests 40 --output resultado.json
+    python benchmarks/bench_pipeline.py --compare resultado_anterior.json
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import platform
+import threading
+import tracemalloc
+import contextlib
+import subprocess
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Latência padrão de cada provedor simulado (ms)
+DEFAULT_LATENCY_MS = {
+    'serper': 80,
+    'google': 120,
+    'jina': 150,
+    'openai': 800,
+    'gemini': 900,
+}
+
+SECTIONS = [
+    'avatar_ultra_detalhado', 'escopo_posicionamento', 'analise_concorrencia_profunda',
+    'estrategia_palavras_chave', 'metricas_performance_detalhadas', 'plano_acao_detalhado',
+    'insights_exclusivos_ultra', 'inteligencia_mercado', 'drivers_mentais', 'provas_visuais_instantaneas',
+]
+
+LOREM = ('O mercado brasileiro de educação online segue em expansão, com consumidores que valorizam '
+         'flexibilidade, certificação e resultados práticos para a carreira. ')
+
+
+# ---------------------------------------------------------------------------
+# Servidores simulados
+# ---------------------------------------------------------------------------
+
+def _analysis_text() -> str:
+    return json.dumps({
+        section: {'resumo': LOREM * 4, 'itens': [LOREM for _ in range(5)]} for section in SECTIONS
+    }, ensure_ascii=False, indent=2)
+
+
+def _search_items(query: str, count: int) -> List[Dict[str, str]]:
+    slug = abs(hash(query)) % 10 ** 8
+    return [{
+        'title': f'{query} - referência {i + 1}',
+        'link': f'http://paginas.local/{slug}/{i + 1}',
+        'snippet': LOREM[:160],
+    } for i in range(count)]
+
+
+def make_handler(provider: str, latency_ms: float, jitter: float):
+    analysis = _analysis_text()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _delay(self):
+            spread = latency_ms * jitter
+            time.sleep(max(0.0, latency_ms + random.uniform(-spread, spread)) / 1000)
+
+        def _send(self, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> Dict[str, Any]:
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def do_GET(self):
+            self._delay()
+            if provider == 'google':
+                params = parse_qs(urlparse(self.path).query)
+                query = params.get('q', [''])[0]
+                self._send({'items': _search_items(query, int(params.get('num', ['10'])[0]))})
+            elif provider == 'jina':
+                self._send({'data': {'content': LOREM * 30}}, headers={'ETag': '"bench"'})
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            body = self._body()
+            self._delay()
+            if provider == 'serper':
+                self._send({'organic': _search_items(body.get('q', ''), int(body.get('num', 10)))})
+            elif provider == 'openai':
+                self._send({
+                    'id': 'chatcmpl-bench',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'bench'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': analysis},
+                        'finish_reason': 'stop',
+                    }],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                })
+            elif provider == 'gemini':
+                self._send({'candidates': [{'content': {'parts': [{'text': analysis}]}}]})
+            else:
+                self.send_error(404)
+
+    return Handler
+
+
+def start_fake_providers(latencies: Dict[str, float], jitter: float) -> Dict[str, ThreadingHTTPServer]:
+    servers = {}
+    for provider, latency in latencies.items():
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(provider, latency, jitter))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True, name=f'fake-{provider}').start()
+        servers[provider] = server
+    return servers
+
+
+def configure_environment(servers: Dict[str, ThreadingHTTPServer], args) -> None:
+    """Aponta os provedores reais para os servidores locais (antes de importar o app)"""
+    for provider, server in servers.items():
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+        os.environ[f'{provider.upper()}_BASE_URL'] = base + ('/v1' if provider == 'openai' else '')
+
+    os.environ.update({
+        'SERPER_API_KEY': 'bench', 'GOOGLE_SEARCH_KEY': 'bench', 'GOOGLE_CSE_ID': 'bench',
+        'JINA_API_KEY': 'bench', 'OPENAI_API_KEY': 'bench', 'GEMINI_API_KEY': 'bench',
+        'DATABASE_URL': os.environ.get('BENCH_DATABASE_URL', f'sqlite:///{args.database}'),
+        'HTTP_POOL_SIZE': str(max(10, max(args.concurrency_levels) * 2)),
+        # Os provedores simulados não limitam: o limitador já começa acima da carga
+        'LIMITER_INITIAL': os.environ.get('LIMITER_INITIAL', str(max(10, max(args.concurrency_levels) * 2))),
+        'LIMITER_MAX': os.environ.get('LIMITER_MAX', str(max(64, max(args.concurrency_levels) * 2))),
+        # Todas as requisições vêm do mesmo cliente: o limite por cliente recusaria a carga
+        'ADMISSION_ENABLED': os.environ.get('ADMISSION_ENABLED', 'false'),
+    })
+    os.environ.pop('HUGGINGFACE_API_KEY', None)
+    if not args.with_cache:
+        for name in ('SEARCH_CACHE_ENABLED', 'CONTENT_CACHE_ENABLED', 'ANALYSIS_CACHE_ENABLED'):
+            os.environ[name] = 'false'
+    if args.backend == 'stub':
+        os.environ['PROVIDER_BACKEND'] = 'stub'
+
+
+# ---------------------------------------------------------------------------
+# Instrumentação por etapa
+# ---------------------------------------------------------------------------
+
+class StageTimer:
+    """Envolve funções do pipeline e acumula a duração de cada etapa"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, owner: Any, attribute: str, stage: str) -> None:
+        original = getattr(owner, attribute)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                with self._lock:
+                    self.samples.setdefault(stage, []).append(elapsed)
+
+        setattr(owner, attribute, timed)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples = {}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: describe(values) for stage, values in sorted(self.samples.items())}
+
+
+def instrument(timer: StageTimer) -> None:
+    from src.services import analysis_pipeline
+    from src.services.ai_service import AIService
+    from src.services.search_service import SearchService
+
+    timer.wrap(SearchService, 'search_for_market_analysis', 'busca')
+    timer.wrap(AIService, '_build_analysis_prompt', 'prompt')
+    timer.wrap(AIService, '_dispatch_analysis', 'ia')
+    timer.wrap(analysis_pipeline, 'extract_json', 'parse_json')
+    timer.wrap(analysis_pipeline.analysis_store, 'save', 'persistencia')
+
+
+# ---------------------------------------------------------------------------
+# Execução
+# ---------------------------------------------------------------------------
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def describe(values: List[float]) -> Dict[str, float]:
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 2) if values else 0.0,
+        'p50': round(percentile(values, 0.50), 2),
+        'p95': round(percentile(values, 0.95), 2),
+        'p99': round(percentile(values, 0.99), 2),
+        'max': round(max(values), 2) if values else 0.0,
+    }
+
+
+def brief(index: int) -> Dict[str, Any]:
+    return {
+        'segmento': 'Educação Online',
+        'produto': f'Curso de carreira {index}',
+        'publico': 'Profissionais 28-45 anos',
+        'preco': '197.00',
+        'concorrentes': 'Coursera, Udemy, Alura',
+        'ignorar_cache': False,
+    }
+
+
+def run_level(base_url: str, concurrency: int, total: int, offset: int) -> Dict[str, Any]:
+    import requests
+
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        nonlocal errors
+        session = requests.Session()
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            start = time.perf_counter()
+            try:
+                response = session.post(f'{base_url}/api/analyze', json=brief(offset + index), timeout=300)
+                ok = response.status_code == 200 and response.json().get('success')
+            except Exception:
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else 0.0,
+        'latency_ms': describe(latencies),
+    }
+
+
+def measure_memory(client_call: Callable[[int], None], samples: int) -> Dict[str, float]:
+    """Pico de memória alocada por requisição, medido uma requisição por vez"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for index in range(samples):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            client_call(index)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - baseline) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    result = {'peak_kb_' + key: value for key, value in describe(peaks).items() if key in ('mean', 'p95', 'max')}
+    try:
+        import resource
+        result['rss_max_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:  # Windows
+        pass
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> int:
+    """Imprime a variação de cada métrica e retorna o número de regressões acima do limite"""
+    regressions = 0
+
+    def line(label: str, before: float, after: float, higher_is_better: bool = False):
+        nonlocal regressions
+        if not before:
+            print(f"  {label:<34} {before:>10.2f} -> {after:>10.2f}")
+            return
+        delta = (after - before) / before * 100
+        worse = delta < -threshold if higher_is_better else delta > threshold
+        regressions += int(worse)
+        print(f"  {label:<34} {before:>10.2f} -> {after:>10.2f}  {delta:+7.1f}%{'  REGRESSÃO' if worse else ''}")
+
+    print(f"\nComparação com {baseline['meta'].get('revision') or 'baseline'} (limite {threshold:.0f}%):")
+    previous_levels = {level['concurrency']: level for level in baseline.get('levels', [])}
+    for level in current['levels']:
+        before = previous_levels.get(level['concurrency'])
+        if not before:
+            continue
+        c = level['concurrency']
+        line(f'c={c} vazão (req/s)', before['throughput_rps'], level['throughput_rps'], higher_is_better=True)
+        for q in ('p50', 'p95', 'p99'):
+            line(f'c={c} latência {q} (ms)', before['latency_ms'][q], level['latency_ms'][q])
+
+    for stage, stats in current.get('stages_ms', {}).items():
+        before = baseline.get('stages_ms', {}).get(stage)
+        if before:
+            line(f'etapa {stage} p50 (ms)', before['p50'], stats['p50'])
+
+    if baseline.get('memory') and current.get('memory'):
+        line('memória pico médio (KB)', baseline['memory']['peak_kb_mean'], current['memory']['peak_kb_mean'])
+
+    return regressions
+
+
+def parse_latencies(values: List[str]) -> Dict[str, float]:
+    latencies = dict(DEFAULT_LATENCY_MS)
+    for value in values:
+        provider, _, ms = value.partition('=')
+        if provider not in latencies:
+            raise SystemExit(f'Provedor desconhecido: {provider}')
+        latencies[provider] = float(ms)
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark de ponta a ponta de /api/analyze')
+    parser.add_argument('--concurrency', default='1,4,16', help='níveis de concorrência (ex.: 1,4,16)')
+    parser.add_argument('--requests', type=int, default=32, help='requisições por nível')
+    parser.add_argument('--latency', nargs='*', default=[], metavar='PROVEDOR=MS',
+                        help='latência dos provedores simulados (ex.: openai=1500 serper=50)')
+    parser.add_argument('--jitter', type=float, default=0.2, help='variação relativa da latência (0.2 = ±20%%)')
+    parser.add_argument('--memory-samples', type=int, default=5, help='requisições sequenciais medidas com tracemalloc')
+    parser.add_argument('--backend', choices=['http', 'stub'], default='http',
+                        help='http: servidores locais simulados; stub: PROVIDER_BACKEND=stub em processo')
+    parser.add_argument('--with-cache', action='store_true', help='mantém os caches habilitados')
+    parser.add_argument('--database', default=os.path.join(tempfile.gettempdir(), 'arqv30_bench.db'))
+    parser.add_argument('--output', help='grava os resultados em JSON')
+    parser.add_argument('--compare', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--threshold', type=float, default=10.0, help='variação (%%) considerada regressão')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--verbose', action='store_true', help='mostra os logs do backend')
+    args = parser.parse_args()
+    args.concurrency_levels = [int(value) for value in args.concurrency.split(',') if value.strip()]
+
+    latencies = parse_latencies(args.latency)
+    if os.path.exists(args.database):
+        os.remove(args.database)
+
+    servers = start_fake_providers(latencies, args.jitter) if args.backend == 'http' else {}
+    configure_environment(servers, args)
+
+    logs = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    if not args.verbose:
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    with logs:
+        from werkzeug.serving import make_server
+        from src.main import app
+
+        timer = StageTimer()
+        instrument(timer)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True, name='bench-app').start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+        # Aquecimento: conexões, imports tardios e criação de tabelas
+        run_level(base_url, 1, 2, offset=10 ** 6)
+        timer.reset()
+
+        levels = []
+        offset = 0
+        for concurrency in args.concurrency_levels:
+            levels.append(run_level(base_url, concurrency, args.requests, offset))
+            offset += args.requests
+
+        stages = timer.summary()
+
+        def one_request(index: int):
+            with app.test_client() as client:
+                client.post('/api/analyze', json=brief(2 * 10 ** 6 + index))
+
+        memory = measure_memory(one_request, args.memory_samples) if args.memory_samples else {}
+        server.shutdown()
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'backend': args.backend,
+            'latency_ms': latencies if args.backend == 'http' else None,
+            'jitter': args.jitter,
+            'requests_per_level': args.requests,
+            'cache': args.with_cache,
+        },
+        'levels': levels,
+        'stages_ms': stages,
+        'memory': memory,
+    }
+
+    print(f"{'conc.':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erros':>6}")
+    for level in levels:
+        latency = level['latency_ms']
+        print(f"{level['concurrency']:>5} {level['throughput_rps']:>8.2f} {latency['p50']:>9.1f} "
+              f"{latency['p95']:>9.1f} {latency['p99']:>9.1f} {level['errors']:>6}")
+    print('\nEtapas (ms):')
+    for stage, stats in stages.items():
+        print(f"  {stage:<14} p50 {stats['p50']:>9.1f}  p95 {stats['p95']:>9.1f}  p99 {stats['p99']:>9.1f}  n={stats['count']}")
+    if memory:
+        print(f"\nMemória por requisição: pico médio {memory['peak_kb_mean']:.0f} KB, máximo {memory['peak_kb_max']:.0f} KB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados gravados em {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -29,19 +29,22 @@ if %errorlevel% neq 0 (
 )
 
 echo.
-echo [4/4] Iniciando servidor Flask...
+echo [4/4] Iniciando servidor de producao...
 echo.
 echo 🚀 Backend rodando em: http://localhost:5000
 echo 📊 API de analise: http://localhost:5000/api/analyze
 echo 🔧 Health check: http://localhost:5000/api/health
 echo 🧪 Test APIs: http://localhost:5000/api/test-apis
 echo.
+echo ⚙️  Configuracao (.env): WEB_CONCURRENCY, SERVER_MODE, WORKER_TIMEOUT, GRACEFUL_TIMEOUT
+echo    Para o servidor de desenvolvimento do Flask, use: python src\main.py
+echo.
 echo ⚠️  IMPORTANTE: Mantenha esta janela aberta!
 echo Pressione Ctrl+C para parar o servidor
 echo ========================================
 echo.
 
-python src\main.py
+python src\serve.py
 
 echo.
 echo Servidor parado.
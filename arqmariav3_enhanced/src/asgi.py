@@ -0,0 +1,270 @@
+import os
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from src.main import app as flask_app
+from src.routes.analysis import sse_event
+from src.services import async_http
+from src.services.admission import admission, AdmissionRejected
+from src.services.analysis_pipeline import validate_analysis_input
+from src.services.async_pipeline import run_market_analysis_async
+from src.services.logging_setup import get_logger
+
+logger = get_logger('asgi')
+
+# Threads das rotas síncronas (Flask), separadas das usadas pelas etapas bloqueantes das análises assíncronas
+_wsgi_executor = ThreadPoolExecutor(max_workers=int(os.getenv('ASGI_WSGI_THREADS', 32)),
+                                    thread_name_prefix='asgi-wsgi')
+
+
+class _ThreadedWsgiInstance(WsgiToAsgiInstance):
+    """Executa cada requisição Flask em uma thread do pool
+
+    O padrão do asgiref (thread_sensitive) serializaria todas as rotas síncronas em uma única thread.
+    """
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False,
+                                 executor=_wsgi_executor)
+
+
+class _ThreadedWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await _ThreadedWsgiInstance(self.wsgi_application)(scope, receive, send)
+
+
+class AsyncAnalysisApp:
+    """Aplicação ASGI: análises em um event loop, demais rotas delegadas ao Flask
+
+    POST /api/analyze e /api/analyze/stream usam o pipeline assíncrono, em que uma
+    análise aguardando a rede não ocupa uma thread. As respostas têm o mesmo
+    formato das rotas Flask equivalentes.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.wsgi = _ThreadedWsgiToAsgi(wsgi_app)
+        self.cors_origins = os.getenv('CORS_ORIGINS', '*').split(',')
+        self.routes = {
+            ('POST', '/api/analyze'): self.analyze_market,
+            ('POST', '/api/analyze/stream'): self.analyze_market_stream,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+
+        if scope['type'] == 'http':
+            handler = self.routes.get((scope['method'], scope['path']))
+            if handler is not None:
+                await handler(scope, receive, send)
+                return
+
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # asyncio.to_thread usa o executor padrão: cache, banco e parsing das análises
+                workers = int(os.getenv('ASYNC_BLOCKING_WORKERS', 32))
+                asyncio.get_running_loop().set_default_executor(
+                    ThreadPoolExecutor(max_workers=workers, thread_name_prefix='asgi-blocking'))
+                logger.info(f"🚀 ARQV30 Enhanced Backend (ASGI) iniciando com {workers} threads auxiliares")
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_http.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def analyze_market(self, scope, receive, send):
+        data = await self._read_json(receive)
+
+        # Validar dados obrigatórios
+        validation_error = validate_analysis_input(data)
+        if validation_error:
+            await self._send_json(scope, send, {'error': validation_error}, 400)
+            return
+
+        try:
+            ticket = await admission.aacquire(self._client_id(scope))
+        except AdmissionRejected as e:
+            await self._too_many_requests(scope, send, e)
+            return
+
+        logger.info("🚀 Iniciando análise de mercado (async)...")
+        logger.debug(f"📊 Campos recebidos: {', '.join(sorted(data))}")
+
+        try:
+            analysis_json = await run_market_analysis_async(self.wsgi_app, data,
+                                                            include_timings=self._include_timings(scope))
+        except Exception as e:
+            logger.error(f"❌ Erro na análise: {str(e)}")
+            await self._send_json(scope, send, {'success': False, 'error': str(e)}, 500)
+            return
+        finally:
+            ticket.release()
+
+        if analysis_json is None:
+            await self._send_json(scope, send, {'error': 'Falha ao gerar análise com IA'}, 500)
+            return
+
+        logger.info("✅ Análise concluída com sucesso!")
+        await self._send_json(scope, send, {'success': True, 'analysis': analysis_json})
+
+    async def analyze_market_stream(self, scope, receive, send):
+        """Mesmos eventos SSE de /api/analyze/stream; a análise é cancelada se o cliente desconectar"""
+        data = await self._read_json(receive)
+
+        validation_error = validate_analysis_input(data)
+        if validation_error:
+            await self._send_json(scope, send, {'error': validation_error}, 400)
+            return
+
+        try:
+            ticket = await admission.aacquire(self._client_id(scope))
+        except AdmissionRejected as e:
+            await self._too_many_requests(scope, send, e)
+            return
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        heartbeat = float(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+        include_timings = self._include_timings(scope)
+
+        def emit(event, payload):
+            # Também chamado de threads (modo por seções, caches)
+            loop.call_soon_threadsafe(events.put_nowait, (event, payload))
+
+        async def pipeline():
+            try:
+                analysis_json = await run_market_analysis_async(self.wsgi_app, data, emit=emit,
+                                                                include_timings=include_timings)
+                if analysis_json is None:
+                    emit('error', {'error': 'Falha ao gerar análise com IA'})
+                else:
+                    emit('result', {'success': True, 'analysis': analysis_json})
+            except asyncio.CancelledError:
+                logger.info("⏹️ Análise em streaming cancelada pelo cliente")
+            except Exception as e:
+                logger.error(f"❌ Erro na análise em streaming: {str(e)}")
+                emit('error', {'success': False, 'error': str(e)})
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, None)
+
+        logger.info("🚀 Iniciando análise de mercado em streaming (async)...")
+
+        try:
+            await self._stream_events(scope, receive, send, pipeline, events, heartbeat)
+        finally:
+            ticket.release()
+
+    async def _stream_events(self, scope, receive, send, pipeline, events: asyncio.Queue, heartbeat: float):
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': self._headers(scope, 'text/event-stream; charset=utf-8', [
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ]),
+        })
+        await self._send_chunk(send, sse_event('start', {'timestamp': datetime.now().isoformat()}))
+
+        task = asyncio.create_task(pipeline())
+        watcher = asyncio.create_task(self._cancel_on_disconnect(receive, task))
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(events.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    # Comentário SSE para manter a conexão viva durante etapas longas
+                    await self._send_chunk(send, ": keep-alive\n\n")
+                    continue
+
+                if item is None:
+                    break
+                await self._send_chunk(send, sse_event(*item))
+        finally:
+            watcher.cancel()
+            task.cancel()
+
+        await send({'type': 'http.response.body', 'body': b''})
+
+    @staticmethod
+    def _client_id(scope) -> str:
+        headers = dict(scope.get('headers', []))
+        client = scope.get('client') or (None,)
+        return admission.client_id(headers.get(b'x-api-key', b'').decode('latin1'),
+                                   headers.get(b'x-forwarded-for', b'').decode('latin1'), client[0])
+
+    async def _too_many_requests(self, scope, send, error: AdmissionRejected):
+        await self._send_json(scope, send, {'success': False, 'error': str(error), 'reason': error.reason,
+                                            'retry_after': error.retry_after},
+                              429, [(b'retry-after', str(error.retry_after).encode())])
+
+    @staticmethod
+    async def _cancel_on_disconnect(receive, task: asyncio.Task):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                task.cancel()
+                return
+
+    @staticmethod
+    async def _read_json(receive) -> Optional[Any]:
+        """Corpo da requisição como JSON; None se ausente ou inválido (a validação responde 400)"""
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] != 'http.request':
+                return None
+            body.extend(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+
+        try:
+            return json.loads(body) if body else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _include_timings(scope) -> Optional[bool]:
+        """?incluir_tempos=true adiciona o tempo de cada etapa aos metadados da análise"""
+        query = parse_qs(scope.get('query_string', b'').decode('latin1'))
+        return query.get('incluir_tempos', ['false'])[0].lower() == 'true' or None
+
+    def _headers(self, scope, content_type: str,
+                 extra: Optional[List[Tuple[bytes, bytes]]] = None) -> List[Tuple[bytes, bytes]]:
+        headers = [(b'content-type', content_type.encode())] + (extra or [])
+
+        # Mesma política do Flask-CORS configurado em main.py
+        origin = dict(scope.get('headers', [])).get(b'origin', b'').decode('latin1')
+        if '*' in self.cors_origins:
+            headers.append((b'access-control-allow-origin', b'*'))
+        elif origin in self.cors_origins:
+            headers.append((b'access-control-allow-origin', origin.encode('latin1')))
+            headers.append((b'vary', b'Origin'))
+        return headers
+
+    async def _send_json(self, scope, send, payload: Dict[str, Any], status: int = 200,
+                         extra: Optional[List[Tuple[bytes, bytes]]] = None):
+        body = (self.wsgi_app.json.dumps(payload) + '\n').encode('utf-8')
+        headers = [(b'content-length', str(len(body)).encode())] + (extra or [])
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': self._headers(scope, 'application/json', headers),
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    async def _send_chunk(send, text: str):
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+
+# uvicorn src.asgi:app --host 0.0.0.0 --port 5000
+app = AsyncAnalysisApp(flask_app)
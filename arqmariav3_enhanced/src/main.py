@@ -8,11 +8,20 @@ load_dotenv()
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, Response, request
 from flask_cors import CORS
 from src.models.user import db
+from src.models.search_cache import SearchCacheEntry
+from src.models.content_cache import ExtractedContent
+from src.models.analysis import Analysis
 from src.routes.user import user_bp
 from src.routes.analysis import analysis_bp
+from src.services.logging_setup import get_logger
+from src.services.metrics import metrics_registry, CONTENT_TYPE
+from src.services.static_assets import StaticAssetIndex
+from src.services.database import init_database
+
+logger = get_logger('main')
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
@@ -26,19 +35,16 @@ CORS(app, origins=os.getenv('CORS_ORIGINS', '*').split(','))
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(analysis_bp, url_prefix='/api')
 
-# Configuração do banco de dados
-database_url = os.getenv('DATABASE_URL')
-if database_url:
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-
+# Configuração do banco de dados (pool, PRAGMAs do SQLite, timeouts do Postgres)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+init_database(app)
 
 with app.app_context():
     db.create_all()
 
+# Pasta estática indexada uma vez: sem acesso ao disco por requisição
+static_assets = StaticAssetIndex(app.static_folder)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -46,14 +52,16 @@ def serve(path):
     if static_folder_path is None:
         return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+    asset = static_assets.resolve(path)
+    if asset is None:
+        return "index.html not found", 404
+
+    return static_assets.respond(asset, request)
+
+@app.route('/metrics')
+def metrics():
+    """Métricas no formato de texto do Prometheus"""
+    return Response(metrics_registry.render(), content_type=CONTENT_TYPE)
 
 @app.route('/health')
 def health_check():
@@ -64,9 +72,9 @@ if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_ENV') == 'development'
     
-    print(f"🚀 ARQV30 Enhanced Backend iniciando...")
-    print(f"📍 Host: {host}:{port}")
-    print(f"🔧 Debug: {debug}")
-    print(f"🌐 CORS: {os.getenv('CORS_ORIGINS', '*')}")
+    logger.info(f"🚀 ARQV30 Enhanced Backend iniciando...")
+    logger.info(f"📍 Host: {host}:{port}")
+    logger.info(f"🔧 Debug: {debug}")
+    logger.info(f"🌐 CORS: {os.getenv('CORS_ORIGINS', '*')}")
     
     app.run(host=host, port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,81 @@
+import json
+import zlib
+from datetime import datetime
+from sqlalchemy.types import TypeDecorator, LargeBinary
+from src.models.user import db
+
+
+class CompressedText(TypeDecorator):
+    """Texto gravado comprimido com zlib"""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.compress(value.encode('utf-8'), 6)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.decompress(value).decode('utf-8')
+
+
+class CompressedJSON(CompressedText):
+    """JSON gravado comprimido com zlib"""
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return super().process_bind_param(json.dumps(value, ensure_ascii=False), dialect)
+
+    def process_result_value(self, value, dialect):
+        text = super().process_result_value(value, dialect)
+        return None if text is None else json.loads(text)
+
+
+class Analysis(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    segmento = db.Column(db.String(200), nullable=False)
+    produto = db.Column(db.String(300))
+    provider = db.Column(db.String(32))
+    cache_status = db.Column(db.String(16))
+    latency_ms = db.Column(db.Integer)
+    result_size = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    # Conteúdo pesado: comprimido e só carregado quando acessado
+    input_data = db.deferred(db.Column(CompressedJSON, nullable=False))
+    search_context = db.deferred(db.Column(CompressedText))
+    result = db.deferred(db.Column(CompressedJSON, nullable=False))
+
+    __table_args__ = (
+        db.Index('ix_analysis_user_created', 'user_id', 'created_at'),
+        db.Index('ix_analysis_segmento_created', 'segmento', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<Analysis {self.id} {self.segmento}>'
+
+    def to_summary(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'segmento': self.segmento,
+            'produto': self.produto,
+            'provider': self.provider,
+            'cache_status': self.cache_status,
+            'latency_ms': self.latency_ms,
+            'result_size': self.result_size,
+            'created_at': self.created_at.isoformat()
+        }
+
+    def to_dict(self, include_context=False):
+        data = self.to_summary()
+        data['input_data'] = self.input_data
+        data['analysis'] = self.result
+        if include_context:
+            data['search_context'] = self.search_context
+        return data
@@ -0,0 +1,17 @@
+from datetime import datetime
+from src.models.user import db
+
+
+class ExtractedContent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    url_hash = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    url = db.Column(db.Text, nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    etag = db.Column(db.String(255))
+    last_modified = db.Column(db.String(64))
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    last_accessed = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<ExtractedContent {self.url}>'
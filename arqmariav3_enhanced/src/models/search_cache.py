@@ -0,0 +1,19 @@
+from datetime import datetime
+from src.models.user import db
+
+
+class SearchCacheEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    query_text = db.Column(db.String(500), nullable=False)
+    provider = db.Column(db.String(32), nullable=False)
+    locale = db.Column(db.String(16), nullable=False)
+    num_results = db.Column(db.Integer, nullable=False)
+    results = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    last_accessed = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<SearchCacheEntry {self.provider}:{self.query_text}>'
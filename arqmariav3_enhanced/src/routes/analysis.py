@@ -1,11 +1,42 @@
-from flask import Blueprint, request, jsonify
-import json
+from flask import Blueprint, Response, request, jsonify, current_app, url_for, stream_with_context
 import os
+import json
+import queue
+import threading
 from datetime import datetime
 from src.services.ai_service import AIService
 from src.services.search_service import SearchService
+from src.services.analysis_pipeline import run_market_analysis, validate_analysis_input, AnalysisCancelled
+from src.services.job_manager import job_manager, JobQueueFull, COMPLETED, FAILED, CANCELLED
+from src.services.search_cache import search_cache
+from src.services.circuit_breaker import breaker_states
+from src.services.concurrency_limiter import limiter_states
+from src.services.analysis_cache import analysis_cache
+from src.services.content_cache import content_cache
+from src.services.analysis_store import analysis_store
+from src.services.batch_analysis import batch_analyzer, BatchTooLarge
+from src.services.providers import registry
+from src.services.admission import admission, AdmissionRejected
+from src.services.logging_setup import get_logger
 
 analysis_bp = Blueprint('analysis', __name__)
+logger = get_logger('routes.analysis')
+
+def _client_id():
+    return admission.client_id(request.headers.get('X-API-Key'), request.headers.get('X-Forwarded-For'),
+                               request.remote_addr)
+
+def _too_many_requests(error: AdmissionRejected):
+    """429 com Retry-After: o cliente deve tentar de novo mais tarde, sem ocupar o servidor"""
+    response = jsonify({'success': False, 'error': str(error), 'reason': error.reason,
+                        'retry_after': error.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def _include_timings():
+    """?incluir_tempos=true adiciona o tempo de cada etapa aos metadados da análise"""
+    return request.args.get('incluir_tempos', 'false').lower() == 'true' or None
 
 @analysis_bp.route('/analyze', methods=['POST'])
 def analyze_market():
@@ -13,67 +44,242 @@ def analyze_market():
         data = request.get_json()
         
         # Validar dados obrigatórios
-        required_fields = ['segmento', 'produto', 'publico', 'preco']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({'error': f'Campo obrigatório: {field}'}), 400
-        
-        print("🚀 Iniciando análise de mercado...")
-        print(f"📊 Dados recebidos: {data}")
-        
-        # Inicializar serviços
-        search_service = SearchService()
-        ai_service = AIService()
+        validation_error = validate_analysis_input(data)
+        if validation_error:
+            return jsonify({'error': validation_error}), 400
         
-        # Realizar pesquisa de mercado
-        print("🔍 Realizando pesquisa de mercado...")
-        search_context = search_service.search_for_market_analysis(data)
-        print(f"📝 Contexto de pesquisa obtido: {len(search_context)} caracteres")
+        logger.info("🚀 Iniciando análise de mercado...")
+        logger.debug(f"📊 Campos recebidos: {', '.join(sorted(data))}")
         
-        # Gerar análise com IA
-        print("🤖 Gerando análise com IA...")
-        analysis_text = ai_service.generate_market_analysis(data, search_context)
+        with admission.admit(_client_id()):
+            analysis_json = run_market_analysis(data, include_timings=_include_timings())
         
-        if not analysis_text:
+        if analysis_json is None:
             return jsonify({'error': 'Falha ao gerar análise com IA'}), 500
         
-        # Tentar parsear como JSON
-        try:
-            analysis_json = json.loads(analysis_text)
-        except json.JSONDecodeError:
-            # Se não for JSON válido, criar estrutura básica
-            analysis_json = {
-                "status": "success",
-                "raw_analysis": analysis_text,
-                "metadata": {
-                    "timestamp": datetime.now().isoformat(),
-                    "input_data": data,
-                    "search_context_length": len(search_context)
-                }
-            }
-        
-        # Adicionar metadados
-        analysis_json['dados_pesquisa'] = {
-            'timestamp_analise': datetime.now().isoformat(),
-            'entrada_usuario': data,
-            'contexto_pesquisa_chars': len(search_context),
-            'status': 'success'
-        }
-        
-        print("✅ Análise concluída com sucesso!")
+        logger.info("✅ Análise concluída com sucesso!")
         
         return jsonify({
             'success': True,
             'analysis': analysis_json
         })
         
+    except AdmissionRejected as e:
+        return _too_many_requests(e)
+
     except Exception as e:
-        print(f"❌ Erro na análise: {str(e)}")
+        logger.error(f"❌ Erro na análise: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def sse_event(event: str, payload) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@analysis_bp.route('/analyze/stream', methods=['POST'])
+def analyze_market_stream():
+    """Executa a análise emitindo Server-Sent Events de progresso e tokens da IA"""
+    data = request.get_json(silent=True)
+
+    validation_error = validate_analysis_input(data)
+    if validation_error:
+        return jsonify({'error': validation_error}), 400
+
+    try:
+        ticket = admission.acquire(_client_id())
+    except AdmissionRejected as e:
+        return _too_many_requests(e)
+
+    app = current_app._get_current_object()
+    events = queue.Queue()
+    cancel_event = threading.Event()
+    heartbeat = float(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+    include_timings = _include_timings()
+
+    def emit(event, payload):
+        events.put((event, payload))
+
+    def worker():
+        with app.app_context():
+            try:
+                analysis_json = run_market_analysis(data, cancel_event=cancel_event, emit=emit,
+                                                    include_timings=include_timings)
+                if analysis_json is None:
+                    emit('error', {'error': 'Falha ao gerar análise com IA'})
+                else:
+                    emit('result', {'success': True, 'analysis': analysis_json})
+            except AnalysisCancelled:
+                logger.info("⏹️ Análise em streaming cancelada pelo cliente")
+            except Exception as e:
+                logger.error(f"❌ Erro na análise em streaming: {str(e)}")
+                emit('error', {'success': False, 'error': str(e)})
+            finally:
+                ticket.release()
+                events.put(None)
+
+    def generate():
+        yield sse_event('start', {'timestamp': datetime.now().isoformat()})
+        threading.Thread(target=worker, daemon=True, name='analysis-stream').start()
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comentário SSE para manter a conexão viva durante etapas longas
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if item is None:
+                    break
+                yield sse_event(*item)
+        finally:
+            # Cliente desconectou (ou o stream terminou): interromper o pipeline
+            cancel_event.set()
+
+    logger.info("🚀 Iniciando análise de mercado em streaming...")
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Libera a vaga mesmo se o stream nunca chegar a ser consumido
+    response.call_on_close(ticket.release)
+    return response
+
+@analysis_bp.route('/analyze/batch', methods=['POST'])
+def analyze_market_batch():
+    """Analisa vários briefings, transmitindo um resultado por linha (NDJSON) à medida que ficam prontos"""
+    payload = request.get_json(silent=True)
+    briefs = payload.get('briefs') if isinstance(payload, dict) else payload
+    if not isinstance(briefs, list) or not briefs:
+        return jsonify({'error': 'Informe uma lista de briefings em "briefs"'}), 400
+
+    try:
+        batch_analyzer.check_size(briefs)
+    except BatchTooLarge as e:
+        return jsonify({'error': str(e)}), 400
+
+    # O lote roda no pool próprio (BATCH_MAX_WORKERS); conta no limite do cliente pelo número de briefings
+    # (com o limite ativo, lotes acima de RATE_LIMIT_BURST são recusados)
+    try:
+        admission.check_rate(_client_id(), cost=len(briefs))
+    except AdmissionRejected as e:
+        return _too_many_requests(e)
+
+    app = current_app._get_current_object()
+
+    def runner(brief, prefetched, cancel_event):
+        with app.app_context():
+            return run_market_analysis(brief, cancel_event=cancel_event, prefetched=prefetched)
+
+    def generate():
+        for line in batch_analyzer.run(briefs, runner):
+            yield json.dumps(line, ensure_ascii=False) + '\n'
+
+    logger.info(f"🚀 Iniciando lote de {len(briefs)} análises...")
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@analysis_bp.route('/analyze/jobs', methods=['POST'])
+def create_analysis_job():
+    """Enfileira uma análise e retorna o id do job imediatamente"""
+    data = request.get_json(silent=True)
+
+    validation_error = validate_analysis_input(data)
+    if validation_error:
+        return jsonify({'error': validation_error}), 400
+
+    # Jobs rodam no pool limitado do job_manager; aqui vale apenas o limite do cliente
+    try:
+        admission.check_rate(_client_id())
+    except AdmissionRejected as e:
+        return _too_many_requests(e)
+
+    app = current_app._get_current_object()
+    include_timings = _include_timings()
+
+    def runner(job):
+        with app.app_context():
+            return run_market_analysis(job.data, progress=job.update_progress, cancel_event=job.cancel_event,
+                                       include_timings=include_timings)
+
+    try:
+        job = job_manager.submit(runner, data)
+    except JobQueueFull as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'queue': job_manager.stats()
+        }), 503
+
+    logger.info(f"📥 Job de análise enfileirado: {job.id}")
+
+    return jsonify({
+        'success': True,
+        'job': job.to_dict(),
+        'status_url': url_for('analysis.get_analysis_job', job_id=job.id),
+        'result_url': url_for('analysis.get_analysis_job_result', job_id=job.id),
+        'queue': job_manager.stats()
+    }), 202
+
+@analysis_bp.route('/analyze/jobs', methods=['GET'])
+def get_analysis_queue():
+    return jsonify({'queue': job_manager.stats()})
+
+@analysis_bp.route('/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+
+    return jsonify({'job': job.to_dict()})
+
+@analysis_bp.route('/analyze/jobs/<job_id>/result', methods=['GET'])
+def get_analysis_job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+
+    if job.status == COMPLETED:
+        return jsonify({'success': True, 'analysis': job.result})
+
+    if job.status in (FAILED, CANCELLED):
+        return jsonify({'success': False, 'error': job.error or 'Job cancelado', 'job': job.to_dict()}), 409
+
+    return jsonify({'success': False, 'job': job.to_dict()}), 202
+
+@analysis_bp.route('/analyze/jobs/<job_id>', methods=['DELETE'])
+def cancel_analysis_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+
+    return jsonify({'job': job.to_dict()})
+
+@analysis_bp.route('/analyses', methods=['GET'])
+def list_analyses():
+    """Histórico paginado de análises (apenas metadados)"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    user_id = request.args.get('user_id', type=int)
+    segmento = request.args.get('segmento')
+
+    return jsonify(analysis_store.list(page=page, per_page=per_page, user_id=user_id, segmento=segmento))
+
+@analysis_bp.route('/analyses/<int:analysis_id>', methods=['GET'])
+def get_analysis(analysis_id):
+    """Análise salva; ?incluir_contexto=true inclui o contexto de pesquisa"""
+    include_context = request.args.get('incluir_contexto', 'false').lower() == 'true'
+    analysis = analysis_store.get(analysis_id, include_context=include_context)
+    if analysis is None:
+        return jsonify({'error': 'Análise não encontrada'}), 404
+
+    return jsonify({'success': True, 'analysis': analysis.to_dict(include_context=include_context)})
+
 @analysis_bp.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
@@ -101,7 +307,15 @@ def test_apis():
         return jsonify({
             'status': 'success',
             'apis_configured': results,
-            'total_configured': sum(results.values())
+            'total_configured': sum(results.values()),
+            'provider_backend': registry.backend,
+            'search_cache': search_cache.stats(),
+            'analysis_cache': analysis_cache.stats(),
+            'content_cache': content_cache.stats(),
+            'analysis_jobs': job_manager.stats(),
+            'admission': admission.stats(),
+            'concurrency_limits': limiter_states(),
+            'circuit_breakers': breaker_states()
         })
         
     except Exception as e:
@@ -1,12 +1,53 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.services.user_store import user_store, InvalidUserRequest, BulkTooLarge
 
 user_bp = Blueprint('user', __name__)
 
+# Sem nenhum destes parâmetros, GET /users mantém a resposta antiga (lista simples)
+PAGINATION_PARAMS = ('limit', 'after', 'fields')
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """Lista completa (formato original) ou, com ?limit=50&after=<next_cursor>&fields=id,username, página por cursor"""
+    if not any(name in request.args for name in PAGINATION_PARAMS):
+        users = User.query.all()
+        return jsonify([user.to_dict() for user in users])
+
+    try:
+        return jsonify(user_store.list(limit=request.args.get('limit', type=int),
+                                       after=request.args.get('after', type=int),
+                                       fields=request.args.get('fields')))
+    except InvalidUserRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+def _bulk_items(key):
+    """Itens do lote em {"<key>": [...]} ou diretamente como lista"""
+    payload = request.get_json(silent=True)
+    items = payload.get(key) if isinstance(payload, dict) else payload
+    return items if isinstance(items, list) and items else None
+
+def _run_bulk(operation, key):
+    items = _bulk_items(key)
+    if items is None:
+        return jsonify({'error': f'Informe uma lista em "{key}"'}), 400
+
+    try:
+        return jsonify(operation(items))
+    except BulkTooLarge as e:
+        return jsonify({'error': str(e)}), 400
+
+@user_bp.route('/users/bulk', methods=['POST'])
+def bulk_create_users():
+    return _run_bulk(user_store.bulk_create, 'users')
+
+@user_bp.route('/users/bulk', methods=['PATCH'])
+def bulk_update_users():
+    return _run_bulk(user_store.bulk_update, 'users')
+
+@user_bp.route('/users/bulk', methods=['DELETE'])
+def bulk_delete_users():
+    return _run_bulk(user_store.bulk_delete, 'ids')
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -0,0 +1,171 @@
+import os
+import sys
+
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+from src.services.logging_setup import get_logger
+
+logger = get_logger('serve')
+
+# Servidor de produção (python src/serve.py). Variáveis de ambiente:
+#   HOST / PORT                        endereço de escuta (0.0.0.0 / 5000)
+#   SERVER_MODE                        asgi (src.asgi:app, análises assíncronas) ou wsgi (Flask em threads)
+#   WEB_CONCURRENCY                    processos; padrão: núcleos disponíveis (asgi) ou 2 x núcleos + 1 (wsgi)
+#   WSGI_THREADS                       threads por processo no modo wsgi (8)
+#   SERVER_PRELOAD                     importa a aplicação e roda db.create_all uma vez, antes do fork (true)
+#   WORKER_TIMEOUT                     segundos sem sinal de vida até o worker ser reiniciado (300)
+#   GRACEFUL_TIMEOUT                   segundos para concluir as requisições em andamento ao parar ou recarregar (120)
+#   KEEPALIVE_SECONDS                  tempo de uma conexão ociosa aberta (5)
+#   MAX_REQUESTS / MAX_REQUESTS_JITTER reinicia o worker após N requisições, 0 desativa (0 / 50)
+#   RATE_LIMIT_PER_MINUTE              análises por minuto por cliente (X-API-Key ou IP), 0 desativa (0)
+#   ADMISSION_API_KEYS                 chaves X-API-Key reconhecidas como cliente, separadas por vírgula (nenhuma)
+#   ADMISSION_TRUSTED_PROXIES          proxies reversos confiáveis à frente do servidor (0)
+#
+# Atrás de proxy reverso, ative o limite por cliente só com ADMISSION_TRUSTED_PROXIES
+# configurado: sem ele o IP de todas as requisições é o do proxy e todos os usuários
+# dividem um único limite. Veja src/services/admission.py.
+#
+# Com o gunicorn (Linux/macOS): SIGHUP recarrega os workers sem derrubar conexões
+# e SIGTERM drena as requisições em andamento por até GRACEFUL_TIMEOUT.
+# Sem o gunicorn (Windows) o uvicorn é usado com o mesmo número de processos,
+# sem preload e sem recarga: as rotas Flask são servidas pelo app ASGI.
+# Jobs (/api/analyze/jobs) ficam na memória do processo que os criou.
+
+MODE_ASGI = 'asgi'
+MODE_WSGI = 'wsgi'
+
+APPS = {
+    MODE_ASGI: 'src.asgi:app',
+    MODE_WSGI: 'src.main:app',
+}
+
+
+def _available_cores() -> int:
+    """Núcleos que o processo pode usar (respeita afinidade de CPU, ex.: containers com cpuset)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def server_settings() -> dict:
+    mode = os.getenv('SERVER_MODE', MODE_ASGI).lower()
+    if mode not in APPS:
+        raise ValueError(f'SERVER_MODE inválido: {mode} (use {" ou ".join(APPS)})')
+
+    cores = _available_cores()
+    # Um processo ASGI atende centenas de análises; no WSGI cada requisição ocupa uma thread
+    default_workers = cores if mode == MODE_ASGI else 2 * cores + 1
+
+    return {
+        'mode': mode,
+        'host': os.getenv('HOST', '0.0.0.0'),
+        'port': int(os.getenv('PORT', 5000)),
+        'workers': max(1, int(os.getenv('WEB_CONCURRENCY', default_workers))),
+        'threads': int(os.getenv('WSGI_THREADS', 8)),
+        'preload': os.getenv('SERVER_PRELOAD', 'true').lower() == 'true',
+        'timeout': int(os.getenv('WORKER_TIMEOUT', 300)),
+        'graceful_timeout': int(os.getenv('GRACEFUL_TIMEOUT', 120)),
+        'keepalive': int(os.getenv('KEEPALIVE_SECONDS', 5)),
+        'max_requests': int(os.getenv('MAX_REQUESTS', 0)),
+        'max_requests_jitter': int(os.getenv('MAX_REQUESTS_JITTER', 50)),
+        'log_level': os.getenv('LOG_LEVEL', 'INFO').lower(),
+    }
+
+
+def _post_fork(server, worker):
+    """Descarta as conexões do banco herdadas do processo mestre (preload)"""
+    from src.main import app
+    from src.models.user import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def gunicorn_options(settings: dict) -> dict:
+    options = {
+        'bind': f"{settings['host']}:{settings['port']}",
+        'workers': settings['workers'],
+        'preload_app': settings['preload'],
+        'timeout': settings['timeout'],
+        'graceful_timeout': settings['graceful_timeout'],
+        'keepalive': settings['keepalive'],
+        'max_requests': settings['max_requests'],
+        'max_requests_jitter': settings['max_requests_jitter'] if settings['max_requests'] else 0,
+        'loglevel': settings['log_level'],
+        'post_fork': _post_fork,
+    }
+    if settings['mode'] == MODE_ASGI:
+        options['worker_class'] = 'uvicorn.workers.UvicornWorker'
+    else:
+        options['worker_class'] = 'gthread'
+        options['threads'] = settings['threads']
+    return options
+
+
+def run_gunicorn(settings: dict) -> None:
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.util import import_app
+
+    class Application(BaseApplication):
+        def __init__(self, app_uri: str, options: dict):
+            self.app_uri = app_uri
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return import_app(self.app_uri)
+
+    Application(APPS[settings['mode']], gunicorn_options(settings)).run()
+
+
+def run_uvicorn(settings: dict) -> None:
+    import uvicorn
+
+    if settings['mode'] == MODE_WSGI:
+        logger.warning("⚠️ gunicorn indisponível: servindo as rotas Flask pelo app ASGI")
+
+    uvicorn.run(
+        APPS[MODE_ASGI],
+        host=settings['host'],
+        port=settings['port'],
+        workers=settings['workers'],
+        timeout_keep_alive=settings['keepalive'],
+        timeout_graceful_shutdown=settings['graceful_timeout'],
+        limit_max_requests=settings['max_requests'] or None,
+        log_level=settings['log_level'],
+    )
+
+
+def main():
+    settings = server_settings()
+
+    try:
+        import gunicorn  # noqa: F401
+        server = 'gunicorn' if os.name != 'nt' else 'uvicorn'
+    except ImportError:
+        server = 'uvicorn'
+
+    logger.info(f"🚀 ARQV30 Enhanced Backend iniciando ({server}, modo {settings['mode']})...")
+    logger.info(f"📍 Host: {settings['host']}:{settings['port']}")
+    logger.info(f"👷 Workers: {settings['workers']} | timeout: {settings['timeout']}s | "
+                f"drenagem: {settings['graceful_timeout']}s | preload: {settings['preload']}")
+    logger.info(f"🌐 CORS: {os.getenv('CORS_ORIGINS', '*')}")
+
+    if server == 'gunicorn':
+        run_gunicorn(settings)
+    else:
+        run_uvicorn(settings)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+import os
+import math
+import time
+import asyncio
+import hmac
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+from src.services.logging_setup import get_logger
+from src.services.metrics import ADMISSIONS
+from src.services.waiters import AsyncWaiter, ThreadWaiter
+
+logger = get_logger('admission')
+
+LIMITED = 'limite_cliente'
+SATURATED = 'saturado'
+
+
+class AdmissionRejected(Exception):
+    """Análise recusada: cliente acima do limite ou servidor saturado (HTTP 429)"""
+
+    def __init__(self, reason: str, retry_after: int, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Balde de tokens: `rate` tokens por segundo, acumulando até `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, cost: float = 1) -> Tuple[bool, float]:
+        """Consome `cost` tokens; se não houver, retorna em quantos segundos haverá"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+        return False, (cost - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+
+class AdmissionTicket:
+    """Vaga de uma análise em andamento; `release` pode ser chamado mais de uma vez"""
+
+    def __init__(self, controller: 'AdmissionController'):
+        self._controller = controller
+        self._started = time.monotonic()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._controller._release(time.monotonic() - self._started)
+
+
+class _NoopTicket:
+    def release(self) -> None:
+        pass
+
+
+class AdmissionController:
+    """Controle de admissão das análises: limite por cliente e teto global de análises simultâneas
+
+    Acima de ADMISSION_MAX_IN_FLIGHT análises, até ADMISSION_QUEUE_SIZE requisições
+    esperam por ADMISSION_QUEUE_TIMEOUT segundos; as demais recebem 429 na hora.
+
+    O limite por cliente fica desligado até RATE_LIMIT_PER_MINUTE ser configurado:
+    cada cliente passa a ter um balde desses tokens com rajada de RATE_LIMIT_BURST.
+    O cliente é a X-API-Key só se ela estiver em ADMISSION_API_KEYS (separadas por
+    vírgula); qualquer outra chave é ignorada, senão bastaria trocá-la a cada
+    requisição para ganhar um balde cheio. Sem chave reconhecida vale o IP. Atrás de proxy reverso o IP da conexão é o do proxy e todos os
+    usuários dividiriam o mesmo balde; informe em ADMISSION_TRUSTED_PROXIES quantos
+    proxies confiáveis acrescentam o X-Forwarded-For. Os limites valem por processo.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+        self.max_in_flight = max(1, int(os.getenv('ADMISSION_MAX_IN_FLIGHT', 32)))
+        self.queue_size = int(os.getenv('ADMISSION_QUEUE_SIZE', 32))
+        self.queue_timeout = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 5))
+        self.rate_per_minute = float(os.getenv('RATE_LIMIT_PER_MINUTE', 0))
+        self.burst = float(os.getenv('RATE_LIMIT_BURST', 10))
+        self.max_clients = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', 10000))
+        self.trusted_proxies = max(0, int(os.getenv('ADMISSION_TRUSTED_PROXIES', 0)))
+        self.api_keys = [key.strip().encode('utf-8') for key in os.getenv('ADMISSION_API_KEYS', '').split(',')
+                         if key.strip()]
+
+        self.in_flight = 0
+        # Duração média das análises (s), usada para estimar o Retry-After quando saturado
+        self.avg_duration = float(os.getenv('ADMISSION_INITIAL_DURATION', 20))
+        self._waiters: Deque[Any] = deque()
+        self._buckets: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def known_api_key(self, api_key: Optional[str]) -> bool:
+        """Indica se a chave está em ADMISSION_API_KEYS (comparação em tempo constante)"""
+        if not api_key:
+            return False
+        candidate = api_key.encode('utf-8')
+        # Compara com todas as chaves, sem parar na primeira, para não revelar a posição
+        return any([hmac.compare_digest(candidate, key) for key in self.api_keys])
+
+    def client_id(self, api_key: Optional[str], forwarded_for: Optional[str], remote_addr: Optional[str]) -> str:
+        """Identifica o cliente pela chave de API cadastrada (nunca guardada em claro) ou pelo IP"""
+        if self.known_api_key(api_key):
+            return 'key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+        if self.trusted_proxies and forwarded_for:
+            # Cada proxy acrescenta à direita o IP de quem o chamou: o N-ésimo a partir do
+            # fim foi gravado pelo proxy confiável mais externo. Os anteriores vêm do cliente
+            hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+            if hops:
+                return 'ip:' + hops[-min(self.trusted_proxies, len(hops))]
+        return f'ip:{remote_addr or "desconhecido"}'
+
+    def check_rate(self, client: str, cost: float = 1) -> None:
+        """Consome `cost` tokens do cliente (ex.: um por briefing do lote) ou levanta AdmissionRejected"""
+        if not self.enabled or self.rate_per_minute <= 0:
+            return
+
+        if cost > self.burst:
+            # Nunca caberia no balde; cobrar só a rajada deixaria lotes grandes quase de graça
+            ADMISSIONS.inc(result=LIMITED)
+            raise AdmissionRejected(LIMITED, max(1, math.ceil(self.burst * 60 / self.rate_per_minute)),
+                                    f'Lote de {cost:g} análises excede o máximo de {self.burst:g} por requisição '
+                                    f'(RATE_LIMIT_BURST)')
+
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_per_minute / 60, self.burst)
+                self._buckets[client] = bucket
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            allowed, wait = bucket.take(cost)
+
+        if not allowed:
+            ADMISSIONS.inc(result=LIMITED)
+            raise AdmissionRejected(LIMITED, max(1, math.ceil(wait)),
+                                    f'Limite de {self.rate_per_minute:g} análises por minuto excedido')
+
+    def _enter(self, waiter_class):
+        """Ocupa uma vaga (retorna None) ou entra na fila de espera (retorna o waiter)"""
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                ADMISSIONS.inc(result='admitida')
+                return None
+            if len(self._waiters) >= self.queue_size:
+                retry_after = self._retry_after()
+            else:
+                waiter = waiter_class()
+                self._waiters.append(waiter)
+                ADMISSIONS.inc(result='enfileirada')
+                return waiter
+
+        ADMISSIONS.inc(result=SATURATED)
+        logger.warning(f"⚠️ Análise recusada: {self.max_in_flight} em andamento e fila cheia")
+        raise AdmissionRejected(SATURATED, retry_after, 'Servidor ocupado: muitas análises em andamento')
+
+    def _leave_queue(self, waiter) -> None:
+        """Depois da espera: segue se o waiter recebeu a vaga, senão sai da fila e é recusado"""
+        with self._lock:
+            if waiter.admitted:
+                return
+            self._waiters.remove(waiter)
+            retry_after = self._retry_after()
+
+        ADMISSIONS.inc(result=SATURATED)
+        raise AdmissionRejected(SATURATED, retry_after, 'Servidor ocupado: tempo de espera na fila esgotado')
+
+    def _release(self, duration: Optional[float] = None) -> None:
+        with self._lock:
+            if duration is not None:
+                self.avg_duration = 0.8 * self.avg_duration + 0.2 * duration
+            # A vaga passa direto para o primeiro da fila
+            while self._waiters:
+                if self._waiters.popleft().wake():
+                    return
+            self.in_flight -= 1
+
+    def _retry_after(self) -> int:
+        waves = (len(self._waiters) + self.in_flight) / self.max_in_flight
+        return max(1, min(60, math.ceil(self.avg_duration * waves)))
+
+    def acquire(self, client: str, cost: float = 1) -> AdmissionTicket:
+        """Admite uma análise, esperando na fila se preciso; levanta AdmissionRejected"""
+        if not self.enabled:
+            return _NoopTicket()
+
+        self.check_rate(client, cost)
+        waiter = self._enter(ThreadWaiter)
+        if waiter is not None:
+            waiter.wait(self.queue_timeout)
+            self._leave_queue(waiter)
+        return AdmissionTicket(self)
+
+    async def aacquire(self, client: str, cost: float = 1) -> AdmissionTicket:
+        """Versão assíncrona de `acquire`: a espera na fila não ocupa uma thread"""
+        if not self.enabled:
+            return _NoopTicket()
+
+        self.check_rate(client, cost)
+        waiter = self._enter(AsyncWaiter)
+        if waiter is not None:
+            try:
+                await waiter.wait(self.queue_timeout)
+            except asyncio.CancelledError:
+                # Cliente desistiu na fila: devolve a vaga se ela já tinha chegado
+                with self._lock:
+                    admitted = waiter.admitted
+                    if not admitted:
+                        self._waiters.remove(waiter)
+                if admitted:
+                    self._release()
+                raise
+            self._leave_queue(waiter)
+        return AdmissionTicket(self)
+
+    @contextmanager
+    def admit(self, client: str) -> Iterator[None]:
+        ticket = self.acquire(client)
+        try:
+            yield
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'waiting': len(self._waiters),
+                'queue_size': self.queue_size,
+                'queue_timeout': self.queue_timeout,
+                'avg_duration_s': round(self.avg_duration, 2),
+                'rate_limit_per_minute': self.rate_per_minute,
+                'rate_limit_burst': self.burst,
+                'trusted_proxies': self.trusted_proxies,
+                'api_keys': len(self.api_keys),
+                'tracked_clients': len(self._buckets),
+                'rejected': {reason: ADMISSIONS.value(result=reason) for reason in (LIMITED, SATURATED)},
+            }
+
+
+admission = AdmissionController()
@@ -1,144 +1,936 @@
 import os
+import json
+import time
+import asyncio
 import openai
-import requests
-from typing import Dict, Any, Optional
+from collections import Counter
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait, as_completed
+from typing import AsyncIterator, Callable, Dict, Any, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
+from src.services import http_client, async_http
+from src.services.circuit_breaker import StreamSlot, aguarded_call, guarded_call, order_by_health
+from src.services.analysis_cache import analysis_cache, make_analysis_key, HIT, MISS, BYPASS, SHARED, DISABLED
+from src.services.context_builder import build_context, token_budget_for_model
+from src.services.json_extractor import extract_json
+from src.services.providers import registry, LLMProvider, LLM
+from src.services.logging_setup import get_logger
+from src.services.metrics import StageTimings, FALLBACKS, FAILURES
 
 load_dotenv()
 
+logger = get_logger('ai')
+
+OPENAI_MODEL = "gpt-4-turbo-preview"
+GEMINI_MODEL = "gemini-pro"
+SYSTEM_PROMPT = "Você é um especialista em análise de mercado e marketing digital. Gere análises detalhadas e estruturadas em formato JSON."
+
+# Estratégias de despacho entre provedores de IA
+DISPATCH_SEQUENTIAL = 'sequential'
+DISPATCH_HEDGED = 'hedged'
+DISPATCH_RACE = 'race'
+
+# Chamada a um provedor: recebe o prazo em segundos e retorna o texto (ou None)
+ProviderCall = Callable[[float], Optional[str]]
+
+# Modos de geração: um único documento ou seções geradas em paralelo
+GENERATION_SINGLE = 'single'
+GENERATION_SECTIONED = 'sectioned'
+
+# Seções da análise, na ordem do documento final
+SECTION_DESCRIPTIONS = [
+    ('avatar_ultra_detalhado', 'Perfil demográfico, psicográfico, dores, desejos, objeções e jornada emocional'),
+    ('escopo_posicionamento', 'Posicionamento de mercado, proposta de valor única, diferenciais'),
+    ('analise_concorrencia_profunda', 'SWOT, estratégias e vulnerabilidades dos principais concorrentes'),
+    ('estrategia_palavras_chave', 'Palavras primárias, secundárias, cauda longa e intenção de busca'),
+    ('metricas_performance_detalhadas', 'KPIs, projeções financeiras, ROI esperado'),
+    ('plano_acao_detalhado', 'Fases de preparação, lançamento e crescimento'),
+    ('insights_exclusivos_ultra', '25+ insights únicos e valiosos'),
+    ('inteligencia_mercado', 'Tendências, oportunidades, ameaças e gaps'),
+    ('drivers_mentais', 'Gatilhos psicológicos e roteiros de ativação'),
+    ('provas_visuais_instantaneas', 'Demonstrações e experimentos de impacto'),
+]
+
+# Agrupamento padrão do modo por seções: seções afins compartilham uma chamada
+SECTION_GROUPS = [
+    ['avatar_ultra_detalhado', 'drivers_mentais'],
+    ['escopo_posicionamento', 'analise_concorrencia_profunda'],
+    ['estrategia_palavras_chave', 'inteligencia_mercado'],
+    ['metricas_performance_detalhadas', 'plano_acao_detalhado'],
+    ['insights_exclusivos_ultra', 'provas_visuais_instantaneas'],
+]
+
+# Recebe o grupo de seções concluído e se foi gerado com sucesso
+SectionCallback = Callable[[List[str], bool], None]
+
+
+@dataclass
+class SectionResult:
+    """Resultado de um grupo do modo por seções, com o provedor que o gerou (ou 'cache')"""
+    sections: Optional[Dict[str, Any]]
+    status: Optional[str]
+    attempts: int
+    provider: Optional[str]
+
 class AIService:
-    def __init__(self):
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.gemini_api_key = os.getenv('GEMINI_API_KEY')
-        self.huggingface_api_key = os.getenv('HUGGINGFACE_API_KEY')
+    def __init__(self, timings: Optional[StageTimings] = None):
+        self.openai_api_key = registry.credential('OPENAI_API_KEY')
+        self.gemini_api_key = registry.credential('GEMINI_API_KEY')
+        self.huggingface_api_key = registry.credential('HUGGINGFACE_API_KEY')
+        self.dispatch_strategy = os.getenv('LLM_DISPATCH_STRATEGY', DISPATCH_SEQUENTIAL).lower()
+        self.hedge_delay = float(os.getenv('LLM_HEDGE_DELAY', 20))
+        self.total_budget = float(os.getenv('LLM_TOTAL_BUDGET', 180))
+        self.huggingface_model = os.getenv('HUGGINGFACE_MODEL_NAME', 'microsoft/DialoGPT-medium')
+        self.generation_mode = os.getenv('LLM_GENERATION_MODE', GENERATION_SINGLE).lower()
+        self.section_grouping = os.getenv('LLM_SECTION_GROUPING', 'groups').lower()
+        self.section_concurrency = int(os.getenv('LLM_SECTION_CONCURRENCY', 3))
+        self.section_retries = int(os.getenv('LLM_SECTION_RETRIES', 1))
+        self.last_cache_status: Optional[str] = None
+        self.last_provider: Optional[str] = None
+        self.last_context_stats: Optional[Dict[str, Any]] = None
+        self.last_section_stats: Optional[Dict[str, Any]] = None
+        self.timings = timings or StageTimings()
         
         if self.openai_api_key:
             openai.api_key = self.openai_api_key
     
-    def generate_analysis_with_openai(self, prompt: str, max_tokens: int = 4000) -> Optional[str]:
+    def provider_timeout(self, provider: str) -> float:
+        """Prazo máximo de uma chamada ao provedor (LLM_TIMEOUT_<PROVEDOR> ou LLM_PROVIDER_TIMEOUT)"""
+        default = float(os.getenv('LLM_PROVIDER_TIMEOUT', 90))
+        return float(os.getenv(f'LLM_TIMEOUT_{provider.upper()}', default))
+    
+    def generate_analysis_with_openai(self, prompt: str, max_tokens: int = 4000, timeout: Optional[float] = None) -> Optional[str]:
         """Gera análise usando OpenAI GPT"""
         try:
             if not self.openai_api_key:
                 raise ValueError("OpenAI API key não configurada")
             
-            client = openai.OpenAI(api_key=self.openai_api_key)
+            client = http_client.get_openai_client(self.openai_api_key)
             
-            response = client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": "Você é um especialista em análise de mercado e marketing digital. Gere análises detalhadas e estruturadas em formato JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=0.7
-            )
+            with guarded_call('openai'):
+                response = client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=self._openai_messages(prompt),
+                    max_tokens=max_tokens,
+                    temperature=0.7,
+                    timeout=timeout or self.provider_timeout('openai')
+                )
             
             return response.choices[0].message.content
             
         except Exception as e:
-            print(f"Erro ao usar OpenAI: {e}")
+            logger.warning(f"Erro ao usar OpenAI: {e}")
             return None
     
-    def generate_analysis_with_gemini(self, prompt: str) -> Optional[str]:
+    async def agenerate_analysis_with_openai(self, prompt: str, max_tokens: int = 4000,
+                                             timeout: Optional[float] = None) -> Optional[str]:
+        """Gera análise usando OpenAI GPT (cliente assíncrono)"""
+        try:
+            if not self.openai_api_key:
+                raise ValueError("OpenAI API key não configurada")
+            
+            client = async_http.get_async_openai_client(self.openai_api_key)
+            
+            async with aguarded_call('openai'):
+                response = await client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=self._openai_messages(prompt),
+                    max_tokens=max_tokens,
+                    temperature=0.7,
+                    timeout=timeout or self.provider_timeout('openai')
+                )
+            
+            return response.choices[0].message.content
+            
+        except Exception as e:
+            logger.warning(f"Erro ao usar OpenAI: {e}")
+            return None
+    
+    @staticmethod
+    def _openai_messages(prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def generate_analysis_with_gemini(self, prompt: str, timeout: Optional[float] = None) -> Optional[str]:
         """Gera análise usando Google Gemini"""
         try:
             if not self.gemini_api_key:
                 raise ValueError("Gemini API key não configurada")
             
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={self.gemini_api_key}"
+            url = self._gemini_url('generateContent')
             
             headers = {
                 'Content-Type': 'application/json',
             }
             
-            data = {
-                "contents": [{
-                    "parts": [{
-                        "text": prompt
-                    }]
-                }],
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "topK": 1,
-                    "topP": 1,
-                    "maxOutputTokens": 4000,
-                }
-            }
+            data = self._gemini_payload(prompt)
             
-            response = requests.post(url, json=data, headers=headers)
-            response.raise_for_status()
+            with guarded_call('gemini'):
+                response = http_client.post(url, json=data, headers=headers, timeout=timeout or self.provider_timeout('gemini'))
+                response.raise_for_status()
+                result = response.json()
             
-            result = response.json()
-            if 'candidates' in result and len(result['candidates']) > 0:
-                return result['candidates'][0]['content']['parts'][0]['text']
+            return self._gemini_text(result)
             
+        except Exception as e:
+            logger.warning(f"Erro ao usar Gemini: {e}")
             return None
+    
+    async def agenerate_analysis_with_gemini(self, prompt: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Gera análise usando Google Gemini (cliente assíncrono)"""
+        try:
+            if not self.gemini_api_key:
+                raise ValueError("Gemini API key não configurada")
+            
+            async with aguarded_call('gemini'):
+                response = await async_http.post(self._gemini_url('generateContent'), json=self._gemini_payload(prompt),
+                                                 headers={'Content-Type': 'application/json'},
+                                                 timeout=timeout or self.provider_timeout('gemini'))
+                response.raise_for_status()
+                result = response.json()
+            
+            return self._gemini_text(result)
             
         except Exception as e:
-            print(f"Erro ao usar Gemini: {e}")
+            logger.warning(f"Erro ao usar Gemini: {e}")
             return None
     
-    def generate_analysis_with_huggingface(self, prompt: str) -> Optional[str]:
+    def _gemini_url(self, method: str, params: str = '') -> str:
+        return f"{http_client.provider_url('gemini')}/v1beta/models/{GEMINI_MODEL}:{method}?{params}key={self.gemini_api_key}"
+    
+    @staticmethod
+    def _gemini_text(result: Dict[str, Any]) -> Optional[str]:
+        if 'candidates' in result and len(result['candidates']) > 0:
+            return result['candidates'][0]['content']['parts'][0]['text']
+        return None
+    
+    @staticmethod
+    def _gemini_stream_texts(line: str) -> List[str]:
+        """Textos de uma linha SSE do streamGenerateContent"""
+        if not line or not line.startswith('data:'):
+            return []
+        result = json.loads(line[5:].strip())
+        return [
+            part['text']
+            for candidate in result.get('candidates', [])
+            for part in candidate.get('content', {}).get('parts', [])
+            if part.get('text')
+        ]
+    
+    def _gemini_payload(self, prompt: str) -> Dict[str, Any]:
+        return {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }],
+            "generationConfig": {
+                "temperature": 0.7,
+                "topK": 1,
+                "topP": 1,
+                "maxOutputTokens": 4000,
+            }
+        }
+    
+    def stream_analysis_with_openai(self, prompt: str, max_tokens: int = 4000) -> Iterator[str]:
+        """Gera análise usando OpenAI GPT, produzindo os tokens conforme chegam"""
+        if not self.openai_api_key:
+            raise ValueError("OpenAI API key não configurada")
+        
+        client = http_client.get_openai_client(self.openai_api_key)
+        
+        stream = client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=self._openai_messages(prompt),
+            max_tokens=max_tokens,
+            temperature=0.7,
+            stream=True,
+            timeout=self.provider_timeout('openai')
+        )
+        
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.response.close()
+    
+    async def astream_analysis_with_openai(self, prompt: str, max_tokens: int = 4000) -> AsyncIterator[str]:
+        """Streaming da OpenAI com o cliente assíncrono"""
+        if not self.openai_api_key:
+            raise ValueError("OpenAI API key não configurada")
+        
+        client = async_http.get_async_openai_client(self.openai_api_key)
+        
+        stream = await client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=self._openai_messages(prompt),
+            max_tokens=max_tokens,
+            temperature=0.7,
+            stream=True,
+            timeout=self.provider_timeout('openai')
+        )
+        
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.response.aclose()
+    
+    def stream_analysis_with_gemini(self, prompt: str) -> Iterator[str]:
+        """Gera análise usando Google Gemini (streamGenerateContent), produzindo os tokens conforme chegam"""
+        if not self.gemini_api_key:
+            raise ValueError("Gemini API key não configurada")
+        
+        url = self._gemini_url('streamGenerateContent', 'alt=sse&')
+        
+        response = http_client.post(url, json=self._gemini_payload(prompt), headers={'Content-Type': 'application/json'},
+                                    stream=True, timeout=self.provider_timeout('gemini'))
+        
+        try:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                for text in self._gemini_stream_texts(line):
+                    yield text
+        finally:
+            response.close()
+    
+    async def astream_analysis_with_gemini(self, prompt: str) -> AsyncIterator[str]:
+        """Streaming do Gemini com o cliente assíncrono"""
+        if not self.gemini_api_key:
+            raise ValueError("Gemini API key não configurada")
+        
+        async with async_http.stream('POST', self._gemini_url('streamGenerateContent', 'alt=sse&'),
+                                     json=self._gemini_payload(prompt), headers={'Content-Type': 'application/json'},
+                                     timeout=self.provider_timeout('gemini')) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                for text in self._gemini_stream_texts(line):
+                    yield text
+    
+    def generate_analysis_with_huggingface(self, prompt: str, timeout: Optional[float] = None) -> Optional[str]:
         """Gera análise usando HuggingFace"""
         try:
             if not self.huggingface_api_key:
                 raise ValueError("HuggingFace API key não configurada")
             
-            model_name = os.getenv('HUGGINGFACE_MODEL_NAME', 'microsoft/DialoGPT-medium')
-            url = f"https://api-inference.huggingface.co/models/{model_name}"
+            url, headers, data = self._huggingface_request(prompt)
             
-            headers = {
-                'Authorization': f'Bearer {self.huggingface_api_key}',
-                'Content-Type': 'application/json',
-            }
+            with guarded_call('huggingface'):
+                response = http_client.post(url, json=data, headers=headers, timeout=timeout or self.provider_timeout('huggingface'))
+                response.raise_for_status()
+                result = response.json()
             
-            data = {
-                "inputs": prompt,
-                "parameters": {
-                    "max_length": 2000,
-                    "temperature": 0.7,
-                    "do_sample": True
-                }
-            }
+            return self._huggingface_text(result)
             
-            response = requests.post(url, json=data, headers=headers)
-            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Erro ao usar HuggingFace: {e}")
+            return None
+    
+    async def agenerate_analysis_with_huggingface(self, prompt: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Gera análise usando HuggingFace (cliente assíncrono)"""
+        try:
+            if not self.huggingface_api_key:
+                raise ValueError("HuggingFace API key não configurada")
             
-            result = response.json()
-            if isinstance(result, list) and len(result) > 0:
-                return result[0].get('generated_text', '')
+            url, headers, data = self._huggingface_request(prompt)
             
-            return None
+            async with aguarded_call('huggingface'):
+                response = await async_http.post(url, json=data, headers=headers,
+                                                 timeout=timeout or self.provider_timeout('huggingface'))
+                response.raise_for_status()
+                result = response.json()
+            
+            return self._huggingface_text(result)
             
         except Exception as e:
-            print(f"Erro ao usar HuggingFace: {e}")
+            logger.warning(f"Erro ao usar HuggingFace: {e}")
             return None
     
-    def generate_market_analysis(self, data: Dict[str, Any], search_context: str = "") -> Optional[str]:
-        """Gera análise de mercado usando a melhor API disponível"""
+    def _huggingface_request(self, prompt: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        url = f"{http_client.provider_url('huggingface')}/models/{self.huggingface_model}"
         
-        prompt = self._build_analysis_prompt(data, search_context)
+        headers = {
+            'Authorization': f'Bearer {self.huggingface_api_key}',
+            'Content-Type': 'application/json',
+        }
         
-        # Tentar OpenAI primeiro
-        result = self.generate_analysis_with_openai(prompt)
-        if result:
-            return result
+        data = {
+            "inputs": prompt,
+            "parameters": {
+                "max_length": 2000,
+                "temperature": 0.7,
+                "do_sample": True
+            }
+        }
+        return url, headers, data
+    
+    @staticmethod
+    def _huggingface_text(result: Any) -> Optional[str]:
+        if isinstance(result, list) and len(result) > 0:
+            return result[0].get('generated_text', '')
+        return None
+    
+    def _llm_providers(self, prompt: str) -> List[Tuple[str, ProviderCall]]:
+        """Provedores configurados, na ordem de preferência ajustada pela saúde de cada um"""
+        configured = registry.providers(LLM, self)
+        return [
+            (name, lambda timeout, provider=configured[name]: provider.generate(prompt, timeout=timeout))
+            for name in order_by_health(list(configured))
+        ]
+    
+    def context_token_budget(self) -> int:
+        """Orçamento de tokens do contexto conforme o modelo preferido entre os configurados"""
+        preferred = next(iter(registry.providers(LLM, self).values()), None)
+        return token_budget_for_model(preferred.model if preferred else None)
+    
+    def model_signature(self) -> str:
+        """Identifica os modelos configurados, para compor a chave do cache de análises"""
+        return '|'.join(f"{name}:{provider.model}" for name, provider in registry.providers(LLM, self).items())
+    
+    def generate_market_analysis(self, data: Dict[str, Any], search_context: str = "",
+                                 strategy: Optional[str] = None, bypass_cache: bool = False,
+                                 mode: Optional[str] = None,
+                                 on_section: Optional[SectionCallback] = None) -> Optional[str]:
+        """Gera análise de mercado usando a melhor API disponível (com cache por prompt e modelo)"""
+        
+        if (mode or self.generation_mode).lower() == GENERATION_SECTIONED:
+            return self.generate_sectioned_analysis(data, search_context, strategy, bypass_cache, on_section)
+        
+        with self.timings.stage('prompt'):
+            prompt = self._build_analysis_prompt(data, search_context)
+        key = make_analysis_key(prompt, self.model_signature())
+        provider = None
+        
+        def compute() -> str:
+            nonlocal provider
+            text, provider = self._dispatch_analysis(prompt, strategy)
+            return text
+        
+        result, self.last_cache_status = analysis_cache.get_or_compute(key, compute, bypass=bypass_cache)
+        self.last_provider = 'cache' if self.last_cache_status in (HIT, SHARED) else provider
+        if self.last_cache_status != MISS:
+            logger.info(f"💾 Cache de análise: {self.last_cache_status}")
+        return result
+    
+    def section_groups(self) -> List[List[str]]:
+        """Grupos de seções do modo por seções (LLM_SECTION_GROUPING=groups ou single)"""
+        if self.section_grouping == 'single':
+            return [[name] for name, _ in SECTION_DESCRIPTIONS]
+        return [list(group) for group in SECTION_GROUPS]
+    
+    def generate_sectioned_analysis(self, data: Dict[str, Any], search_context: str = "",
+                                    strategy: Optional[str] = None, bypass_cache: bool = False,
+                                    on_section: Optional[SectionCallback] = None) -> Optional[str]:
+        """Gera as seções em chamadas paralelas com o mesmo contexto e as une em um único JSON
+        
+        Cada grupo tem cache e novas tentativas próprios: a falha de um grupo não
+        obriga a regenerar o documento inteiro.
+        """
+        with self.timings.stage('prompt'):
+            context_pack = build_context(search_context, data, self.context_token_budget())
+        self.last_context_stats = context_pack.to_dict()
+        signature = self.model_signature()
+        groups = self.section_groups()
+        
+        def run_group(sections: List[str]) -> SectionResult:
+            with self.timings.stage('prompt'):
+                prompt = self._build_section_prompt(data, context_pack.text, sections)
+            key = make_analysis_key(prompt, signature)
+            attempts = 0
+            provider = None
+            
+            def compute() -> str:
+                nonlocal attempts, provider
+                attempts += 1
+                text, provider = self._dispatch_analysis(prompt, strategy)
+                extraction = extract_json(text)
+                missing = [name for name in sections if name not in (extraction.data or {})]
+                if missing:
+                    # Não vai para o cache: a próxima tentativa chama a IA de novo
+                    raise ValueError(f"Seções ausentes na resposta: {', '.join(missing)}")
+                return json.dumps({name: extraction.data[name] for name in sections}, ensure_ascii=False)
+            
+            for _ in range(self.section_retries + 1):
+                try:
+                    text, status = analysis_cache.get_or_compute(key, compute, bypass=bypass_cache)
+                    return SectionResult(json.loads(text), status, attempts,
+                                         'cache' if status in (HIT, SHARED) else provider)
+                except Exception as e:
+                    logger.warning(f"Erro ao gerar seções {', '.join(sections)}: {e}")
+            FAILURES.inc(component='secao')
+            return SectionResult(None, None, attempts, None)
+        
+        merged: Dict[str, Any] = {}
+        statuses = []
+        providers = []
+        failed = []
+        total_attempts = 0
+        with ThreadPoolExecutor(max_workers=max(1, min(self.section_concurrency, len(groups))),
+                                thread_name_prefix='llm-section') as executor:
+            futures = {executor.submit(run_group, group): group for group in groups}
+            for future in as_completed(futures):
+                group = futures[future]
+                result = future.result()
+                total_attempts += result.attempts
+                if result.sections is None:
+                    failed.extend(group)
+                else:
+                    merged.update(result.sections)
+                    statuses.append(result.status)
+                    providers.append(result.provider)
+                if on_section is not None:
+                    on_section(group, result.sections is not None)
+        
+        self.last_section_stats = {
+            'grupos': len(groups),
+            'secoes_geradas': len(merged),
+            'secoes_falhas': failed,
+            'chamadas_ia': total_attempts,
+            'provedores': dict(Counter(providers)),
+        }
+        
+        if not merged:
+            raise Exception("Nenhuma seção da análise pôde ser gerada")
+        
+        if statuses and all(status == HIT for status in statuses):
+            self.last_cache_status = HIT
+        else:
+            self.last_cache_status = BYPASS if bypass_cache else MISS
+        # Um provedor por grupo: vários aparecem juntos (ex.: "gemini,openai")
+        self.last_provider = ','.join(sorted(set(providers)))
+        
+        ordered = {name: merged[name] for name, _ in SECTION_DESCRIPTIONS if name in merged}
+        return json.dumps(ordered, ensure_ascii=False)
+    
+    def _dispatch_analysis(self, prompt: str, strategy: Optional[str] = None) -> Tuple[str, str]:
+        """Envia o prompt aos provedores conforme a estratégia de despacho; retorna (texto, provedor)"""
+        providers = self._llm_providers(prompt)
+        strategy = (strategy or self.dispatch_strategy).lower()
+        
+        if strategy == DISPATCH_RACE:
+            # Corrida: todos começam juntos, vence a primeira resposta válida
+            result = self._dispatch_concurrent(providers, hedge_delay=0)
+        elif strategy == DISPATCH_HEDGED:
+            # Hedge: o próximo provedor começa se o anterior passar do limite de latência
+            result = self._dispatch_concurrent(providers, hedge_delay=self.hedge_delay)
+        else:
+            # Sequencial: OpenAI, depois Gemini, depois HuggingFace
+            result = self._dispatch_sequential(providers)
         
-        # Tentar Gemini como fallback
-        result = self.generate_analysis_with_gemini(prompt)
         if result:
             return result
         
-        # Tentar HuggingFace como último recurso
-        result = self.generate_analysis_with_huggingface(prompt)
+        FAILURES.inc(component='ia')
+        raise Exception("Nenhuma API de IA disponível funcionou")
+    
+    def _dispatch_sequential(self, providers: List[Tuple[str, ProviderCall]]) -> Optional[Tuple[str, str]]:
+        """Tenta cada provedor em ordem, respeitando o orçamento total"""
+        deadline = time.monotonic() + self.total_budget
+        
+        for index, (name, call) in enumerate(providers):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning("⏱️ Orçamento de tempo da IA esgotado")
+                break
+            
+            result = call(min(self.provider_timeout(name), remaining))
+            if result:
+                if index > 0:
+                    FALLBACKS.inc(kind='ia')
+                return result, name
+        
+        return None
+    
+    def _dispatch_concurrent(self, providers: List[Tuple[str, ProviderCall]],
+                             hedge_delay: float) -> Optional[Tuple[str, str]]:
+        """Dispara provedores escalonados por hedge_delay e retorna a primeira resposta válida"""
+        if not providers:
+            return None
+        
+        deadline = time.monotonic() + self.total_budget
+        executor = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix='llm-dispatch')
+        futures = {}
+        next_index = 0
+        next_launch = time.monotonic()
+        
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    logger.warning("⏱️ Orçamento de tempo da IA esgotado")
+                    return None
+                
+                # Lançar o próximo provedor se chegou a hora (ou se nenhum está em andamento)
+                pending = [future for future in futures if not future.done()]
+                if next_index < len(providers) and (now >= next_launch or not pending):
+                    name, call = providers[next_index]
+                    timeout = min(self.provider_timeout(name), deadline - now)
+                    future = executor.submit(call, timeout)
+                    futures[future] = next_index
+                    pending.append(future)
+                    next_index += 1
+                    next_launch = now + hedge_delay
+                    if hedge_delay == 0:
+                        continue
+                
+                if not pending:
+                    return None
+                
+                wait_until = deadline if next_index >= len(providers) else min(deadline, next_launch)
+                done, _ = wait(pending, timeout=max(0, wait_until - time.monotonic()), return_when=FIRST_COMPLETED)
+                
+                # Entre respostas simultâneas, preferir a ordem original dos provedores
+                for future in sorted(done, key=lambda f: futures[f]):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.warning(f"Erro no provedor {providers[futures[future]][0]}: {e}")
+                        result = None
+                    
+                    if result:
+                        name = providers[futures[future]][0]
+                        if futures[future] > 0:
+                            FALLBACKS.inc(kind='ia')
+                        logger.info(f"🏁 Resposta obtida de {name}")
+                        return result, name
+        finally:
+            # Os demais provedores são abandonados: nada mais espera por eles
+            # e cada chamada termina pelo próprio timeout
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def stream_market_analysis(self, data: Dict[str, Any], search_context: str = "",
+                               bypass_cache: bool = False) -> Iterator[Tuple[str, str]]:
+        """Gera análise em streaming, produzindo ('provider', nome) e depois ('token', texto)"""
+        
+        with self.timings.stage('prompt'):
+            prompt = self._build_analysis_prompt(data, search_context)
+        key = make_analysis_key(prompt, self.model_signature())
+        
+        cached = None if bypass_cache else analysis_cache.get(key)
+        if cached:
+            # Análise idêntica já gerada: entregar de uma vez
+            self.last_cache_status = HIT
+            self.last_provider = 'cache'
+            yield 'provider', 'cache'
+            yield 'token', cached
+            return
+        
+        self.last_cache_status = BYPASS if bypass_cache else MISS
+        
+        providers = registry.providers(LLM, self)
+        
+        for index, name in enumerate(order_by_health(list(providers))):
+            provider = providers[name]
+            # A vaga do limitador vale até o fim do streaming; a chamada não-streaming ocupa a sua
+            slot = StreamSlot(name) if provider.streaming else None
+            if slot is None:
+                # Provedor sem streaming (ex.: HuggingFace): o texto completo vira um único token
+                tokens = iter([provider.generate(prompt) or ''])
+            
+            try:
+                if slot is None:
+                    # A chamada não-streaming já passa pelo circuit breaker
+                    first_token = next(tokens, None)
+                else:
+                    slot.acquire()
+                    tokens = provider.stream(prompt)
+                    # Para o disjuntor, a latência registrada é o tempo até o primeiro token
+                    with guarded_call(name, limit=False):
+                        first_token = next(tokens, None)
+            except Exception as e:
+                # Falha antes do primeiro token: tentar o próximo provedor
+                logger.warning(f"Erro no streaming com {name}: {e}")
+                if slot is not None:
+                    slot.release(e)
+                continue
+            
+            if not first_token:
+                if slot is not None:
+                    slot.release()
+                continue
+            
+            chunks = [first_token]
+            self.last_provider = name
+            if index > 0:
+                FALLBACKS.inc(kind='ia')
+            error = None
+            try:
+                yield 'provider', name
+                yield 'token', first_token
+                for token in tokens:
+                    chunks.append(token)
+                    yield 'token', token
+                # Só chega aqui se o streaming terminou por completo
+                analysis_cache.set(key, ''.join(chunks))
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                close = getattr(tokens, 'close', None)
+                if close:
+                    close()
+                if slot is not None:
+                    slot.release(error)
+            return
+        
+        FAILURES.inc(component='ia')
+        raise Exception("Nenhuma API de IA disponível funcionou")
+    
+    # Caminho assíncrono (servidor ASGI): mesmas estratégias, com E/S não bloqueante
+    
+    async def agenerate_market_analysis(self, data: Dict[str, Any], search_context: str = "",
+                                        strategy: Optional[str] = None, bypass_cache: bool = False,
+                                        on_section: Optional[SectionCallback] = None) -> Optional[str]:
+        """Versão assíncrona de `generate_market_analysis`
+        
+        O modo por seções ainda usa o fluxo síncrono, executado em uma thread.
+        Sem deduplicação de análises idênticas em andamento: só o cache pronto é consultado.
+        """
+        if self.generation_mode == GENERATION_SECTIONED:
+            return await asyncio.to_thread(self.generate_sectioned_analysis, data, search_context, strategy,
+                                           bypass_cache, on_section)
+        
+        prompt, key, cached = await self._aprepare_prompt(data, search_context, bypass_cache)
+        if cached:
+            logger.info(f"💾 Cache de análise: {self.last_cache_status}")
+            return cached
+        
+        result, self.last_provider = await self._adispatch_analysis(prompt, strategy)
+        analysis_cache.set(key, result)
+        return result
+    
+    async def _aprepare_prompt(self, data: Dict[str, Any], search_context: str,
+                               bypass_cache: bool) -> Tuple[str, str, Optional[str]]:
+        """Monta o prompt fora do event loop e consulta o cache; retorna (prompt, chave, análise em cache)"""
+        with self.timings.stage('prompt'):
+            prompt = await asyncio.to_thread(self._build_analysis_prompt, data, search_context)
+        key = make_analysis_key(prompt, self.model_signature())
+        
+        cached = None if bypass_cache else analysis_cache.get(key)
+        if cached:
+            self.last_cache_status = HIT
+            self.last_provider = 'cache'
+        elif not analysis_cache.enabled:
+            self.last_cache_status = DISABLED
+        else:
+            self.last_cache_status = BYPASS if bypass_cache else MISS
+        return prompt, key, cached
+    
+    async def _adispatch_analysis(self, prompt: str, strategy: Optional[str] = None) -> Tuple[str, str]:
+        """Versão assíncrona de `_dispatch_analysis`"""
+        configured = registry.providers(LLM, self)
+        providers = [(name, configured[name]) for name in order_by_health(list(configured))]
+        strategy = (strategy or self.dispatch_strategy).lower()
+        
+        if strategy == DISPATCH_RACE:
+            result = await self._adispatch_concurrent(prompt, providers, hedge_delay=0)
+        elif strategy == DISPATCH_HEDGED:
+            result = await self._adispatch_concurrent(prompt, providers, hedge_delay=self.hedge_delay)
+        else:
+            result = await self._adispatch_sequential(prompt, providers)
+        
         if result:
             return result
         
+        FAILURES.inc(component='ia')
+        raise Exception("Nenhuma API de IA disponível funcionou")
+    
+    async def _adispatch_sequential(self, prompt: str,
+                                    providers: List[Tuple[str, LLMProvider]]) -> Optional[Tuple[str, str]]:
+        deadline = time.monotonic() + self.total_budget
+        
+        for index, (name, provider) in enumerate(providers):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning("⏱️ Orçamento de tempo da IA esgotado")
+                break
+            
+            result = await provider.agenerate(prompt, timeout=min(self.provider_timeout(name), remaining))
+            if result:
+                if index > 0:
+                    FALLBACKS.inc(kind='ia')
+                return result, name
+        
+        return None
+    
+    async def _adispatch_concurrent(self, prompt: str, providers: List[Tuple[str, LLMProvider]],
+                                    hedge_delay: float) -> Optional[Tuple[str, str]]:
+        """Provedores escalonados por hedge_delay; os perdedores são cancelados, liberando as conexões"""
+        if not providers:
+            return None
+        
+        deadline = time.monotonic() + self.total_budget
+        tasks: Dict[asyncio.Future, int] = {}
+        next_index = 0
+        next_launch = time.monotonic()
+        
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    logger.warning("⏱️ Orçamento de tempo da IA esgotado")
+                    return None
+                
+                pending = [task for task in tasks if not task.done()]
+                if next_index < len(providers) and (now >= next_launch or not pending):
+                    name, provider = providers[next_index]
+                    timeout = min(self.provider_timeout(name), deadline - now)
+                    task = asyncio.ensure_future(provider.agenerate(prompt, timeout=timeout))
+                    tasks[task] = next_index
+                    pending.append(task)
+                    next_index += 1
+                    next_launch = now + hedge_delay
+                    if hedge_delay == 0:
+                        continue
+                
+                if not pending:
+                    return None
+                
+                wait_until = deadline if next_index >= len(providers) else min(deadline, next_launch)
+                done, _ = await asyncio.wait(pending, timeout=max(0, wait_until - time.monotonic()),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                
+                for task in sorted(done, key=lambda t: tasks[t]):
+                    if task.exception() is not None:
+                        logger.warning(f"Erro no provedor {providers[tasks[task]][0]}: {task.exception()}")
+                        continue
+                    
+                    if task.result():
+                        name = providers[tasks[task]][0]
+                        if tasks[task] > 0:
+                            FALLBACKS.inc(kind='ia')
+                        logger.info(f"🏁 Resposta obtida de {name}")
+                        return task.result(), name
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def astream_market_analysis(self, data: Dict[str, Any], search_context: str = "",
+                                      bypass_cache: bool = False) -> AsyncIterator[Tuple[str, str]]:
+        """Versão assíncrona de `stream_market_analysis`"""
+        prompt, key, cached = await self._aprepare_prompt(data, search_context, bypass_cache)
+        if cached:
+            yield 'provider', 'cache'
+            yield 'token', cached
+            return
+        
+        providers = registry.providers(LLM, self)
+        
+        for index, name in enumerate(order_by_health(list(providers))):
+            provider = providers[name]
+            # A vaga do limitador vale até o fim do streaming; a chamada não-streaming ocupa a sua
+            slot = StreamSlot(name) if provider.streaming else None
+            tokens = None
+            failure = None
+            
+            try:
+                if slot is None:
+                    # A chamada não-streaming já passa pelo circuit breaker
+                    first_token = await provider.agenerate(prompt)
+                else:
+                    await slot.aacquire()
+                    tokens = provider.astream(prompt)
+                    # Para o disjuntor, a latência registrada é o tempo até o primeiro token
+                    async with aguarded_call(name, limit=False):
+                        first_token = await _first_item(tokens)
+            except Exception as e:
+                logger.warning(f"Erro no streaming com {name}: {e}")
+                first_token = None
+                failure = e
+            except BaseException as e:
+                # Cancelada antes do primeiro token: devolve a vaga sem medir o provedor
+                if slot is not None:
+                    slot.release(e)
+                raise
+            
+            if not first_token:
+                if tokens is not None:
+                    await tokens.aclose()
+                if slot is not None:
+                    slot.release(failure)
+                continue
+            
+            chunks = [first_token]
+            self.last_provider = name
+            if index > 0:
+                FALLBACKS.inc(kind='ia')
+            error = None
+            try:
+                yield 'provider', name
+                yield 'token', first_token
+                if tokens is not None:
+                    async for token in tokens:
+                        chunks.append(token)
+                        yield 'token', token
+                analysis_cache.set(key, ''.join(chunks))
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                if tokens is not None:
+                    await tokens.aclose()
+                if slot is not None:
+                    slot.release(error)
+            return
+        
+        FAILURES.inc(component='ia')
         raise Exception("Nenhuma API de IA disponível funcionou")
     
     def _build_analysis_prompt(self, data: Dict[str, Any], search_context: str) -> str:
         """Constrói o prompt para análise de mercado"""
         
+        context_pack = build_context(search_context, data, self.context_token_budget())
+        self.last_context_stats = context_pack.to_dict()
+        sections = '\n'.join(
+            f"{number}. **{name}**: {description}"
+            for number, (name, description) in enumerate(SECTION_DESCRIPTIONS, 1)
+        )
+        
+        return f"""{self._project_prompt_header(data, context_pack.text)}
+## INSTRUÇÕES:
+
+Gere uma análise ULTRA-COMPLETA em formato JSON estruturado com as seguintes seções:
+
+{sections}
+
+CRÍTICO: 
+- Use APENAS dados REAIS e baseados em pesquisa
+- Seja específico e detalhado em cada seção
+- Forneça números, estatísticas e exemplos concretos
+- Mantenha o foco no mercado brasileiro
+- Estruture tudo em JSON válido e bem formatado
+
+Responda APENAS com o JSON, sem explicações adicionais.
+"""
+    
+    def _build_section_prompt(self, data: Dict[str, Any], context_text: str, sections: List[str]) -> str:
+        """Prompt de um grupo de seções, com os mesmos dados e contexto do prompt completo"""
+        descriptions = dict(SECTION_DESCRIPTIONS)
+        listed = '\n'.join(f"- **{name}**: {descriptions[name]}" for name in sections)
+        keys = ', '.join(f'"{name}"' for name in sections)
+        
+        return f"""{self._project_prompt_header(data, context_text)}
+## INSTRUÇÕES:
+
+Esta é uma parte de uma análise ULTRA-COMPLETA. Gere APENAS as seções abaixo, em formato JSON estruturado:
+
+{listed}
+
+CRÍTICO: 
+- Use APENAS dados REAIS e baseados em pesquisa
+- Seja específico e detalhado em cada seção
+- Forneça números, estatísticas e exemplos concretos
+- Mantenha o foco no mercado brasileiro
+- O objeto JSON deve ter exatamente as chaves {keys}
+
+Responda APENAS com o JSON, sem explicações adicionais.
+"""
+    
+    def _project_prompt_header(self, data: Dict[str, Any], context_text: str) -> str:
         return f"""
 # ANÁLISE ULTRA-DETALHADA DE MERCADO - ARQV30 ENHANCED
 
@@ -156,29 +948,82 @@ Você é um DIRETOR SUPREMO DE ANÁLISE DE MERCADO com 30+ anos de experiência.
 - **Dados Adicionais**: {data.get("dados_adicionais", "Não informado")}
 
 ## CONTEXTO DE PESQUISA:
-{search_context[:8000] if search_context else "Nenhuma pesquisa adicional fornecida"}
+{context_text if context_text else "Nenhuma pesquisa adicional fornecida"}
+"""
 
-## INSTRUÇÕES:
 
-Gere uma análise ULTRA-COMPLETA em formato JSON estruturado com as seguintes seções:
+async def _first_item(items: AsyncIterator[str]) -> Optional[str]:
+    """Primeiro item do iterador assíncrono (None se vazio), sem fechá-lo"""
+    async for item in items:
+        return item
+    return None
 
-1. **avatar_ultra_detalhado**: Perfil demográfico, psicográfico, dores, desejos, objeções e jornada emocional
-2. **escopo_posicionamento**: Posicionamento de mercado, proposta de valor única, diferenciais
-3. **analise_concorrencia_profunda**: SWOT, estratégias e vulnerabilidades dos principais concorrentes
-4. **estrategia_palavras_chave**: Palavras primárias, secundárias, cauda longa e intenção de busca
-5. **metricas_performance_detalhadas**: KPIs, projeções financeiras, ROI esperado
-6. **plano_acao_detalhado**: Fases de preparação, lançamento e crescimento
-7. **insights_exclusivos_ultra**: 25+ insights únicos e valiosos
-8. **inteligencia_mercado**: Tendências, oportunidades, ameaças e gaps
-9. **drivers_mentais**: Gatilhos psicológicos e roteiros de ativação
-10. **provas_visuais_instantaneas**: Demonstrações e experimentos de impacto
 
-CRÍTICO: 
-- Use APENAS dados REAIS e baseados em pesquisa
-- Seja específico e detalhado em cada seção
-- Forneça números, estatísticas e exemplos concretos
-- Mantenha o foco no mercado brasileiro
-- Estruture tudo em JSON válido e bem formatado
+class OpenAIProvider(LLMProvider):
+    name = 'openai'
+    model = OPENAI_MODEL
+    streaming = True
 
-Responda APENAS com o JSON, sem explicações adicionais.
-"""
\ No newline at end of file
+    def __init__(self, service: AIService):
+        self.service = service
+
+    def configured(self) -> bool:
+        return bool(self.service.openai_api_key)
+
+    def generate(self, prompt: str, timeout: Optional[float] = None, max_tokens: int = 4000) -> Optional[str]:
+        return self.service.generate_analysis_with_openai(prompt, max_tokens=max_tokens, timeout=timeout)
+
+    def stream(self, prompt: str, max_tokens: int = 4000) -> Iterator[str]:
+        return self.service.stream_analysis_with_openai(prompt, max_tokens=max_tokens)
+
+    async def agenerate(self, prompt: str, timeout: Optional[float] = None, max_tokens: int = 4000) -> Optional[str]:
+        return await self.service.agenerate_analysis_with_openai(prompt, max_tokens=max_tokens, timeout=timeout)
+
+    def astream(self, prompt: str, max_tokens: int = 4000) -> AsyncIterator[str]:
+        return self.service.astream_analysis_with_openai(prompt, max_tokens=max_tokens)
+
+
+class GeminiProvider(LLMProvider):
+    name = 'gemini'
+    model = GEMINI_MODEL
+    streaming = True
+
+    def __init__(self, service: AIService):
+        self.service = service
+
+    def configured(self) -> bool:
+        return bool(self.service.gemini_api_key)
+
+    def generate(self, prompt: str, timeout: Optional[float] = None, max_tokens: int = 4000) -> Optional[str]:
+        return self.service.generate_analysis_with_gemini(prompt, timeout=timeout)
+
+    def stream(self, prompt: str, max_tokens: int = 4000) -> Iterator[str]:
+        return self.service.stream_analysis_with_gemini(prompt)
+
+    async def agenerate(self, prompt: str, timeout: Optional[float] = None, max_tokens: int = 4000) -> Optional[str]:
+        return await self.service.agenerate_analysis_with_gemini(prompt, timeout=timeout)
+
+    def astream(self, prompt: str, max_tokens: int = 4000) -> AsyncIterator[str]:
+        return self.service.astream_analysis_with_gemini(prompt)
+
+
+class HuggingFaceProvider(LLMProvider):
+    name = 'huggingface'
+
+    def __init__(self, service: AIService):
+        self.service = service
+        self.model = service.huggingface_model
+
+    def configured(self) -> bool:
+        return bool(self.service.huggingface_api_key)
+
+    def generate(self, prompt: str, timeout: Optional[float] = None, max_tokens: int = 4000) -> Optional[str]:
+        return self.service.generate_analysis_with_huggingface(prompt, timeout=timeout)
+
+    async def agenerate(self, prompt: str, timeout: Optional[float] = None, max_tokens: int = 4000) -> Optional[str]:
+        return await self.service.agenerate_analysis_with_huggingface(prompt, timeout=timeout)
+
+
+registry.register(LLM, 'openai', OpenAIProvider)
+registry.register(LLM, 'gemini', GeminiProvider)
+registry.register(LLM, 'huggingface', HuggingFaceProvider)
@@ -0,0 +1,125 @@
+import os
+import hashlib
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, Optional, Tuple
+from src.services.cache import LRUCache
+from src.services.metrics import CACHE_EVENTS
+
+HIT = 'hit'
+MISS = 'miss'
+SHARED = 'shared'
+BYPASS = 'bypass'
+DISABLED = 'disabled'
+
+
+def canonical_prompt(prompt: str) -> str:
+    """Normaliza o prompt para que diferenças de espaçamento não gerem chaves distintas"""
+    prompt = unicodedata.normalize('NFC', prompt or '')
+    lines = [line.rstrip() for line in prompt.strip().splitlines()]
+    return '\n'.join(lines)
+
+
+def make_analysis_key(prompt: str, model: str) -> str:
+    raw = f"{model}\n{canonical_prompt(prompt)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class AnalysisCache:
+    """Cache de análises da IA endereçado pelo conteúdo do prompt, com deduplicação de chamadas simultâneas"""
+
+    def __init__(self):
+        self.enabled = os.getenv('ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'
+        self.memory = LRUCache(
+            max_entries=int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', 200)),
+            default_ttl=int(os.getenv('ANALYSIS_CACHE_TTL', 6 * 3600))
+        )
+        self.wait_timeout = float(os.getenv('ANALYSIS_CACHE_WAIT_TIMEOUT', 300))
+        self._inflight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+        self.bypassed = 0
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        value = self.memory.get(key)
+        CACHE_EVENTS.inc(cache='analise', result=MISS if value is None else HIT)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        if self.enabled and value:
+            self.memory.set(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Optional[str]],
+                       bypass: bool = False) -> Tuple[Optional[str], str]:
+        """Retorna (análise, status); chamadas idênticas simultâneas compartilham uma única geração"""
+        if not self.enabled:
+            return compute(), DISABLED
+
+        if bypass:
+            with self._lock:
+                self.bypassed += 1
+            CACHE_EVENTS.inc(cache='analise', result=BYPASS)
+            value = compute()
+            self.set(key, value)
+            return value, BYPASS
+
+        with self._lock:
+            value = self.memory.get(key)
+            if value is not None:
+                CACHE_EVENTS.inc(cache='analise', result=HIT)
+                return value, HIT
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _InFlight()
+                self._inflight[key] = flight
+            else:
+                self.shared += 1
+        CACHE_EVENTS.inc(cache='analise', result=MISS if leader else SHARED)
+
+        if not leader:
+            # Outra requisição idêntica já está gerando: aguardar o resultado dela
+            if not flight.event.wait(self.wait_timeout):
+                raise TimeoutError('Tempo esgotado aguardando análise idêntica em andamento')
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, SHARED
+
+        try:
+            flight.value = compute()
+            self.set(key, flight.value)
+            return flight.value, MISS
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        return {
+            'enabled': self.enabled,
+            'entries': memory['entries'],
+            'max_entries': memory['max_entries'],
+            'hits': memory['hits'],
+            'misses': memory['misses'],
+            'evictions': memory['evictions'],
+            'shared_in_flight': self.shared,
+            'bypassed': self.bypassed,
+            'in_flight': len(self._inflight),
+        }
+
+
+analysis_cache = AnalysisCache()
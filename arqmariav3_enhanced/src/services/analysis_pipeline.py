@@ -0,0 +1,231 @@
+import time
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from src.services.ai_service import AIService, GENERATION_SECTIONED
+from src.services.search_service import SearchService, PrefetchedResults
+from src.services.analysis_store import analysis_store
+from src.services.json_extractor import IncrementalJSONParser, extract_json, EXPECTED_SECTIONS, METHOD_DIRECT
+from src.services.logging_setup import get_logger
+from src.services.metrics import StageTimings, ANALYSES, FAILURES
+
+logger = get_logger('pipeline')
+
+REQUIRED_FIELDS = ['segmento', 'produto', 'publico', 'preco']
+
+
+class AnalysisCancelled(Exception):
+    """Análise cancelada pelo cliente"""
+
+
+def validate_analysis_input(data: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Retorna a mensagem de erro de validação ou None se os dados forem válidos"""
+    if not isinstance(data, dict):
+        return 'Dados da análise não informados'
+
+    for field in REQUIRED_FIELDS:
+        if not data.get(field):
+            return f'Campo obrigatório: {field}'
+
+    return None
+
+
+def run_market_analysis(data: Dict[str, Any],
+                        progress: Optional[Callable[[str, int], None]] = None,
+                        cancel_event: Optional[threading.Event] = None,
+                        emit: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                        prefetched: Optional[PrefetchedResults] = None,
+                        include_timings: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+    """Executa pesquisa, geração com IA e parsing, retornando o JSON da análise
+
+    Com `emit`, publica eventos de cada etapa e gera o texto da IA em streaming.
+    Com `prefetched`, reaproveita resultados de busca já obtidos (ex.: em lote).
+    Com `include_timings` (ou `incluir_tempos` nos dados), os metadados trazem o
+    tempo de cada etapa e de cada query.
+    """
+    try:
+        analysis_json = _run_market_analysis(data, progress, cancel_event, emit, prefetched, include_timings)
+    except AnalysisCancelled:
+        ANALYSES.inc(status='cancelada')
+        raise
+    except Exception:
+        ANALYSES.inc(status='falha')
+        raise
+
+    ANALYSES.inc(status='falha' if analysis_json is None else 'sucesso')
+    return analysis_json
+
+
+def _run_market_analysis(data: Dict[str, Any],
+                         progress: Optional[Callable[[str, int], None]],
+                         cancel_event: Optional[threading.Event],
+                         emit: Optional[Callable[[str, Dict[str, Any]], None]],
+                         prefetched: Optional[PrefetchedResults],
+                         include_timings: Optional[bool]) -> Optional[Dict[str, Any]]:
+
+    def check_cancelled():
+        if cancel_event is not None and cancel_event.is_set():
+            raise AnalysisCancelled('Análise cancelada')
+
+    def report(stage: str, percent: int):
+        check_cancelled()
+        if progress is not None:
+            progress(stage, percent)
+        if emit is not None:
+            emit('stage', {'stage': stage, 'progress': percent})
+
+    def on_query_done(query: str, num_results: int, origin: str):
+        if emit is not None:
+            emit('search_query', {'query': query, 'results': num_results, 'origin': origin})
+
+    on_section = section_callback(emit, check_cancelled)
+
+    # Inicializar serviços
+    timings = StageTimings()
+    search_service = SearchService(timings)
+    ai_service = AIService(timings)
+    bypass_cache = bool(data.get('ignorar_cache'))
+    if include_timings is None:
+        include_timings = bool(data.get('incluir_tempos'))
+    started = time.monotonic()
+
+    # Realizar pesquisa de mercado
+    report('pesquisa', 10)
+    logger.info("🔍 Realizando pesquisa de mercado...")
+    with timings.stage('pesquisa'):
+        search_context = search_service.search_for_market_analysis(data, on_query_done=on_query_done,
+                                                                    prefetched=prefetched)
+    logger.info(f"📝 Contexto de pesquisa obtido: {len(search_context)} caracteres")
+    if emit is not None:
+        emit('context', {'chars': len(search_context), 'sources': search_context.count('--- FONTE ')})
+
+    # Gerar análise com IA
+    report('geracao_ia', 40)
+    logger.info("🤖 Gerando análise com IA...")
+    with timings.stage('geracao_ia'):
+        if emit is not None and ai_service.generation_mode != GENERATION_SECTIONED:
+            analysis_text = _stream_analysis_text(ai_service, data, search_context, emit, check_cancelled,
+                                                  bypass_cache)
+        else:
+            # No modo por seções, o progresso é informado a cada grupo concluído
+            analysis_text = ai_service.generate_market_analysis(data, search_context, bypass_cache=bypass_cache,
+                                                                on_section=on_section)
+
+    if not analysis_text:
+        return None
+
+    report('processamento', 90)
+    analysis_json = finish_analysis(data, search_context, analysis_text, search_service, ai_service, started,
+                                    include_timings)
+    report('concluido', 100)
+    return analysis_json
+
+
+def section_callback(emit: Optional[Callable[[str, Dict[str, Any]], None]],
+                     check_cancelled: Optional[Callable[[], None]] = None) -> Callable[[List[str], bool], None]:
+    """Repassa como eventos cada grupo de seções concluído no modo por seções"""
+    sections_done = []
+
+    def on_section(sections: List[str], success: bool):
+        if check_cancelled is not None:
+            check_cancelled()
+        if emit is None:
+            return
+        for section in sections:
+            if success:
+                sections_done.append(section)
+                emit('section', {'section': section, 'completed': len(sections_done), 'total': len(EXPECTED_SECTIONS)})
+            else:
+                emit('section_failed', {'section': section})
+
+    return on_section
+
+
+def finish_analysis(data: Dict[str, Any], search_context: str, analysis_text: str,
+                    search_service: SearchService, ai_service: AIService, started: float,
+                    include_timings: bool = False) -> Dict[str, Any]:
+    """Extrai o JSON do texto da IA, adiciona os metadados e guarda a análise no histórico"""
+    timings = ai_service.timings
+
+    # Extrair o JSON (tolerando cercas markdown, prosa e resposta truncada)
+    with timings.stage('parse_json'):
+        extraction = extract_json(analysis_text)
+    if extraction.data is None:
+        FAILURES.inc(component='extracao_json')
+    if extraction.data is not None:
+        analysis_json = extraction.data
+        if extraction.method != METHOD_DIRECT:
+            logger.info(f"🧩 JSON da IA obtido por {extraction.method}: "
+                        f"{len(extraction.sections_found)}/{len(EXPECTED_SECTIONS)} seções")
+    else:
+        # Se não houver JSON aproveitável, criar estrutura básica
+        analysis_json = {
+            "status": "success",
+            "raw_analysis": analysis_text,
+            "metadata": {
+                "timestamp": datetime.now().isoformat(),
+                "input_data": data,
+                "search_context_length": len(search_context)
+            }
+        }
+
+    # Adicionar metadados
+    analysis_json['dados_pesquisa'] = {
+        'timestamp_analise': datetime.now().isoformat(),
+        'entrada_usuario': data,
+        'contexto_pesquisa_chars': len(search_context),
+        'contexto_pesquisa_tokens': ai_service.last_context_stats,
+        'cache_analise': ai_service.last_cache_status,
+        'provedor_ia': ai_service.last_provider,
+        'extracao_json': extraction.to_dict(),
+        'geracao_secoes': ai_service.last_section_stats,
+        'status': 'success'
+    }
+
+    # Guardar no histórico para consultas e exportações sem nova análise
+    with timings.stage('persistencia'):
+        analysis_json['dados_pesquisa']['analise_id'] = analysis_store.save(
+            data, search_context, analysis_json,
+            provider=ai_service.last_provider,
+            latency_ms=int((time.monotonic() - started) * 1000),
+            cache_status=ai_service.last_cache_status
+        )
+
+    timings.record('total', time.monotonic() - started)
+    if include_timings:
+        analysis_json['dados_pesquisa']['tempos'] = {
+            'etapas_ms': timings.to_dict(),
+            'queries': search_service.last_query_timings,
+        }
+
+    return analysis_json
+
+
+def _stream_analysis_text(ai_service: AIService, data: Dict[str, Any], search_context: str,
+                          emit: Callable[[str, Dict[str, Any]], None],
+                          check_cancelled: Callable[[], None], bypass_cache: bool = False) -> str:
+    """Consome o streaming da IA repassando provedor, tokens e seções concluídas como eventos"""
+    chunks = []
+    parser = IncrementalJSONParser()
+    stream = ai_service.stream_market_analysis(data, search_context, bypass_cache=bypass_cache)
+
+    try:
+        for kind, value in stream:
+            check_cancelled()
+            if kind == 'provider':
+                logger.info(f"🤖 Provedor escolhido: {value}")
+                emit('provider', {'provider': value})
+            else:
+                chunks.append(value)
+                emit('token', {'text': value})
+                for section in parser.feed(value):
+                    emit('section', {
+                        'section': section,
+                        'completed': len(parser.sections_completed),
+                        'total': len(EXPECTED_SECTIONS)
+                    })
+    finally:
+        # Fecha a conexão com o provedor se o cliente desistiu no meio
+        stream.close()
+
+    return ''.join(chunks)
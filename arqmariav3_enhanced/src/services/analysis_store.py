@@ -0,0 +1,94 @@
+import os
+import json
+from typing import Any, Dict, Optional
+from flask import has_app_context
+from sqlalchemy.orm import load_only, undefer
+from src.models.user import db
+from src.models.analysis import Analysis
+from src.services.logging_setup import get_logger
+from src.services.metrics import FAILURES
+
+logger = get_logger('analysis_store')
+
+MAX_PAGE_SIZE = 100
+
+# Colunas leves usadas na listagem (o conteúdo comprimido fica de fora)
+SUMMARY_COLUMNS = (
+    Analysis.id, Analysis.user_id, Analysis.segmento, Analysis.produto, Analysis.provider,
+    Analysis.cache_status, Analysis.latency_ms, Analysis.result_size, Analysis.created_at,
+)
+
+
+def _user_id(data: Dict[str, Any]) -> Optional[int]:
+    try:
+        return int(data['user_id']) if data.get('user_id') is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class AnalysisStore:
+    """Histórico persistente das análises geradas"""
+
+    def __init__(self):
+        self.enabled = os.getenv('ANALYSIS_STORE_ENABLED', 'true').lower() == 'true'
+        self.store_context = os.getenv('ANALYSIS_STORE_CONTEXT', 'true').lower() == 'true'
+
+    def save(self, data: Dict[str, Any], search_context: str, result: Dict[str, Any],
+             provider: Optional[str] = None, latency_ms: Optional[int] = None,
+             cache_status: Optional[str] = None) -> Optional[int]:
+        """Grava a análise e retorna o id (None se desabilitado ou em caso de erro)"""
+        if not self.enabled or not has_app_context():
+            return None
+
+        try:
+            analysis = Analysis(
+                user_id=_user_id(data),
+                segmento=str(data.get('segmento', ''))[:200],
+                produto=str(data.get('produto', ''))[:300] or None,
+                provider=provider,
+                cache_status=cache_status,
+                latency_ms=latency_ms,
+                result_size=len(json.dumps(result, ensure_ascii=False)),
+                input_data=data,
+                search_context=search_context if self.store_context else None,
+                result=result,
+            )
+            db.session.add(analysis)
+            db.session.commit()
+            return analysis.id
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao salvar análise: {e}")
+            FAILURES.inc(component='historico')
+            return None
+
+    def list(self, page: int = 1, per_page: int = 20, user_id: Optional[int] = None,
+             segmento: Optional[str] = None) -> Dict[str, Any]:
+        """Página do histórico, mais recentes primeiro, sem carregar o conteúdo das análises"""
+        per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+        query = Analysis.query.options(load_only(*SUMMARY_COLUMNS))
+        if user_id is not None:
+            query = query.filter(Analysis.user_id == user_id)
+        if segmento:
+            query = query.filter(Analysis.segmento == segmento)
+
+        pagination = query.order_by(Analysis.created_at.desc(), Analysis.id.desc()) \
+            .paginate(page=max(1, page), per_page=per_page, error_out=False)
+
+        return {
+            'items': [analysis.to_summary() for analysis in pagination.items],
+            'page': pagination.page,
+            'per_page': pagination.per_page,
+            'total': pagination.total,
+            'pages': pagination.pages,
+        }
+
+    def get(self, analysis_id: int, include_context: bool = False) -> Optional[Analysis]:
+        """Análise completa; o contexto de pesquisa só é lido quando solicitado"""
+        options = [undefer(Analysis.input_data), undefer(Analysis.result)]
+        if include_context:
+            options.append(undefer(Analysis.search_context))
+        return Analysis.query.options(*options).filter(Analysis.id == analysis_id).first()
+
+
+analysis_store = AnalysisStore()
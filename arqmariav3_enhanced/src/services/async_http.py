@@ -0,0 +1,132 @@
+import os
+import time
+import asyncio
+from typing import Dict, Optional, Tuple, Union
+import httpx
+from src.services.http_client import get_timeouts, resolve_timeout, retry_max_delay
+
+# Respostas transitórias repetidas com backoff, como no pool síncrono (429 fica com o limitador).
+# POSTs não são repetidos: o provedor pode ter processado (e cobrado) a chamada
+RETRY_STATUSES = (500, 502, 503, 504)
+RETRY_METHODS = ('GET', 'HEAD')
+
+# Clientes ligados ao event loop em que foram criados (um por worker ASGI)
+_clients: Dict[int, httpx.AsyncClient] = {}
+_openai_clients: Dict[Tuple[int, str], object] = {}
+
+
+def _loop_id() -> int:
+    return id(asyncio.get_running_loop())
+
+
+def _timeout(timeout: Union[None, float, Tuple[float, float]]) -> httpx.Timeout:
+    connect_timeout, read_timeout = resolve_timeout(timeout)
+    return httpx.Timeout(read_timeout, connect=connect_timeout)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Cliente HTTP assíncrono compartilhado pelas análises do event loop atual
+
+    Uma única conexão por requisição em andamento: o limite é o número de
+    conexões (ASYNC_HTTP_MAX_CONNECTIONS), não o de threads.
+    """
+    loop_id = _loop_id()
+    client = _clients.get(loop_id)
+    if client is None or client.is_closed:
+        max_connections = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', 500))
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=int(os.getenv('ASYNC_HTTP_MAX_KEEPALIVE', 100)),
+            ),
+            timeout=_timeout(None),
+            # Erros de conexão são repetidos pelo transporte; status transitórios, em `request`
+            transport=httpx.AsyncHTTPTransport(retries=int(os.getenv('HTTP_MAX_RETRIES', 2))),
+            headers={'Connection': 'keep-alive'},
+        )
+        _clients[loop_id] = client
+    return client
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    retry_after = response.headers.get('Retry-After', '')
+    if retry_after.isdigit():
+        return float(retry_after)
+    return float(os.getenv('HTTP_RETRY_BACKOFF', 0.5)) * (2 ** attempt)
+
+
+async def request(method: str, url: str, timeout: Union[None, float, Tuple[float, float]] = None,
+                  **kwargs) -> httpx.Response:
+    """Executa uma requisição no cliente compartilhado, repetindo respostas transitórias
+
+    Todas as tentativas cabem no prazo de leitura do chamador: a espera entre elas
+    é limitada a HTTP_RETRY_MAX_DELAY e, se não couber no que resta, a resposta
+    transitória é devolvida sem nova tentativa.
+    """
+    client = get_async_client()
+    retries = int(os.getenv('HTTP_MAX_RETRIES', 2)) if method.upper() in RETRY_METHODS else 0
+    connect_timeout, read_timeout = resolve_timeout(timeout)
+    deadline = time.monotonic() + read_timeout
+    attempt_timeout = (connect_timeout, read_timeout)
+    for attempt in range(retries + 1):
+        response = await client.request(method, url, timeout=_timeout(attempt_timeout), **kwargs)
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+        delay = _retry_delay(response, attempt)
+        remaining = deadline - time.monotonic() - delay
+        if delay > retry_max_delay() or remaining <= 0:
+            return response
+        await response.aclose()
+        await asyncio.sleep(delay)
+        attempt_timeout = (min(connect_timeout, remaining), remaining)
+    return response
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request('GET', url, **kwargs)
+
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    return await request('POST', url, **kwargs)
+
+
+def stream(method: str, url: str, timeout: Union[None, float, Tuple[float, float]] = None, **kwargs):
+    """Contexto assíncrono de uma resposta lida aos poucos (ex.: SSE dos provedores de IA)"""
+    return get_async_client().stream(method, url, timeout=_timeout(timeout), **kwargs)
+
+
+def get_async_openai_client(api_key: str):
+    """Cliente AsyncOpenAI reutilizável (um por chave e event loop)"""
+    key = (_loop_id(), api_key)
+    client = _openai_clients.get(key)
+    if client is None:
+        import openai
+
+        connect_timeout, read_timeout = get_timeouts()
+        pool_size = int(os.getenv('ASYNC_OPENAI_MAX_CONNECTIONS', 100))
+        client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=os.getenv('OPENAI_BASE_URL') or None,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            # Como no cliente síncrono: sem repetir POSTs, só falhas de conexão
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(
+                    retries=int(os.getenv('HTTP_MAX_RETRIES', 2)),
+                    limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                ),
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            ),
+        )
+        _openai_clients[key] = client
+    return client
+
+
+async def aclose(loop_id: Optional[int] = None) -> None:
+    """Fecha os clientes do event loop atual (no encerramento do servidor ASGI)"""
+    loop_id = loop_id or _loop_id()
+    client = _clients.pop(loop_id, None)
+    if client is not None:
+        await client.aclose()
+    for key in [key for key in _openai_clients if key[0] == loop_id]:
+        await _openai_clients.pop(key).close()
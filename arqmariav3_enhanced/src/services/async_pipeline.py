@@ -0,0 +1,134 @@
+import time
+import asyncio
+from typing import Any, Callable, Dict, Optional
+from flask import Flask
+from src.services.ai_service import AIService, GENERATION_SECTIONED
+from src.services.search_service import SearchService, PrefetchedResults, BlockingRunner
+from src.services.analysis_pipeline import finish_analysis, section_callback
+from src.services.json_extractor import IncrementalJSONParser, EXPECTED_SECTIONS
+from src.services.logging_setup import get_logger
+from src.services.metrics import StageTimings, ANALYSES
+
+logger = get_logger('async_pipeline')
+
+# Publica um evento da análise; pode ser chamado de threads auxiliares (caches, modo por seções)
+Emit = Callable[[str, Dict[str, Any]], None]
+
+
+def blocking_runner(app: Flask) -> BlockingRunner:
+    """Executa funções bloqueantes (banco, caches em disco) em uma thread com contexto próprio da aplicação
+
+    Cada chamada abre o seu contexto: a sessão do SQLAlchemy não é compartilhada
+    entre as análises que rodam no mesmo event loop.
+    """
+
+    async def run(func: Callable[..., Any], *args: Any) -> Any:
+        def call():
+            with app.app_context():
+                return func(*args)
+
+        return await asyncio.to_thread(call)
+
+    return run
+
+
+async def run_market_analysis_async(app: Flask, data: Dict[str, Any], emit: Optional[Emit] = None,
+                                    prefetched: Optional[PrefetchedResults] = None,
+                                    include_timings: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+    """Versão assíncrona de `run_market_analysis`: a análise não ocupa uma thread enquanto espera a rede
+
+    Cancelar a tarefa (ex.: o cliente desconectou) interrompe as chamadas em andamento.
+    """
+    try:
+        analysis_json = await _run_market_analysis_async(app, data, emit, prefetched, include_timings)
+    except asyncio.CancelledError:
+        ANALYSES.inc(status='cancelada')
+        raise
+    except Exception:
+        ANALYSES.inc(status='falha')
+        raise
+
+    ANALYSES.inc(status='falha' if analysis_json is None else 'sucesso')
+    return analysis_json
+
+
+async def _run_market_analysis_async(app: Flask, data: Dict[str, Any], emit: Optional[Emit],
+                                     prefetched: Optional[PrefetchedResults],
+                                     include_timings: Optional[bool]) -> Optional[Dict[str, Any]]:
+
+    def report(stage: str, percent: int):
+        if emit is not None:
+            emit('stage', {'stage': stage, 'progress': percent})
+
+    def on_query_done(query: str, num_results: int, origin: str):
+        if emit is not None:
+            emit('search_query', {'query': query, 'results': num_results, 'origin': origin})
+
+    # Inicializar serviços
+    run_blocking = blocking_runner(app)
+    timings = StageTimings()
+    search_service = SearchService(timings)
+    ai_service = AIService(timings)
+    bypass_cache = bool(data.get('ignorar_cache'))
+    if include_timings is None:
+        include_timings = bool(data.get('incluir_tempos'))
+    started = time.monotonic()
+
+    # Realizar pesquisa de mercado
+    report('pesquisa', 10)
+    logger.info("🔍 Realizando pesquisa de mercado...")
+    with timings.stage('pesquisa'):
+        search_context = await search_service.asearch_for_market_analysis(data, on_query_done=on_query_done,
+                                                                           prefetched=prefetched,
+                                                                           run_blocking=run_blocking)
+    logger.info(f"📝 Contexto de pesquisa obtido: {len(search_context)} caracteres")
+    if emit is not None:
+        emit('context', {'chars': len(search_context), 'sources': search_context.count('--- FONTE ')})
+
+    # Gerar análise com IA
+    report('geracao_ia', 40)
+    logger.info("🤖 Gerando análise com IA...")
+    with timings.stage('geracao_ia'):
+        if emit is not None and ai_service.generation_mode != GENERATION_SECTIONED:
+            analysis_text = await _astream_analysis_text(ai_service, data, search_context, emit, bypass_cache)
+        else:
+            analysis_text = await ai_service.agenerate_market_analysis(data, search_context, bypass_cache=bypass_cache,
+                                                                       on_section=section_callback(emit))
+
+    if not analysis_text:
+        return None
+
+    # Parsing e gravação no histórico também ficam fora do event loop
+    report('processamento', 90)
+    analysis_json = await run_blocking(finish_analysis, data, search_context, analysis_text, search_service,
+                                       ai_service, started, include_timings)
+    report('concluido', 100)
+    return analysis_json
+
+
+async def _astream_analysis_text(ai_service: AIService, data: Dict[str, Any], search_context: str,
+                                 emit: Emit, bypass_cache: bool = False) -> str:
+    """Versão assíncrona de `_stream_analysis_text`"""
+    chunks = []
+    parser = IncrementalJSONParser()
+    stream = ai_service.astream_market_analysis(data, search_context, bypass_cache=bypass_cache)
+
+    try:
+        async for kind, value in stream:
+            if kind == 'provider':
+                logger.info(f"🤖 Provedor escolhido: {value}")
+                emit('provider', {'provider': value})
+            else:
+                chunks.append(value)
+                emit('token', {'text': value})
+                for section in parser.feed(value):
+                    emit('section', {
+                        'section': section,
+                        'completed': len(parser.sections_completed),
+                        'total': len(EXPECTED_SECTIONS)
+                    })
+    finally:
+        # Fecha a conexão com o provedor se o cliente desistiu no meio
+        await stream.aclose()
+
+    return ''.join(chunks)
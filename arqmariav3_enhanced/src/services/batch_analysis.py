@@ -0,0 +1,104 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from src.services.analysis_pipeline import validate_analysis_input, AnalysisCancelled
+from src.services.search_cache import normalize_query
+from src.services.search_service import SearchService, PrefetchedResults
+from src.services.logging_setup import get_logger
+
+logger = get_logger('batch')
+
+# Executa a análise de um item do lote com as buscas já resolvidas
+BatchRunner = Callable[[Dict[str, Any], PrefetchedResults, threading.Event], Optional[Dict[str, Any]]]
+
+
+class BatchTooLarge(Exception):
+    """Lote com mais itens que o permitido"""
+
+
+class BatchAnalyzer:
+    """Análises em lote: buscas deduplicadas entre os itens e geração em um pool limitado compartilhado"""
+
+    def __init__(self, max_workers: Optional[int] = None, max_items: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv('BATCH_MAX_WORKERS', 3))
+        self.max_items = max_items or int(os.getenv('BATCH_MAX_ITEMS', 50))
+        # Compartilhado entre lotes simultâneos: limita as chamadas à IA no processo
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='analysis-batch')
+
+    def check_size(self, briefs: List[Any]) -> None:
+        if len(briefs) > self.max_items:
+            raise BatchTooLarge(f'Lote com {len(briefs)} itens; máximo de {self.max_items}')
+
+    def run(self, briefs: List[Dict[str, Any]], runner: BatchRunner,
+            cancel_event: Optional[threading.Event] = None) -> Iterator[Dict[str, Any]]:
+        """Produz um evento por linha: start, um result/error por item (na ordem de conclusão) e end"""
+        self.check_size(briefs)
+        cancel_event = cancel_event or threading.Event()
+        started = time.monotonic()
+        search_service = SearchService()
+
+        valid = {}
+        errors = {}
+        for index, brief in enumerate(briefs):
+            validation_error = validate_analysis_input(brief)
+            if validation_error:
+                errors[index] = validation_error
+            else:
+                valid[index] = brief
+
+        queries = [query for brief in valid.values() for query in search_service.build_market_queries(brief)]
+        unique_queries = {normalize_query(query) for query in queries}
+
+        yield {
+            'event': 'start',
+            'total': len(briefs),
+            'valid': len(valid),
+            'queries': len(queries),
+            'unique_queries': len(unique_queries),
+        }
+
+        for index, error in errors.items():
+            yield {'event': 'error', 'index': index, 'success': False, 'error': error}
+
+        # Buscas comuns (segmento, concorrentes, gerais) são feitas uma única vez para o lote
+        prefetched = search_service.search_many(queries) if valid else {}
+        logger.info(f"📦 Lote: {len(queries)} queries, {len(unique_queries)} únicas")
+
+        futures = {self._executor.submit(runner, brief, prefetched, cancel_event): index
+                   for index, brief in valid.items()}
+        succeeded = 0
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    analysis_json = future.result()
+                except AnalysisCancelled:
+                    continue
+                except Exception as e:
+                    logger.error(f"❌ Erro no item {index} do lote: {str(e)}")
+                    yield {'event': 'error', 'index': index, 'success': False, 'error': str(e)}
+                    continue
+
+                if analysis_json is None:
+                    yield {'event': 'error', 'index': index, 'success': False,
+                           'error': 'Falha ao gerar análise com IA'}
+                else:
+                    succeeded += 1
+                    yield {'event': 'result', 'index': index, 'success': True, 'analysis': analysis_json}
+        finally:
+            # Cliente desconectou (ou o lote terminou): descartar o que ainda não começou
+            cancel_event.set()
+            for future in futures:
+                future.cancel()
+
+        yield {
+            'event': 'end',
+            'succeeded': succeeded,
+            'failed': len(briefs) - succeeded,
+            'elapsed_seconds': round(time.monotonic() - started, 2),
+        }
+
+
+batch_analyzer = BatchAnalyzer()
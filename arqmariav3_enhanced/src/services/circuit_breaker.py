@@ -0,0 +1,309 @@
+import os
+import time
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+from src.services.concurrency_limiter import AdaptiveLimiter, get_limiter, limiter_enabled, throttle_info
+from src.services.logging_setup import get_logger
+from src.services.metrics import PROVIDER_CALL_SECONDS, FAILURES
+
+logger = get_logger('circuit_breaker')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Latência (s) a partir da qual uma chamada conta como lenta, por provedor
+DEFAULT_SLOW_CALL_SECONDS = {
+    'serper': 5,
+    'google': 5,
+    'jina': 15,
+    'openai': 90,
+    'gemini': 60,
+    'huggingface': 60,
+}
+
+
+class CircuitOpenError(Exception):
+    """Provedor ignorado porque o circuit breaker está aberto"""
+
+
+class CircuitBreaker:
+    """Disjuntor por provedor com janelas móveis de erro e latência e sondagem half-open"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.window_seconds = float(os.getenv('CB_WINDOW_SECONDS', 60))
+        self.min_calls = int(os.getenv('CB_MIN_CALLS', 5))
+        self.error_threshold = float(os.getenv('CB_ERROR_THRESHOLD', 0.5))
+        self.slow_call_seconds = float(os.getenv(f'CB_SLOW_CALL_SECONDS_{name.upper()}',
+                                                 DEFAULT_SLOW_CALL_SECONDS.get(name, 30)))
+        self.slow_call_threshold = float(os.getenv('CB_SLOW_CALL_RATE', 0.8))
+        self.open_seconds = float(os.getenv('CB_OPEN_SECONDS', 30))
+        self.half_open_max_calls = int(os.getenv('CB_HALF_OPEN_CALLS', 1))
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.times_opened = 0
+        self._calls: Deque[Tuple[float, bool, float]] = deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            self._calls.popleft()
+
+    def _rates(self) -> Tuple[float, float, float]:
+        """Retorna (taxa de erro, taxa de chamadas lentas, latência média) da janela"""
+        total = len(self._calls)
+        if total == 0:
+            return 0.0, 0.0, 0.0
+
+        errors = sum(1 for _, ok, _ in self._calls if not ok)
+        slow = sum(1 for _, _, latency in self._calls if latency >= self.slow_call_seconds)
+        avg_latency = sum(latency for _, _, latency in self._calls) / total
+        return errors / total, slow / total, avg_latency
+
+    def allow(self) -> bool:
+        """Indica se uma chamada pode ser feita agora (reserva a sondagem em half-open)"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self.half_open_calls = 0
+
+            if self.state == HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    return False
+                self.half_open_calls += 1
+
+            return True
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        logger.warning(f"⚡ Circuit breaker aberto para {self.name}")
+
+    def _record(self, ok: bool, latency: float):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.half_open_calls = max(0, self.half_open_calls - 1)
+                if ok and latency < self.slow_call_seconds:
+                    # Sondagem bem-sucedida: fechar e recomeçar a janela
+                    self.state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open(now)
+                self._calls.append((now, ok, latency))
+                return
+
+            self._calls.append((now, ok, latency))
+            self._prune(now)
+
+            if self.state == CLOSED and len(self._calls) >= self.min_calls:
+                error_rate, slow_rate, _ = self._rates()
+                if error_rate >= self.error_threshold or slow_rate >= self.slow_call_threshold:
+                    self._open(now)
+
+    def record_success(self, latency: float):
+        self._record(True, latency)
+
+    def record_failure(self, latency: float):
+        self._record(False, latency)
+
+    def release_probe(self):
+        """Libera a sondagem reservada sem registrar resultado (429 ou chamada cancelada)"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.half_open_calls = max(0, self.half_open_calls - 1)
+
+    def health_score(self) -> float:
+        """Pontuação de 0 (indisponível) a 1 (saudável)"""
+        with self._lock:
+            self._prune(time.monotonic())
+            if self.state == OPEN:
+                return 0.0
+
+            # Sem chamadas suficientes na janela, não há evidência para rebaixar o provedor
+            if len(self._calls) < self.min_calls:
+                return 1.0
+
+            error_rate, _, avg_latency = self._rates()
+            latency_factor = 1.0 / (1.0 + avg_latency / self.slow_call_seconds)
+            score = (1.0 - error_rate) * (0.5 + 0.5 * latency_factor)
+            return score * (0.5 if self.state == HALF_OPEN else 1.0)
+
+    def ready_for_probe(self) -> bool:
+        """Indica se o disjuntor aceitaria agora uma chamada de sondagem"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.open_seconds
+            return self.state == HALF_OPEN and self.half_open_calls < self.half_open_max_calls
+
+    def snapshot(self) -> Dict[str, Any]:
+        score = self.health_score()
+        with self._lock:
+            error_rate, slow_rate, avg_latency = self._rates()
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self.opened_at)) if self.state == OPEN else 0.0
+            return {
+                'state': self.state,
+                'health_score': round(score, 3),
+                'calls_in_window': len(self._calls),
+                'error_rate': round(error_rate, 3),
+                'slow_call_rate': round(slow_rate, 3),
+                'avg_latency_seconds': round(avg_latency, 3),
+                'times_opened': self.times_opened,
+                'retry_in_seconds': round(retry_in, 1),
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+def _allow(name: str, limiter: Optional[AdaptiveLimiter]) -> CircuitBreaker:
+    breaker = get_breaker(name)
+    if not breaker.allow():
+        if limiter is not None:
+            limiter.release()
+        FAILURES.inc(component=f'circuito_aberto:{name}')
+        raise CircuitOpenError(f"Circuit breaker aberto para {name}")
+    return breaker
+
+
+def _record_success(name: str, breaker: CircuitBreaker, limiter: Optional[AdaptiveLimiter], start: float):
+    elapsed = time.monotonic() - start
+    breaker.record_success(elapsed)
+    if limiter is not None:
+        limiter.release(latency=elapsed)
+    PROVIDER_CALL_SECONDS.observe(elapsed, provider=name, outcome='sucesso')
+
+
+def _record_error(name: str, breaker: CircuitBreaker, limiter: Optional[AdaptiveLimiter], start: float,
+                  error: BaseException):
+    elapsed = time.monotonic() - start
+    if not isinstance(error, Exception):
+        # Cancelamento (cliente desconectou): não diz nada sobre o provedor
+        breaker.release_probe()
+        if limiter is not None:
+            limiter.release()
+        return
+
+    throttled, retry_after = throttle_info(error)
+    if throttled:
+        breaker.release_probe()
+    else:
+        breaker.record_failure(elapsed)
+    if limiter is not None:
+        limiter.release(throttled=throttled, retry_after=retry_after)
+    PROVIDER_CALL_SECONDS.observe(elapsed, provider=name, outcome='limitado' if throttled else 'erro')
+
+
+@contextmanager
+def guarded_call(name: str, limit: bool = True) -> Iterator[CircuitBreaker]:
+    """Executa o bloco sob o limitador de concorrência e o disjuntor do provedor
+
+    Espera por uma vaga no limitador (ProviderThrottled se não houver a tempo) e
+    registra sucesso, falha, 429 e latência. O tempo na fila não conta como latência.
+    Com `limit=False` só o disjuntor é usado (a vaga já é de um StreamSlot).
+    """
+    limiter = get_limiter(name) if limit and limiter_enabled() else None
+    if limiter is not None:
+        limiter.acquire()
+    breaker = _allow(name, limiter)
+
+    start = time.monotonic()
+    try:
+        yield breaker
+    except BaseException as e:
+        _record_error(name, breaker, limiter, start, e)
+        raise
+    _record_success(name, breaker, limiter, start)
+
+
+@asynccontextmanager
+async def aguarded_call(name: str, limit: bool = True) -> AsyncIterator[CircuitBreaker]:
+    """Versão assíncrona de `guarded_call`: a espera no limitador não bloqueia o event loop"""
+    limiter = get_limiter(name) if limit and limiter_enabled() else None
+    if limiter is not None:
+        await limiter.aacquire()
+    breaker = _allow(name, limiter)
+
+    start = time.monotonic()
+    try:
+        yield breaker
+    except BaseException as e:
+        _record_error(name, breaker, limiter, start, e)
+        raise
+    _record_success(name, breaker, limiter, start)
+
+
+class StreamSlot:
+    """Vaga do limitador ocupada por um streaming inteiro, do pedido até esgotar ou fechar
+
+    O disjuntor mede só o tempo até o primeiro token (guarded_call com limit=False),
+    mas a chamada ocupa o provedor até o último: o limitador conta os streams
+    simultâneos e recebe a duração total. `release` pode ser chamado mais de uma vez.
+    """
+
+    def __init__(self, name: str):
+        self.limiter = get_limiter(name) if limiter_enabled() else None
+        self._start: Optional[float] = None
+
+    def acquire(self) -> None:
+        if self.limiter is not None:
+            self.limiter.acquire()
+            self._start = time.monotonic()
+
+    async def aacquire(self) -> None:
+        if self.limiter is not None:
+            await self.limiter.aacquire()
+            self._start = time.monotonic()
+
+    def release(self, error: Optional[BaseException] = None) -> None:
+        """Devolve a vaga; sem erro informa a duração, com 429 pausa o provedor"""
+        if self._start is None:
+            return
+        limiter, start, self._start = self.limiter, self._start, None
+        if error is None:
+            limiter.release(latency=time.monotonic() - start)
+        elif isinstance(error, Exception):
+            throttled, retry_after = throttle_info(error)
+            limiter.release(throttled=throttled, retry_after=retry_after)
+        else:
+            # Cliente fechou o stream: não diz nada sobre o provedor
+            limiter.release()
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    names = sorted(set(DEFAULT_SLOW_CALL_SECONDS) | set(_breakers))
+    return {name: get_breaker(name).snapshot() for name in names}
+
+
+def order_by_health(providers: List[str]) -> List[str]:
+    """Ordena provedores pela saúde, mantendo a ordem de preferência em caso de empate
+
+    Provedores com disjuntor aberto vão para o fim; quando o período aberto expira,
+    o provedor volta à sua posição original para receber a chamada de sondagem.
+    """
+
+    def key(item):
+        index, name = item
+        breaker = get_breaker(name)
+        if breaker.state != CLOSED:
+            return (0, -1.0, index) if breaker.ready_for_probe() else (1, 0, index)
+        return 0, -round(breaker.health_score(), 1), index
+
+    return [name for _, name in sorted(enumerate(providers), key=key)]
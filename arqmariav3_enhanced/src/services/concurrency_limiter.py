@@ -0,0 +1,277 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+from src.services.logging_setup import get_logger
+from src.services.metrics import PROVIDER_THROTTLES
+from src.services.waiters import AsyncWaiter, ThreadWaiter
+
+logger = get_logger('limiter')
+
+# Concorrência (inicial, máxima) por provedor; o limite se ajusta entre 1 e a máxima
+DEFAULT_LIMITS = {
+    'serper': (10, 50),
+    'google': (5, 20),
+    'jina': (10, 40),
+    'openai': (8, 64),
+    'gemini': (8, 64),
+    'huggingface': (2, 8),
+}
+
+# Latência acima de N vezes a de referência reduz o limite. As respostas dos LLMs
+# variam com o tamanho do texto gerado, então neles só o 429 reduz (0 desativa)
+DEFAULT_LATENCY_TOLERANCE = {
+    'serper': 2.0,
+    'google': 2.0,
+    'jina': 3.0,
+    'openai': 0,
+    'gemini': 0,
+    'huggingface': 0,
+}
+
+
+class ProviderThrottled(Exception):
+    """Provedor limitando requisições: fila do limitador cheia ou pausa por Retry-After longa demais"""
+
+    def __init__(self, provider: str, retry_after: Optional[float], message: str):
+        super().__init__(message)
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After em segundos (aceita número ou data HTTP)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def throttle_info(error: BaseException) -> Tuple[bool, Optional[float]]:
+    """Indica se a exceção é um 429 do provedor e o Retry-After informado
+
+    Cobre requests.HTTPError, httpx.HTTPStatusError, openai.RateLimitError e o stub.
+    """
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if status != 429:
+        return False, None
+    headers = getattr(response, 'headers', None) or getattr(error, 'headers', None) or {}
+    return True, parse_retry_after(headers.get('Retry-After'))
+
+
+class AdaptiveLimiter:
+    """Limite de chamadas simultâneas a um provedor, ajustado por AIMD
+
+    - sucesso com o limite em uso e latência normal: +1/limite (≈ +1 a cada `limite` chamadas);
+    - 429: limite × LIMITER_BACKOFF e nenhuma chamada nova até o fim do Retry-After;
+    - latência recente acima de LIMITER_LATENCY_TOLERANCE × a de referência: limite × 0.9.
+
+    As reduções acontecem no máximo uma vez por intervalo, para que uma rajada de
+    429 das chamadas já em andamento não derrube o limite a 1. Chamadas acima do
+    limite esperam até LIMITER_QUEUE_TIMEOUT segundos numa fila de até
+    LIMITER_QUEUE_SIZE posições; as demais levantam ProviderThrottled. Cada
+    parâmetro aceita o sufixo _<PROVEDOR> (ex.: LIMITER_MAX_SERPER).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        initial, maximum = DEFAULT_LIMITS.get(name, (16, 64))
+        self.max_limit = max(1, int(self._setting('MAX', maximum)))
+        self.limit = float(min(self.max_limit, max(1, int(self._setting('INITIAL', initial)))))
+        self.backoff = float(self._setting('BACKOFF', 0.5))
+        self.latency_backoff = float(self._setting('LATENCY_BACKOFF', 0.9))
+        self.latency_tolerance = float(self._setting('LATENCY_TOLERANCE', DEFAULT_LATENCY_TOLERANCE.get(name, 2.0)))
+        self.queue_size = int(self._setting('QUEUE_SIZE', 100))
+        self.queue_timeout = float(self._setting('QUEUE_TIMEOUT', 10))
+        # Pausa usada quando o 429 vem sem Retry-After
+        self.default_pause = float(self._setting('DEFAULT_PAUSE', 1))
+
+        self.in_flight = 0
+        # Latência (s): média recente e de referência (desce junto com a recente, sobe devagar)
+        self.recent: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self._waiters: Deque[Any] = deque()
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def _setting(self, key: str, default: Any) -> str:
+        return os.getenv(f'LIMITER_{key}_{self.name.upper()}', os.getenv(f'LIMITER_{key}', str(default)))
+
+    def _capacity(self) -> int:
+        return max(1, int(self.limit))
+
+    def _paused_for(self, now: float) -> float:
+        return max(0.0, self.paused_until - now)
+
+    def _enter(self, waiter_class):
+        """Ocupa uma vaga (retorna None) ou entra na fila de espera (retorna o waiter)"""
+        now = time.monotonic()
+        with self._lock:
+            paused_for = self._paused_for(now)
+            if not paused_for and self.in_flight < self._capacity() and not self._waiters:
+                self.in_flight += 1
+                return None
+            if paused_for > self.queue_timeout:
+                reason = 'pausa'
+                message = f'{self.name} pediu para aguardar {paused_for:.0f}s (Retry-After)'
+            elif len(self._waiters) >= self.queue_size:
+                reason = 'fila_cheia'
+                message = f'{self.name}: {self.in_flight} chamadas em andamento e fila do limitador cheia'
+            else:
+                waiter = waiter_class()
+                self._waiters.append(waiter)
+                self._dispatch(now)
+                return waiter
+
+        PROVIDER_THROTTLES.inc(provider=self.name, reason=reason)
+        raise ProviderThrottled(self.name, paused_for or None, message)
+
+    def _leave_queue(self, waiter) -> None:
+        """Depois da espera: segue se o waiter recebeu a vaga, senão sai da fila e falha"""
+        with self._lock:
+            if waiter.admitted:
+                return
+            self._waiters.remove(waiter)
+            paused_for = self._paused_for(time.monotonic())
+
+        PROVIDER_THROTTLES.inc(provider=self.name, reason='espera')
+        raise ProviderThrottled(self.name, paused_for or None,
+                                f'{self.name}: tempo de espera no limitador esgotado ({self.queue_timeout:g}s)')
+
+    def _cancel_wait(self, waiter) -> None:
+        """Corrotina cancelada na fila: devolve a vaga se ela já tinha chegado"""
+        with self._lock:
+            if not waiter.admitted:
+                self._waiters.remove(waiter)
+                return
+        self.release()
+
+    def acquire(self) -> None:
+        """Ocupa uma vaga, esperando na fila se preciso; levanta ProviderThrottled"""
+        waiter = self._enter(ThreadWaiter)
+        if waiter is not None:
+            waiter.wait(self.queue_timeout)
+            self._leave_queue(waiter)
+
+    async def aacquire(self) -> None:
+        """Versão assíncrona de `acquire`: a espera não ocupa uma thread"""
+        waiter = self._enter(AsyncWaiter)
+        if waiter is not None:
+            try:
+                await waiter.wait(self.queue_timeout)
+            except asyncio.CancelledError:
+                self._cancel_wait(waiter)
+                raise
+            self._leave_queue(waiter)
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False,
+                retry_after: Optional[float] = None) -> None:
+        """Devolve a vaga; `latency` (sucesso) e `throttled` (429) ajustam o limite"""
+        now = time.monotonic()
+        with self._lock:
+            saturated = self.in_flight >= self._capacity() or bool(self._waiters)
+            self.in_flight -= 1
+            if throttled:
+                self._on_throttle(now, retry_after)
+            elif latency is not None:
+                self._on_success(now, latency, saturated)
+            self._dispatch(now)
+
+    def _can_decrease(self, now: float) -> bool:
+        # Uma redução por "ida e volta": as chamadas já em voo ainda refletem o limite antigo
+        return now - self.last_decrease >= max(1.0, self.baseline or 0.0)
+
+    def _on_throttle(self, now: float, retry_after: Optional[float]) -> None:
+        self.throttled += 1
+        PROVIDER_THROTTLES.inc(provider=self.name, reason='429')
+        pause = self.default_pause if retry_after is None else retry_after
+        self.paused_until = max(self.paused_until, now + pause)
+        if self._can_decrease(now):
+            previous = self.limit
+            self.limit = max(1.0, self.limit * self.backoff)
+            self.last_decrease = now
+            logger.warning(f"🚦 {self.name} respondeu 429: limite {previous:.1f} → {self.limit:.1f}, "
+                           f"pausa de {pause:.1f}s")
+
+    def _on_success(self, now: float, latency: float, saturated: bool) -> None:
+        if self.recent is None:
+            self.recent = self.baseline = latency
+        else:
+            self.recent += (latency - self.recent) * 0.2
+            self.baseline = min(self.recent, self.baseline + (latency - self.baseline) * 0.02)
+
+        if self.latency_tolerance > 0 and self.recent > self.baseline * self.latency_tolerance:
+            if self._can_decrease(now):
+                self.limit = max(1.0, self.limit * self.latency_backoff)
+                self.last_decrease = now
+            return
+        if saturated:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+    def _dispatch(self, now: float) -> None:
+        """Entrega vagas livres aos primeiros da fila; durante a pausa, agenda a retomada"""
+        paused_for = self._paused_for(now)
+        if paused_for:
+            if self._waiters and self._timer is None:
+                self._timer = threading.Timer(paused_for, self._resume)
+                self._timer.daemon = True
+                self._timer.start()
+            return
+
+        while self._waiters and self.in_flight < self._capacity():
+            if self._waiters.popleft().wake():
+                self.in_flight += 1
+
+    def _resume(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._dispatch(time.monotonic())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'limit': round(self.limit, 2),
+                'max_limit': self.max_limit,
+                'in_flight': self.in_flight,
+                'waiting': len(self._waiters),
+                'paused_for_seconds': round(self._paused_for(time.monotonic()), 1),
+                'recent_latency_seconds': round(self.recent, 3) if self.recent is not None else None,
+                'baseline_latency_seconds': round(self.baseline, 3) if self.baseline is not None else None,
+                'throttled_responses': self.throttled,
+            }
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_enabled() -> bool:
+    return os.getenv('LIMITER_ENABLED', 'true').lower() == 'true'
+
+
+def get_limiter(name: str) -> AdaptiveLimiter:
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.setdefault(name, AdaptiveLimiter(name))
+    return limiter
+
+
+def limiter_states() -> Dict[str, Dict[str, Any]]:
+    names = sorted(set(DEFAULT_LIMITS) | set(_limiters))
+    return {name: get_limiter(name).snapshot() for name in names}
+
@@ -0,0 +1,167 @@
+import os
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from urllib.parse import urlsplit, urlunsplit
+from flask import has_app_context
+from src.models.user import db
+from src.models.content_cache import ExtractedContent
+from src.services.cache import LRUCache
+from src.services.metrics import CACHE_EVENTS, FAILURES
+from src.services.logging_setup import get_logger
+
+logger = get_logger('content_cache')
+
+
+def normalize_url(url: str) -> str:
+    """Remove fragmento e barra final para deduplicar URLs equivalentes"""
+    parts = urlsplit((url or '').strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+class ContentCache:
+    """Cache do conteúdo extraído de páginas, por URL, com validadores ETag/Last-Modified
+
+    Entradas vencidas continuam disponíveis para revalidação condicional.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('CONTENT_CACHE_ENABLED', 'true').lower() == 'true'
+        self.ttl = int(os.getenv('CONTENT_CACHE_TTL', 7 * 24 * 3600))
+        self.disk_max_entries = int(os.getenv('CONTENT_CACHE_DISK_MAX_ENTRIES', 5000))
+        # Na memória, as entradas ficam além do TTL para permitir revalidação
+        self.memory = LRUCache(max_entries=int(os.getenv('CONTENT_CACHE_MAX_ENTRIES', 200)),
+                               default_ttl=self.ttl * 4)
+        self._lock = threading.Lock()
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def lookup(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Retorna {url: entrada}; cada entrada indica se ainda está fresca (`fresh`)"""
+        if not self.enabled or not urls:
+            return {}
+
+        found = {}
+        missing = []
+        for url in urls:
+            entry = self.memory.get(url_hash(url))
+            if entry is not None:
+                found[url] = dict(entry)
+            else:
+                missing.append(url)
+
+        if missing and has_app_context():
+            found.update(self._disk_lookup(missing))
+
+        now = time.time()
+        for entry in found.values():
+            entry['fresh'] = entry['expires_at'] > now
+
+        fresh = sum(1 for entry in found.values() if entry['fresh'])
+        with self._lock:
+            self.fresh_hits += fresh
+            self.stale_hits += len(found) - fresh
+            self.misses += len(urls) - len(found)
+        CACHE_EVENTS.inc(fresh, cache='conteudo', result='hit')
+        CACHE_EVENTS.inc(len(found) - fresh, cache='conteudo', result='stale')
+        CACHE_EVENTS.inc(len(urls) - len(found), cache='conteudo', result='miss')
+        return found
+
+    def _disk_lookup(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        try:
+            hashes = {url_hash(url): url for url in urls}
+            now = datetime.utcnow()
+            for row in ExtractedContent.query.filter(ExtractedContent.url_hash.in_(list(hashes))).all():
+                row.last_accessed = now
+                entry = {
+                    'content': row.content,
+                    'etag': row.etag,
+                    'last_modified': row.last_modified,
+                    'expires_at': (row.expires_at - datetime(1970, 1, 1)).total_seconds(),
+                }
+                found[hashes[row.url_hash]] = entry
+                self.memory.set(row.url_hash, dict(entry))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao ler cache de conteúdo: {e}")
+            FAILURES.inc(component='cache_conteudo')
+        return found
+
+    def store(self, items: Dict[str, Dict[str, Any]], revalidated: int = 0) -> None:
+        """Grava {url: {'content', 'etag', 'last_modified'}} renovando o TTL"""
+        if not self.enabled or not items:
+            return
+
+        expires_at = time.time() + self.ttl
+        for url, item in items.items():
+            self.memory.set(url_hash(url), {
+                'content': item['content'],
+                'etag': item.get('etag'),
+                'last_modified': item.get('last_modified'),
+                'expires_at': expires_at,
+            })
+
+        with self._lock:
+            self.revalidated += revalidated
+
+        if has_app_context():
+            self._disk_store(items)
+
+    def _disk_store(self, items: Dict[str, Dict[str, Any]]) -> None:
+        try:
+            now = datetime.utcnow()
+            hashes = {url_hash(url): url for url in items}
+            existing = {
+                row.url_hash: row
+                for row in ExtractedContent.query.filter(ExtractedContent.url_hash.in_(list(hashes))).all()
+            }
+
+            for key, url in hashes.items():
+                item = items[url]
+                row = existing.get(key)
+                if row is None:
+                    row = ExtractedContent(url_hash=key)
+                    db.session.add(row)
+                row.url = normalize_url(url)
+                row.content = item['content']
+                row.etag = (item.get('etag') or None) and item['etag'][:255]
+                row.last_modified = (item.get('last_modified') or None) and item['last_modified'][:64]
+                row.fetched_at = now
+                row.last_accessed = now
+                row.expires_at = now + timedelta(seconds=self.ttl)
+
+            db.session.commit()
+
+            overflow = ExtractedContent.query.count() - self.disk_max_entries
+            if overflow > 0:
+                oldest = db.session.query(ExtractedContent.id).order_by(ExtractedContent.last_accessed.asc()).limit(overflow)
+                ExtractedContent.query.filter(ExtractedContent.id.in_(oldest.scalar_subquery())).delete(synchronize_session=False)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao gravar cache de conteúdo: {e}")
+            FAILURES.inc(component='cache_conteudo')
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'fresh_hits': self.fresh_hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'memory_entries': len(self.memory),
+        }
+
+
+content_cache = ContentCache()
@@ -0,0 +1,228 @@
+import os
+import re
+import math
+import hashlib
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # opcional: sem tiktoken, usa estimativa por caracteres
+    tiktoken = None
+
+# Orçamento de tokens do contexto de pesquisa por modelo
+MODEL_TOKEN_BUDGETS = {
+    'gpt-4-turbo-preview': 4000,
+    'gemini-pro': 4000,
+    'microsoft/DialoGPT-medium': 400,
+}
+DEFAULT_TOKEN_BUDGET = 3000
+
+# Campos da entrada usados para medir a relevância das fontes
+RELEVANCE_FIELDS = ['segmento', 'produto', 'publico', 'concorrentes', 'dados_adicionais']
+
+STOPWORDS = {
+    'a', 'ao', 'aos', 'as', 'com', 'como', 'da', 'das', 'de', 'do', 'dos', 'e', 'em', 'entre', 'na', 'nas',
+    'no', 'nos', 'o', 'os', 'ou', 'para', 'pela', 'pelo', 'por', 'que', 'se', 'sem', 'sua', 'seu', 'um',
+    'uma', 'mais', 'muito', 'sobre', 'the', 'and', 'of', 'to', 'in', 'for', 'anos', 'r$'
+}
+
+SOURCE_HEADER = re.compile(r'^--- FONTE \d+: (.*) ---$', re.MULTILINE)
+
+# Tamanho do esboço MinHash (bottom-k) usado na deduplicação
+MINHASH_SIZE = 64
+
+_encoder = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Conta tokens com tiktoken (cl100k_base) ou estima ~3,5 caracteres por token"""
+    global _encoder
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _encoder is None:
+            _encoder = tiktoken.get_encoding('cl100k_base')
+        return len(_encoder.encode(text))
+    return math.ceil(len(text) / 3.5)
+
+
+def token_budget_for_model(model: Optional[str]) -> int:
+    """Orçamento de tokens do contexto (CONTEXT_TOKEN_BUDGET sobrepõe o valor por modelo)"""
+    if os.getenv('CONTEXT_TOKEN_BUDGET'):
+        return int(os.getenv('CONTEXT_TOKEN_BUDGET'))
+    return MODEL_TOKEN_BUDGETS.get(model or '', DEFAULT_TOKEN_BUDGET)
+
+
+def _terms(text: str) -> List[str]:
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return [word for word in re.findall(r'[a-z0-9$]+', text) if len(word) > 2 and word not in STOPWORDS]
+
+
+def _minhash(terms: List[str], shingle_size: int = 3) -> Optional[List[int]]:
+    """Esboço MinHash bottom-k dos shingles de palavras do texto"""
+    if len(terms) < shingle_size:
+        shingles = {' '.join(terms)} if terms else set()
+    else:
+        shingles = {' '.join(terms[i:i + shingle_size]) for i in range(len(terms) - shingle_size + 1)}
+    if not shingles:
+        return None
+
+    hashed = {int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), 'big') for s in shingles}
+    return sorted(hashed)[:MINHASH_SIZE]
+
+
+def _similarity(sketch_a: Optional[List[int]], sketch_b: Optional[List[int]]) -> float:
+    """Estimativa de Jaccard entre dois esboços bottom-k"""
+    if not sketch_a or not sketch_b:
+        return 0.0
+    set_a, set_b = set(sketch_a), set(sketch_b)
+    union = sorted(set_a | set_b)[:MINHASH_SIZE]
+    return sum(1 for h in union if h in set_a and h in set_b) / len(union)
+
+
+class Source:
+    def __init__(self, position: int, title: str, body: str):
+        self.position = position
+        self.title = title
+        self.body = body
+        self.terms = _terms(f"{title} {body}")
+        self.signature = _minhash(_terms(body) or self.terms)
+        self.score = 0.0
+
+    def render(self, number: int, body: Optional[str] = None) -> str:
+        return f"--- FONTE {number}: {self.title} ---\n{(body if body is not None else self.body).strip()}\n"
+
+
+class ContextPack:
+    """Contexto montado e as estatísticas de montagem"""
+
+    def __init__(self, text: str, tokens_used: int, token_budget: int, sources_total: int,
+                 sources_included: int, duplicates_removed: int, truncated_sources: int):
+        self.text = text
+        self.tokens_used = tokens_used
+        self.token_budget = token_budget
+        self.sources_total = sources_total
+        self.sources_included = sources_included
+        self.duplicates_removed = duplicates_removed
+        self.truncated_sources = truncated_sources
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'tokens_usados': self.tokens_used,
+            'orcamento_tokens': self.token_budget,
+            'fontes_total': self.sources_total,
+            'fontes_incluidas': self.sources_included,
+            'duplicadas_removidas': self.duplicates_removed,
+            'fontes_truncadas': self.truncated_sources,
+        }
+
+
+def parse_sources(search_context: str) -> List[Source]:
+    """Divide o contexto formatado por SearchService em fontes"""
+    matches = list(SOURCE_HEADER.finditer(search_context or ''))
+    sources = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(search_context)
+        sources.append(Source(i, match.group(1), search_context[match.end():end].strip('\n')))
+    return sources
+
+
+def _rank(sources: List[Source], data: Dict[str, Any]) -> None:
+    """Pontua cada fonte pela relevância (estilo BM25) aos campos da entrada"""
+    query_terms = set(_terms(' '.join(str(data.get(field, '')) for field in RELEVANCE_FIELDS)))
+    if not sources:
+        return
+
+    doc_freq = {term: sum(1 for source in sources if term in source.terms) for term in query_terms}
+    avg_len = sum(len(source.terms) for source in sources) / len(sources) or 1
+    title_terms = [set(_terms(source.title)) for source in sources]
+
+    for source, titles in zip(sources, title_terms):
+        counts = {}
+        for term in source.terms:
+            if term in query_terms:
+                counts[term] = counts.get(term, 0) + 1
+
+        score = 0.0
+        for term, tf in counts.items():
+            idf = math.log(1 + (len(sources) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * len(source.terms) / avg_len))
+            if term in titles:
+                score += idf * 0.5
+
+        # Desempate pela posição original (ordem das queries e do buscador)
+        source.score = score - source.position * 1e-3
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Corta o texto no último fim de frase que caiba no orçamento"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+
+    cut = text[:low]
+    sentence_end = max(cut.rfind('. '), cut.rfind('\n'))
+    if sentence_end > len(cut) // 2:
+        cut = cut[:sentence_end + 1]
+    return cut.rstrip() + ' [...]'
+
+
+def build_context(search_context: str, data: Dict[str, Any], token_budget: int,
+                  similarity_threshold: Optional[float] = None) -> ContextPack:
+    """Deduplica, ordena por relevância e empacota as fontes dentro do orçamento de tokens"""
+    if similarity_threshold is None:
+        similarity_threshold = float(os.getenv('CONTEXT_DEDUP_THRESHOLD', 0.8))
+
+    sources = parse_sources(search_context)
+    if not sources:
+        # Contexto sem o formato de fontes: apenas respeitar o orçamento
+        text = _truncate_to_tokens(search_context or '', token_budget) if search_context else ''
+        return ContextPack(text, estimate_tokens(text), token_budget, 0, 0, 0, int(text != (search_context or '')))
+
+    _rank(sources, data)
+    ranked = sorted(sources, key=lambda source: source.score, reverse=True)
+
+    # Remover quase-duplicatas, mantendo a fonte mais relevante
+    unique: List[Source] = []
+    for source in ranked:
+        if any(_similarity(source.signature, kept.signature) >= similarity_threshold for kept in unique):
+            continue
+        unique.append(source)
+    duplicates = len(sources) - len(unique)
+
+    # Nenhuma fonte ocupa mais que uma fração do orçamento, para caberem várias
+    min_tokens = int(os.getenv('CONTEXT_MIN_SOURCE_TOKENS', 60))
+    max_source_tokens = max(min_tokens, int(token_budget * float(os.getenv('CONTEXT_MAX_SOURCE_SHARE', 0.3))))
+    parts = []
+    used = 0
+    truncated = 0
+    for source in unique:
+        remaining = token_budget - used
+        if remaining < min_tokens:
+            break
+
+        limit = min(remaining, max_source_tokens)
+        block = source.render(len(parts) + 1)
+        block_tokens = estimate_tokens(block) + 1
+        if block_tokens > limit:
+            header_tokens = estimate_tokens(source.render(len(parts) + 1, body=''))
+            body = _truncate_to_tokens(source.body, limit - header_tokens - 2)
+            block = source.render(len(parts) + 1, body=body)
+            block_tokens = estimate_tokens(block) + 1
+            truncated += 1
+            if block_tokens > remaining:
+                continue
+
+        parts.append(block)
+        used += block_tokens
+
+    return ContextPack('\n'.join(parts), used, token_budget, len(sources), len(parts), duplicates, truncated)
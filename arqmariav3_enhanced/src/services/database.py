@@ -0,0 +1,104 @@
+import os
+from typing import Any, Dict
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from src.models.user import db
+from src.services.logging_setup import get_logger
+
+logger = get_logger('database')
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'app.db')
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == 'true'
+
+
+def database_url() -> str:
+    """DATABASE_URL (postgres:// é aceito como postgresql://) ou o SQLite local"""
+    url = os.getenv('DATABASE_URL')
+    if not url:
+        return f"sqlite:///{DEFAULT_SQLITE_PATH}"
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.database in (None, '', ':memory:') or 'mode=memory' in str(url)
+
+
+def sqlite_pragmas() -> Dict[str, str]:
+    """PRAGMAs aplicados a cada conexão SQLite (WAL: leitores não bloqueiam a escrita)"""
+    return {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'),
+        'mmap_size': os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)),
+        'cache_size': os.getenv('SQLITE_CACHE_SIZE', '-20000'),
+        'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY'),
+    }
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Opções do create_engine conforme o banco (pool, pre-ping, timeouts)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == 'sqlite' and _is_memory_sqlite(parsed):
+        # Banco em memória usa um pool de conexão única: nada a ajustar
+        return {}
+
+    is_postgres = backend == 'postgresql'
+    options = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10 if is_postgres else 20)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20 if is_postgres else 10)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        # Conexões de rede podem ser derrubadas pelo servidor ou por proxies (ex.: pgbouncer)
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800 if is_postgres else -1)),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', 'true' if is_postgres else 'false'),
+    }
+
+    if is_postgres and parsed.get_driver_name() in ('psycopg2', 'psycopg'):
+        server_options = [f"-c statement_timeout={int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))}"]
+        lock_timeout = int(os.getenv('DB_LOCK_TIMEOUT_MS', 0))
+        if lock_timeout:
+            server_options.append(f'-c lock_timeout={lock_timeout}')
+        options['connect_args'] = {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 10)),
+            'application_name': os.getenv('DB_APPLICATION_NAME', 'arqv30'),
+            'options': ' '.join(server_options),
+        }
+    elif backend == 'sqlite':
+        # Espera do driver pelo lock, em segundos (o PRAGMA busy_timeout cobre o mesmo caso no SQLite)
+        options['connect_args'] = {'timeout': int(sqlite_pragmas()['busy_timeout']) / 1000}
+
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            if value != '':
+                cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def init_database(app: Flask) -> None:
+    """Configura URL e engine do SQLAlchemy a partir do ambiente (DB_TUNING_ENABLED=false usa os padrões)"""
+    url = database_url()
+    tuning = _env_bool('DB_TUNING_ENABLED', 'true')
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url) if tuning else {}
+    db.init_app(app)
+
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if tuning and backend == 'sqlite' and not _is_memory_sqlite(parsed):
+        with app.app_context():
+            event.listen(db.engine, 'connect', _apply_sqlite_pragmas)
+        logger.info("🗄️ SQLite ajustado: " + ', '.join(f'{k}={v}' for k, v in sqlite_pragmas().items()))
+    else:
+        logger.info(f"🗄️ Banco: {backend} (ajustes {'ativos' if tuning else 'desativados'})")
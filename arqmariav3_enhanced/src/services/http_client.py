@@ -0,0 +1,167 @@
+import os
+import threading
+import requests
+from typing import Dict, Optional, Tuple, Union
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Hosts dos provedores externos e tamanho padrão do pool de conexões de cada um
+PROVIDER_HOSTS = {
+    'serper': 'https://google.serper.dev',
+    'google': 'https://www.googleapis.com',
+    'jina': 'https://r.jina.ai',
+    'gemini': 'https://generativelanguage.googleapis.com',
+    'huggingface': 'https://api-inference.huggingface.co',
+}
+
+DEFAULT_POOL_SIZES = {
+    'serper': 10,
+    'google': 10,
+    'jina': 10,
+    'gemini': 4,
+    'huggingface': 2,
+    'openai': 4,
+}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_openai_clients: Dict[str, object] = {}
+_openai_lock = threading.Lock()
+
+
+def provider_url(provider: str) -> str:
+    """URL base do provedor (<PROVEDOR>_BASE_URL permite apontar para servidores locais, ex.: benchmarks)"""
+    return os.getenv(f'{provider.upper()}_BASE_URL', PROVIDER_HOSTS.get(provider, '')).rstrip('/')
+
+
+def get_timeouts() -> Tuple[float, float]:
+    """Retorna os timeouts padrão (conexão, leitura) configurados"""
+    connect_timeout = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+    read_timeout = float(os.getenv('HTTP_READ_TIMEOUT', 60))
+    return connect_timeout, read_timeout
+
+
+def get_pool_size(provider: str) -> int:
+    """Retorna o tamanho do pool de conexões de um provedor"""
+    default = int(os.getenv('HTTP_POOL_SIZE', DEFAULT_POOL_SIZES.get(provider, 10)))
+    return int(os.getenv(f'HTTP_POOL_SIZE_{provider.upper()}', default))
+
+
+def retry_max_delay() -> float:
+    """Maior espera (s) entre retentativas, mesmo que o Retry-After peça mais"""
+    return float(os.getenv('HTTP_RETRY_MAX_DELAY', 2))
+
+
+class _CappedRetry(Retry):
+    """Retry que limita o Retry-After a HTTP_RETRY_MAX_DELAY segundos"""
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, retry_max_delay())
+
+
+def _build_retry() -> Retry:
+    """Política de retentativa para falhas transitórias que não duplicam trabalho no provedor
+
+    Só falhas de conexão (a requisição não saiu) e respostas 5xx de GET/HEAD são
+    repetidas. Timeouts de leitura e POSTs não: o provedor pode ter processado (e
+    cobrado) a chamada, e cada tentativa gastaria o prazo inteiro do chamador. Nesses
+    casos quem decide é o disjuntor, o fallback e o hedge dos serviços.
+    """
+    return _CappedRetry(
+        total=int(os.getenv('HTTP_MAX_RETRIES', 2)),
+        read=0,
+        backoff_factor=float(os.getenv('HTTP_RETRY_BACKOFF', 0.5)),
+        # 429 fica com o limitador de concorrência (src/services/concurrency_limiter.py),
+        # que pausa o provedor pelo Retry-After em vez de repetir a chamada
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def _build_session() -> requests.Session:
+    """Cria a sessão com um adapter (pool keep-alive) por host de provedor"""
+    session = requests.Session()
+    retry = _build_retry()
+
+    default_size = int(os.getenv('HTTP_POOL_SIZE', 10))
+    default_adapter = HTTPAdapter(pool_connections=default_size, pool_maxsize=default_size, max_retries=retry)
+    session.mount('https://', default_adapter)
+    session.mount('http://', default_adapter)
+
+    for provider in PROVIDER_HOSTS:
+        size = get_pool_size(provider)
+        session.mount(provider_url(provider), HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retry))
+
+    session.headers.update({'Connection': 'keep-alive'})
+    return session
+
+
+def get_session() -> requests.Session:
+    """Retorna a sessão HTTP compartilhada pelo processo"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def resolve_timeout(timeout: Union[None, float, Tuple[float, float]]) -> Tuple[float, float]:
+    """Converte um prazo simples em (conexão, leitura) respeitando os padrões"""
+    connect_timeout, read_timeout = get_timeouts()
+    if timeout is None:
+        return connect_timeout, read_timeout
+    if isinstance(timeout, tuple):
+        return timeout
+    return min(connect_timeout, timeout), timeout
+
+
+def request(method: str, url: str, timeout: Union[None, float, Tuple[float, float]] = None, **kwargs) -> requests.Response:
+    """Executa uma requisição usando o pool compartilhado"""
+    return get_session().request(method, url, timeout=resolve_timeout(timeout), **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request('POST', url, **kwargs)
+
+
+def get_openai_client(api_key: str):
+    """Retorna um cliente OpenAI reutilizável (um por chave) com pool próprio"""
+    client = _openai_clients.get(api_key)
+    if client is not None:
+        return client
+
+    with _openai_lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            import httpx
+            import openai
+
+            connect_timeout, read_timeout = get_timeouts()
+            pool_size = get_pool_size('openai')
+            client = openai.OpenAI(
+                api_key=api_key,
+                base_url=os.getenv('OPENAI_BASE_URL') or None,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                # O SDK repetiria timeouts e 5xx de um POST cobrado; só falhas de conexão voltam
+                max_retries=0,
+                http_client=httpx.Client(
+                    transport=httpx.HTTPTransport(
+                        retries=int(os.getenv('HTTP_MAX_RETRIES', 2)),
+                        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                    ),
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                ),
+            )
+            _openai_clients[api_key] = client
+    return client
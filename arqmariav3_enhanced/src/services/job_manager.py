@@ -0,0 +1,154 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from src.services.logging_setup import get_logger
+
+logger = get_logger('jobs')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Fila de jobs cheia"""
+
+
+class AnalysisJob:
+    def __init__(self, data: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.data = data
+        self.status = QUEUED
+        self.stage = 'na_fila'
+        self.progress = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+
+    def update_progress(self, stage: str, percent: int):
+        self.stage = stage
+        self.progress = percent
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobManager:
+    """Executa análises em background com fila limitada"""
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 result_ttl: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv('ANALYSIS_JOB_WORKERS', 4))
+        self.max_queue = max_queue or int(os.getenv('ANALYSIS_JOB_QUEUE_SIZE', 20))
+        self.result_ttl = result_ttl or int(os.getenv('ANALYSIS_JOB_TTL', 3600))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='analysis-job')
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, runner: Callable[[AnalysisJob], Optional[Dict[str, Any]]], data: Dict[str, Any]) -> AnalysisJob:
+        """Enfileira um job; levanta JobQueueFull se a fila estiver cheia"""
+        self._cleanup()
+
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if queued >= self.max_queue:
+                raise JobQueueFull(f'Fila de análises cheia ({queued}/{self.max_queue})')
+
+            job = AnalysisJob(data)
+            self._jobs[job.id] = job
+
+        job.future = self._executor.submit(self._run, runner, job)
+        return job
+
+    def _run(self, runner: Callable[[AnalysisJob], Optional[Dict[str, Any]]], job: AnalysisJob):
+        if job.cancel_event.is_set():
+            return
+
+        job.status = RUNNING
+        job.started_at = datetime.now()
+
+        try:
+            result = runner(job)
+            if job.cancel_event.is_set():
+                job.status = CANCELLED
+            elif result is None:
+                job.status = FAILED
+                job.error = 'Falha ao gerar análise com IA'
+            else:
+                job.result = result
+                job.status = COMPLETED
+                job.update_progress('concluido', 100)
+        except Exception as e:
+            if job.cancel_event.is_set():
+                job.status = CANCELLED
+            else:
+                logger.error(f"❌ Erro no job {job.id}: {str(e)}")
+                job.status = FAILED
+                job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[AnalysisJob]:
+        """Cancela um job na fila ou sinaliza o cancelamento de um job em execução"""
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.status = CANCELLED
+            job.finished_at = datetime.now()
+        return job
+
+    def _cleanup(self):
+        """Remove jobs finalizados há mais tempo que o TTL de resultados"""
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at.timestamp() < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED)}
+        for job in list(self._jobs.values()):
+            counts[job.status] += 1
+
+        return {
+            'queue_depth': counts[QUEUED],
+            'running': counts[RUNNING],
+            'completed': counts[COMPLETED],
+            'failed': counts[FAILED],
+            'cancelled': counts[CANCELLED],
+            'max_queue': self.max_queue,
+            'workers': self.max_workers,
+        }
+
+
+job_manager = JobManager()
@@ -0,0 +1,265 @@
+import re
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Seções de primeiro nível pedidas no prompt de análise
+EXPECTED_SECTIONS = [
+    'avatar_ultra_detalhado',
+    'escopo_posicionamento',
+    'analise_concorrencia_profunda',
+    'estrategia_palavras_chave',
+    'metricas_performance_detalhadas',
+    'plano_acao_detalhado',
+    'insights_exclusivos_ultra',
+    'inteligencia_mercado',
+    'drivers_mentais',
+    'provas_visuais_instantaneas',
+]
+
+# Como o JSON foi obtido
+METHOD_DIRECT = 'direto'
+METHOD_FENCED = 'cercas'
+METHOD_EXTRACTED = 'recortado'
+METHOD_REPAIRED = 'reparado'
+METHOD_FAILED = 'falhou'
+
+CODE_FENCE = re.compile(r'```(?:json|JSON)?[ \t]*\n?(.*?)(?:```|$)', re.DOTALL)
+
+_CLOSERS = {'{': '}', '[': ']'}
+_SCALAR_END = set(',}] \t\r\n')
+
+
+class _Frame:
+    __slots__ = ('kind', 'expect', 'key')
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.expect = 'key' if kind == '{' else 'value'
+        self.key: Optional[str] = None
+
+
+class JSONScanner:
+    """Varredura incremental de um objeto JSON, tolerante a texto truncado
+
+    Acompanha o aninhamento, as strings e o último ponto em que um valor
+    terminou, de onde o texto pode ser cortado e fechado com segurança.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self.stack: List[_Frame] = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.in_scalar = False
+        # (posição de corte, fechamentos necessários) após o último valor completo
+        self.last_complete: Optional[Tuple[int, str]] = None
+        self.completed_sections: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        return self.end is not None
+
+    def feed(self, chunk: str) -> List[str]:
+        """Acrescenta texto e retorna as seções de primeiro nível concluídas neste trecho"""
+        before = len(self.completed_sections)
+        self.buffer += chunk
+        if self.start is None:
+            index = self.buffer.find('{', self.pos)
+            if index < 0:
+                self.pos = len(self.buffer)
+                return []
+            self.start = self.pos = index
+        self._scan()
+        return self.completed_sections[before:]
+
+    def _value_complete(self, position: int):
+        frame = self.stack[-1]
+        frame.expect = 'comma'
+        if len(self.stack) == 1 and frame.key is not None:
+            self.completed_sections.append(frame.key)
+        self.last_complete = (position, ''.join(_CLOSERS[f.kind] for f in reversed(self.stack)))
+
+    def _scan(self):
+        text = self.buffer
+        i = self.pos
+        length = len(text)
+        while i < length and self.end is None:
+            ch = text[i]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    frame = self.stack[-1]
+                    if frame.kind == '{' and frame.expect == 'key':
+                        if len(self.stack) == 1:
+                            try:
+                                frame.key = json.loads(text[self.string_start:i + 1])
+                            except ValueError:
+                                frame.key = None
+                        frame.expect = 'colon'
+                    else:
+                        self._value_complete(i + 1)
+                i += 1
+                continue
+
+            if self.in_scalar:
+                if ch not in _SCALAR_END:
+                    i += 1
+                    continue
+                self.in_scalar = False
+                self._value_complete(i)
+
+            if ch == '"':
+                self.in_string = True
+                self.string_start = i
+            elif ch in '{[':
+                self.stack.append(_Frame(ch))
+            elif ch in '}]':
+                if not self.stack:
+                    break
+                self.stack.pop()
+                if not self.stack:
+                    self.end = i + 1
+                else:
+                    self._value_complete(i + 1)
+            elif ch == ':':
+                if self.stack:
+                    self.stack[-1].expect = 'value'
+            elif ch == ',':
+                if self.stack:
+                    frame = self.stack[-1]
+                    frame.expect = 'key' if frame.kind == '{' else 'value'
+            elif not ch.isspace():
+                self.in_scalar = True
+            i += 1
+
+        self.pos = i
+
+    def complete_text(self) -> Optional[str]:
+        """Objeto completo, se a chave de fechamento da raiz já chegou"""
+        if self.start is None or self.end is None:
+            return None
+        return self.buffer[self.start:self.end]
+
+    def repaired_text(self) -> Optional[str]:
+        """Texto truncado cortado no último valor completo e com os fechamentos adicionados"""
+        if self.start is None:
+            return None
+        if self.last_complete is None:
+            return '{}'
+        cut, closers = self.last_complete
+        return self.buffer[self.start:cut].rstrip() + closers
+
+
+class ExtractionResult:
+    """JSON extraído da resposta da IA e como foi obtido"""
+
+    def __init__(self, data: Optional[Dict[str, Any]], method: str, error: Optional[str] = None):
+        self.data = data
+        self.method = method
+        self.error = error
+        present = data or {}
+        self.sections_found = [section for section in EXPECTED_SECTIONS if section in present]
+        self.sections_missing = [section for section in EXPECTED_SECTIONS if section not in present]
+
+    @property
+    def repaired(self) -> bool:
+        return self.method == METHOD_REPAIRED
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'metodo': self.method,
+            'reparado': self.repaired,
+            'secoes_recuperadas': len(self.sections_found),
+            'secoes_esperadas': len(EXPECTED_SECTIONS),
+            'secoes_ausentes': self.sections_missing,
+            'erro': self.error,
+        }
+
+
+def _loads_object(text: str) -> Optional[Dict[str, Any]]:
+    try:
+        value = json.loads(text)
+    except (ValueError, TypeError):
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def strip_code_fences(text: str) -> str:
+    """Conteúdo do primeiro bloco ```json ... ``` (ou o texto original, sem cercas)"""
+    match = CODE_FENCE.search(text or '')
+    return match.group(1).strip() if match else (text or '')
+
+
+def extract_json(text: str, max_candidates: int = 5) -> ExtractionResult:
+    """Extrai o objeto JSON da resposta: direto, de cercas markdown, recortado da prosa ou reparado"""
+    if not text or not text.strip():
+        return ExtractionResult(None, METHOD_FAILED, 'Resposta vazia')
+
+    data = _loads_object(text.strip())
+    if data is not None:
+        return ExtractionResult(data, METHOD_DIRECT)
+
+    unfenced = strip_code_fences(text)
+    if unfenced is not text:
+        data = _loads_object(unfenced)
+        if data is not None:
+            return ExtractionResult(data, METHOD_FENCED)
+
+    # Procurar o objeto mais externo; um '{' na prosa pode não ser o início, então tentar alguns
+    truncated: Optional[JSONScanner] = None
+    offset = 0
+    for _ in range(max_candidates):
+        index = unfenced.find('{', offset)
+        if index < 0:
+            break
+
+        scanner = JSONScanner()
+        scanner.feed(unfenced[index:])
+        complete = scanner.complete_text()
+        if complete is None:
+            # O texto acabou dentro deste objeto: os próximos '{' são aninhados nele
+            truncated = scanner
+            break
+
+        data = _loads_object(complete)
+        if data is not None:
+            return ExtractionResult(data, METHOD_EXTRACTED)
+        offset = index + 1
+
+    # Resposta cortada (ex.: limite de max_tokens): fechar no último valor completo
+    if truncated is not None:
+        data = _loads_object(truncated.repaired_text() or '')
+        if data:
+            return ExtractionResult(data, METHOD_REPAIRED)
+
+    return ExtractionResult(None, METHOD_FAILED, 'Nenhum objeto JSON encontrado na resposta')
+
+
+class IncrementalJSONParser:
+    """Acompanha o streaming da IA e informa cada seção de primeiro nível assim que termina"""
+
+    def __init__(self):
+        self.scanner = JSONScanner()
+        self.chunks: List[str] = []
+
+    def feed(self, chunk: str) -> List[str]:
+        self.chunks.append(chunk)
+        if self.scanner.done:
+            return []
+        return [section for section in self.scanner.feed(chunk) if section in EXPECTED_SECTIONS]
+
+    @property
+    def sections_completed(self) -> List[str]:
+        return [section for section in self.scanner.completed_sections if section in EXPECTED_SECTIONS]
+
+    def result(self) -> ExtractionResult:
+        return extract_json(''.join(self.chunks))
@@ -0,0 +1,79 @@
+import os
+import sys
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+ROOT_LOGGER = 'arqv30'
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def configure_logging() -> None:
+    """Configura o logger da aplicação (LOG_LEVEL) com escrita em uma thread separada
+
+    As requisições só enfileiram o registro; a formatação final e a escrita no
+    stream (que pode bloquear) ficam com o QueueListener.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    with _lock:
+        if _listener is not None:
+            return
+
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+        records = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', 10000)))
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+        logger.addHandler(_DroppingQueueHandler(records))
+        logger.propagate = False
+
+        _listener = QueueListener(records, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def _stop_listener() -> None:
+    # No processo filho, o listener ativo é o recriado após o fork
+    _listener.stop()
+
+
+def _restart_after_fork() -> None:
+    """Recria fila e listener no processo filho (ex.: workers do gunicorn com preload)
+
+    A thread de escrita não sobrevive ao fork e a fila herdada pode estar com a trava ocupada.
+    """
+    global _listener
+    records = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', 10000)))
+    for handler in logging.getLogger(ROOT_LOGGER).handlers:
+        if isinstance(handler, _DroppingQueueHandler):
+            handler.queue = records
+
+    _listener = QueueListener(records, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Descarta o registro se a fila estiver cheia, em vez de travar a requisição"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def get_logger(name: str) -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
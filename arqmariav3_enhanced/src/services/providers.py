@@ -0,0 +1,154 @@
+import os
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Tipos de provedor
+SEARCH = 'search'
+EXTRACTOR = 'extractor'
+LLM = 'llm'
+
+# Backends: APIs reais ou simulação local determinística (para testes de carga)
+BACKEND_REAL = 'real'
+BACKEND_STUB = 'stub'
+
+# Ordem de preferência de cada tipo
+PROVIDER_ORDER = {
+    SEARCH: ['serper', 'google'],
+    EXTRACTOR: ['jina'],
+    LLM: ['openai', 'gemini', 'huggingface'],
+}
+
+# Variáveis de ambiente com as credenciais de cada provedor real
+PROVIDER_CREDENTIALS = {
+    'serper': ['SERPER_API_KEY'],
+    'google': ['GOOGLE_SEARCH_KEY', 'GOOGLE_CSE_ID'],
+    'jina': ['JINA_API_KEY'],
+    'openai': ['OPENAI_API_KEY'],
+    'gemini': ['GEMINI_API_KEY'],
+    'huggingface': ['HUGGINGFACE_API_KEY'],
+}
+
+
+class SearchProvider:
+    """Provedor de busca: retorna resultados com title, link, snippet e source"""
+    name = ''
+
+    def configured(self) -> bool:
+        return True
+
+    def search(self, query: str, num_results: int = 10, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def asearch(self, query: str, num_results: int = 10,
+                      timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Versão assíncrona; sem implementação nativa, executa `search` em uma thread"""
+        return await asyncio.to_thread(self.search, query, num_results, timeout)
+
+
+class ContentExtractor:
+    """Extrator do texto completo de páginas, com requisição condicional"""
+    name = ''
+
+    def configured(self) -> bool:
+        return True
+
+    def fetch(self, url: str, timeout: Optional[float] = None, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Retorna {'not_modified', 'content', 'etag', 'last_modified'} ou None em caso de falha"""
+        raise NotImplementedError
+
+    async def afetch(self, url: str, timeout: Optional[float] = None, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.fetch, url, timeout, etag, last_modified)
+
+
+class LLMProvider:
+    """Provedor de IA generativa"""
+    name = ''
+    model = ''
+    streaming = False
+
+    def configured(self) -> bool:
+        return True
+
+    def generate(self, prompt: str, timeout: Optional[float] = None, max_tokens: int = 4000) -> Optional[str]:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, max_tokens: int = 4000) -> Iterator[str]:
+        """Trechos do texto à medida que são gerados (apenas se `streaming`)"""
+        raise NotImplementedError
+
+    async def agenerate(self, prompt: str, timeout: Optional[float] = None, max_tokens: int = 4000) -> Optional[str]:
+        return await asyncio.to_thread(self.generate, prompt, timeout, max_tokens)
+
+    async def astream(self, prompt: str, max_tokens: int = 4000) -> AsyncIterator[str]:
+        """Streaming assíncrono; sem implementação nativa, entrega o texto completo de uma vez"""
+        text = await self.agenerate(prompt, max_tokens=max_tokens)
+        if text:
+            yield text
+
+
+# Cria o provedor; `owner` é o serviço que o utiliza (SearchService ou AIService)
+ProviderFactory = Callable[[Any], Any]
+
+
+class ProviderRegistry:
+    """Registro de provedores por tipo e backend (PROVIDER_BACKEND=real|stub)"""
+
+    def __init__(self):
+        self.backend = os.getenv('PROVIDER_BACKEND', BACKEND_REAL).lower()
+        self._factories: Dict[Tuple[str, str, str], ProviderFactory] = {}
+        self._credentials: Optional[Dict[str, Optional[str]]] = None
+        self._lock = threading.Lock()
+
+    def register(self, kind: str, name: str, factory: ProviderFactory, backend: str = BACKEND_REAL) -> None:
+        with self._lock:
+            self._factories[(backend, kind, name)] = factory
+            if name not in PROVIDER_ORDER.setdefault(kind, []):
+                PROVIDER_ORDER[kind].append(name)
+
+    def use_backend(self, backend: str) -> None:
+        """Troca o backend em execução (ex.: benchmarks no mesmo processo)"""
+        self.backend = backend.lower()
+
+    def names(self, kind: str) -> List[str]:
+        return list(PROVIDER_ORDER.get(kind, []))
+
+    def credential(self, env_name: str) -> Optional[str]:
+        """Credencial lida do ambiente uma única vez por processo"""
+        if self._credentials is None:
+            with self._lock:
+                if self._credentials is None:
+                    self._credentials = {
+                        env: os.getenv(env) for envs in PROVIDER_CREDENTIALS.values() for env in envs
+                    }
+        if env_name not in self._credentials:
+            self._credentials[env_name] = os.getenv(env_name)
+        return self._credentials[env_name]
+
+    def reload_credentials(self) -> None:
+        self._credentials = None
+
+    def create(self, kind: str, name: str, owner: Any = None):
+        """Instancia o provedor do backend ativo (None se não houver implementação)"""
+        if self.backend == BACKEND_STUB:
+            # Os stubs se registram ao serem importados
+            from src.services import stub_backend  # noqa: F401
+        factory = self._factories.get((self.backend, kind, name))
+        return factory(owner) if factory else None
+
+    def providers(self, kind: str, owner: Any = None) -> Dict[str, Any]:
+        """Provedores configurados do tipo, na ordem de preferência"""
+        found = {}
+        for name in self.names(kind):
+            provider = self.create(kind, name, owner)
+            if provider is not None and provider.configured():
+                found[name] = provider
+        return found
+
+
+registry = ProviderRegistry()
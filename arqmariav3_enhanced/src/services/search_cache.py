@@ -0,0 +1,199 @@
+import os
+import json
+import hashlib
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+from flask import has_app_context
+from src.models.user import db
+from src.models.search_cache import SearchCacheEntry
+from src.services.cache import LRUCache
+from src.services.metrics import CACHE_EVENTS, FAILURES
+from src.services.logging_setup import get_logger
+
+logger = get_logger('search_cache')
+
+
+def normalize_query(query: str) -> str:
+    """Normaliza a query para que variações triviais compartilhem o mesmo cache"""
+    query = unicodedata.normalize('NFC', query or '')
+    return ' '.join(query.lower().split())
+
+
+def make_cache_key(query: str, provider: str, locale: str, num_results: int) -> str:
+    raw = f"{normalize_query(query)}|{provider}|{locale}|{num_results}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class SearchCache:
+    """Cache de resultados de busca em dois níveis: memória (LRU) e disco (SQLite/SQLAlchemy)"""
+
+    def __init__(self):
+        self.enabled = os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+        self.default_ttl = int(os.getenv('SEARCH_CACHE_TTL', 24 * 3600))
+        self.disk_max_entries = int(os.getenv('SEARCH_CACHE_DISK_MAX_ENTRIES', 10000))
+        self.memory = LRUCache(
+            max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 500)),
+            default_ttl=self.default_ttl
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.writes = 0
+        self.disk_evictions = 0
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Busca várias chaves, primeiro na memória e depois no disco"""
+        if not self.enabled:
+            return {}
+
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.memory.get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+
+        if missing and has_app_context():
+            found.update(self._disk_get_many(missing))
+
+        return found
+
+    def lookup(self, queries: List[str], providers: List[str], locale: str,
+               num_results: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Retorna os resultados em cache por query, respeitando a ordem de preferência dos provedores"""
+        if not self.enabled or not queries:
+            return {}
+
+        keys_by_query = {
+            query: [make_cache_key(query, provider, locale, num_results) for provider in providers]
+            for query in queries
+        }
+        found = self.get_many([key for keys in keys_by_query.values() for key in keys])
+
+        cached = {}
+        for query, keys in keys_by_query.items():
+            for key in keys:
+                if key in found:
+                    cached[query] = found[key]
+                    break
+
+        with self._lock:
+            self.hits += len(cached)
+            self.misses += len(queries) - len(cached)
+        CACHE_EVENTS.inc(len(cached), cache='busca', result='hit')
+        CACHE_EVENTS.inc(len(queries) - len(cached), cache='busca', result='miss')
+        return cached
+
+    def store(self, items: List[Tuple[str, str, str, int, List[Dict[str, Any]], int]]) -> None:
+        """Grava itens (query, provedor, locale, num_results, resultados, ttl) nos dois níveis"""
+        if not self.enabled or not items:
+            return
+
+        for query, provider, locale, num_results, results, ttl in items:
+            self.memory.set(make_cache_key(query, provider, locale, num_results), results, ttl=ttl)
+
+        if has_app_context():
+            self._disk_set_many(items)
+
+    def _disk_get_many(self, keys: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        found = {}
+        try:
+            now = datetime.utcnow()
+            entries = SearchCacheEntry.query.filter(SearchCacheEntry.cache_key.in_(keys)).all()
+            for entry in entries:
+                if entry.expires_at < now:
+                    db.session.delete(entry)
+                    continue
+
+                results = json.loads(entry.results)
+                entry.last_accessed = now
+                entry.hits += 1
+                found[entry.cache_key] = results
+
+                # Promover para a memória com o tempo de vida restante
+                remaining = (entry.expires_at - now).total_seconds()
+                self.memory.set(entry.cache_key, results, ttl=remaining)
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao ler cache de busca: {e}")
+            FAILURES.inc(component='cache_busca')
+
+        with self._lock:
+            self.disk_hits += len(found)
+            self.disk_misses += len(keys) - len(found)
+        return found
+
+    def _disk_set_many(self, items: List[Tuple[str, str, str, int, List[Dict[str, Any]], int]]) -> None:
+        try:
+            now = datetime.utcnow()
+            keyed = {
+                make_cache_key(query, provider, locale, num_results): (query, provider, locale, num_results, results, ttl)
+                for query, provider, locale, num_results, results, ttl in items
+            }
+            existing = {
+                entry.cache_key: entry
+                for entry in SearchCacheEntry.query.filter(SearchCacheEntry.cache_key.in_(list(keyed))).all()
+            }
+
+            for key, (query, provider, locale, num_results, results, ttl) in keyed.items():
+                entry = existing.get(key)
+                if entry is None:
+                    entry = SearchCacheEntry(cache_key=key, hits=0)
+                    db.session.add(entry)
+                entry.query_text = normalize_query(query)[:500]
+                entry.provider = provider
+                entry.locale = locale
+                entry.num_results = num_results
+                entry.results = json.dumps(results, ensure_ascii=False)
+                entry.created_at = now
+                entry.last_accessed = now
+                entry.expires_at = now + timedelta(seconds=ttl)
+
+            db.session.commit()
+            with self._lock:
+                self.writes += len(items)
+            self._disk_evict()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao gravar cache de busca: {e}")
+            FAILURES.inc(component='cache_busca')
+
+    def _disk_evict(self) -> None:
+        """Remove entradas expiradas e, acima do limite, as menos acessadas"""
+        now = datetime.utcnow()
+        removed = SearchCacheEntry.query.filter(SearchCacheEntry.expires_at < now).delete(synchronize_session=False)
+
+        overflow = SearchCacheEntry.query.count() - self.disk_max_entries
+        if overflow > 0:
+            oldest = db.session.query(SearchCacheEntry.id).order_by(SearchCacheEntry.last_accessed.asc()).limit(overflow)
+            removed += SearchCacheEntry.query.filter(SearchCacheEntry.id.in_(oldest.scalar_subquery())).delete(synchronize_session=False)
+
+        db.session.commit()
+        with self._lock:
+            self.disk_evictions += removed
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'memory_hits': memory['hits'],
+            'memory_entries': memory['entries'],
+            'memory_evictions': memory['evictions'],
+            'disk_hits': self.disk_hits,
+            'disk_misses': self.disk_misses,
+            'disk_evictions': self.disk_evictions,
+            'writes': self.writes,
+        }
+
+
+search_cache = SearchCache()
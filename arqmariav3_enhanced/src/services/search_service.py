@@ -1,67 +1,133 @@
 import os
-import requests
-from typing import List, Dict, Any, Optional
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Awaitable, Callable, List, Dict, Any, Optional
 from dotenv import load_dotenv
 import json
+from src.services import http_client, async_http
+from src.services.search_cache import search_cache, normalize_query
+from src.services.circuit_breaker import aguarded_call, guarded_call, order_by_health
+from src.services.content_cache import content_cache, normalize_url
+from src.services.providers import registry, SearchProvider, ContentExtractor, SEARCH, EXTRACTOR, BACKEND_STUB
+from src.services.logging_setup import get_logger
+from src.services.metrics import StageTimings, SEARCH_QUERY_SECONDS, FALLBACKS, FAILURES
 
 load_dotenv()
 
+logger = get_logger('search')
+
+# Ordem de preferência dos provedores e locale usados nas buscas (gl=br, hl=pt)
+SEARCH_PROVIDERS = ['serper', 'google']
+SEARCH_LOCALE = 'pt-BR'
+
+# Queries gerais, comuns a todas as análises
+GENERAL_QUERIES = [
+    "marketing digital tendências 2024",
+    "comportamento consumidor online Brasil",
+    "estratégias marketing digital eficazes"
+]
+
+# Callback chamado a cada query concluída: (query, número de resultados, origem)
+QueryCallback = Callable[[str, int, str], None]
+
+# Resultados já obtidos por query normalizada (ex.: buscas compartilhadas de um lote)
+PrefetchedResults = Dict[str, List[Dict[str, Any]]]
+
+# Executa uma função bloqueante fora do event loop (ex.: asyncio.to_thread com contexto da aplicação)
+BlockingRunner = Callable[..., Awaitable[Any]]
+
 class SearchService:
-    def __init__(self):
-        self.google_api_key = os.getenv('GOOGLE_SEARCH_KEY')
-        self.google_cse_id = os.getenv('GOOGLE_CSE_ID')
-        self.serper_api_key = os.getenv('SERPER_API_KEY')
-        self.jina_api_key = os.getenv('JINA_API_KEY')
+    def __init__(self, timings: Optional[StageTimings] = None):
+        self.google_api_key = registry.credential('GOOGLE_SEARCH_KEY')
+        self.google_cse_id = registry.credential('GOOGLE_CSE_ID')
+        self.serper_api_key = registry.credential('SERPER_API_KEY')
+        self.jina_api_key = registry.credential('JINA_API_KEY')
+        self.parallel_search = os.getenv('SEARCH_PARALLEL', 'true').lower() == 'true'
+        self.max_workers = int(os.getenv('SEARCH_MAX_WORKERS', 5))
+        self.query_timeout = float(os.getenv('SEARCH_QUERY_TIMEOUT', 10))
+        self.enrich_enabled = os.getenv('ENRICH_ENABLED', 'true').lower() == 'true'
+        self.enrich_top_n = int(os.getenv('ENRICH_TOP_N', 5))
+        self.enrich_max_workers = int(os.getenv('ENRICH_MAX_WORKERS', 5))
+        self.enrich_url_timeout = float(os.getenv('ENRICH_URL_TIMEOUT', 8))
+        self.enrich_budget = float(os.getenv('ENRICH_BUDGET', 12))
+        self.enrich_max_chars = int(os.getenv('ENRICH_MAX_CHARS', 3000))
+        self.timings = timings or StageTimings()
+        # Tempo de cada query buscada nos provedores (as atendidas por cache ou lote não entram)
+        self.last_query_timings: List[Dict[str, Any]] = []
+    
+    def _google_params(self, query: str, num_results: int) -> Dict[str, Any]:
+        return {
+            'key': self.google_api_key,
+            'cx': self.google_cse_id,
+            'q': query,
+            'num': min(num_results, 10),
+            'gl': 'br',
+            'hl': 'pt'
+        }
+    
+    def _serper_headers(self) -> Dict[str, str]:
+        return {
+            'X-API-KEY': self.serper_api_key,
+            'Content-Type': 'application/json'
+        }
     
-    def search_with_google(self, query: str, num_results: int = 10) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _parse_results(items: List[Dict[str, Any]], source: str) -> List[Dict[str, Any]]:
+        return [{
+            'title': item.get('title', ''),
+            'link': item.get('link', ''),
+            'snippet': item.get('snippet', ''),
+            'source': source
+        } for item in items]
+    
+    def search_with_google(self, query: str, num_results: int = 10, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
         """Busca usando Google Custom Search API"""
         try:
             if not self.google_api_key or not self.google_cse_id:
                 return []
             
-            url = "https://www.googleapis.com/customsearch/v1"
-            params = {
-                'key': self.google_api_key,
-                'cx': self.google_cse_id,
-                'q': query,
-                'num': min(num_results, 10),
-                'gl': 'br',
-                'hl': 'pt'
-            }
+            url = f"{http_client.provider_url('google')}/customsearch/v1"
+            
+            with guarded_call('google'):
+                response = http_client.get(url, params=self._google_params(query, num_results), timeout=timeout)
+                response.raise_for_status()
+                data = response.json()
+            
+            return self._parse_results(data.get('items', []), 'google')
             
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Erro na busca Google: {e}")
+            return []
+    
+    async def asearch_with_google(self, query: str, num_results: int = 10,
+                                  timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Busca usando Google Custom Search API (cliente assíncrono)"""
+        try:
+            if not self.google_api_key or not self.google_cse_id:
+                return []
             
-            data = response.json()
-            results = []
+            url = f"{http_client.provider_url('google')}/customsearch/v1"
             
-            if 'items' in data:
-                for item in data['items']:
-                    results.append({
-                        'title': item.get('title', ''),
-                        'link': item.get('link', ''),
-                        'snippet': item.get('snippet', ''),
-                        'source': 'google'
-                    })
+            async with aguarded_call('google'):
+                response = await async_http.get(url, params=self._google_params(query, num_results), timeout=timeout)
+                response.raise_for_status()
+                data = response.json()
             
-            return results
+            return self._parse_results(data.get('items', []), 'google')
             
         except Exception as e:
-            print(f"Erro na busca Google: {e}")
+            logger.warning(f"Erro na busca Google: {e}")
             return []
     
-    def search_with_serper(self, query: str, num_results: int = 10) -> List[Dict[str, Any]]:
+    def search_with_serper(self, query: str, num_results: int = 10, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
         """Busca usando Serper API"""
         try:
             if not self.serper_api_key:
                 return []
             
-            url = "https://google.serper.dev/search"
-            headers = {
-                'X-API-KEY': self.serper_api_key,
-                'Content-Type': 'application/json'
-            }
-            
+            url = f"{http_client.provider_url('serper')}/search"
             data = {
                 'q': query,
                 'num': num_results,
@@ -69,80 +135,591 @@ class SearchService:
                 'hl': 'pt'
             }
             
-            response = requests.post(url, json=data, headers=headers)
-            response.raise_for_status()
+            with guarded_call('serper'):
+                response = http_client.post(url, json=data, headers=self._serper_headers(), timeout=timeout)
+                response.raise_for_status()
+                result = response.json()
             
-            result = response.json()
-            results = []
+            return self._parse_results(result.get('organic', []), 'serper')
             
-            if 'organic' in result:
-                for item in result['organic']:
-                    results.append({
-                        'title': item.get('title', ''),
-                        'link': item.get('link', ''),
-                        'snippet': item.get('snippet', ''),
-                        'source': 'serper'
-                    })
+        except Exception as e:
+            logger.warning(f"Erro na busca Serper: {e}")
+            return []
+    
+    async def asearch_with_serper(self, query: str, num_results: int = 10,
+                                  timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Busca usando Serper API (cliente assíncrono)"""
+        try:
+            if not self.serper_api_key:
+                return []
             
-            return results
+            url = f"{http_client.provider_url('serper')}/search"
+            data = {
+                'q': query,
+                'num': num_results,
+                'gl': 'br',
+                'hl': 'pt'
+            }
+            
+            async with aguarded_call('serper'):
+                response = await async_http.post(url, json=data, headers=self._serper_headers(), timeout=timeout)
+                response.raise_for_status()
+                result = response.json()
+            
+            return self._parse_results(result.get('organic', []), 'serper')
             
         except Exception as e:
-            print(f"Erro na busca Serper: {e}")
+            logger.warning(f"Erro na busca Serper: {e}")
             return []
     
     def extract_content_with_jina(self, url: str) -> Optional[str]:
         """Extrai conteúdo de URL usando Jina Reader"""
+        result = self.fetch_content_with_jina(url)
+        return result['content'] if result else None
+    
+    def _jina_headers(self, etag: Optional[str], last_modified: Optional[str]) -> Dict[str, str]:
+        headers = {
+            'Authorization': f'Bearer {self.jina_api_key}',
+            'Accept': 'application/json'
+        }
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+    
+    @staticmethod
+    def _jina_result(response, etag: Optional[str], last_modified: Optional[str]) -> Dict[str, Any]:
+        """Converte a resposta do Jina (requests ou httpx) no formato do extrator"""
+        if response.status_code == 304:
+            return {'not_modified': True, 'etag': etag, 'last_modified': last_modified}
+        response.raise_for_status()
+        data = response.json()
+        return {
+            'not_modified': False,
+            'content': data.get('data', {}).get('content', ''),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+    
+    def fetch_content_with_jina(self, url: str, timeout: Optional[float] = None,
+                                etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Extrai conteúdo via Jina Reader com requisição condicional (If-None-Match/If-Modified-Since)"""
         try:
             if not self.jina_api_key:
                 return None
             
-            jina_url = f"https://r.jina.ai/{url}"
-            headers = {
-                'Authorization': f'Bearer {self.jina_api_key}',
-                'Accept': 'application/json'
-            }
-            
-            response = requests.get(jina_url, headers=headers, timeout=30)
-            response.raise_for_status()
+            jina_url = f"{http_client.provider_url('jina')}/{url}"
             
-            data = response.json()
-            return data.get('data', {}).get('content', '')
+            with guarded_call('jina'):
+                response = http_client.get(jina_url, headers=self._jina_headers(etag, last_modified), timeout=timeout or 30)
+                return self._jina_result(response, etag, last_modified)
             
         except Exception as e:
-            print(f"Erro ao extrair conteúdo com Jina: {e}")
+            logger.warning(f"Erro ao extrair conteúdo com Jina: {e}")
             return None
     
-    def comprehensive_search(self, queries: List[str], max_results_per_query: int = 5) -> str:
-        """Realiza busca abrangente e retorna contexto formatado"""
-        all_results = []
-        
-        for query in queries:
-            print(f"🔍 Buscando: {query}")
+    async def afetch_content_with_jina(self, url: str, timeout: Optional[float] = None, etag: Optional[str] = None,
+                                       last_modified: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Extrai conteúdo via Jina Reader (cliente assíncrono)"""
+        try:
+            if not self.jina_api_key:
+                return None
             
-            # Tentar Serper primeiro
-            results = self.search_with_serper(query, max_results_per_query)
+            jina_url = f"{http_client.provider_url('jina')}/{url}"
             
-            # Se Serper falhar, tentar Google
-            if not results:
-                results = self.search_with_google(query, max_results_per_query)
+            async with aguarded_call('jina'):
+                response = await async_http.get(jina_url, headers=self._jina_headers(etag, last_modified),
+                                                timeout=timeout or 30)
+                return self._jina_result(response, etag, last_modified)
             
-            all_results.extend(results)
+        except Exception as e:
+            logger.warning(f"Erro ao extrair conteúdo com Jina: {e}")
+            return None
+    
+    def enrich_results(self, results: List[Dict[str, Any]], top_n: Optional[int] = None,
+                       budget: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Adiciona o texto completo das top-N URLs aos resultados, dentro de um orçamento de tempo"""
+        top_n = self.enrich_top_n if top_n is None else top_n
+        budget = self.enrich_budget if budget is None else budget
+        extractor = next(iter(registry.providers(EXTRACTOR, self).values()), None)
+        if extractor is None or top_n <= 0 or not results:
+            return results
+
+        urls = self._enrich_urls(results, top_n)
+        if not urls:
+            return results
+
+        cached = content_cache.lookup(urls)
+        contents = {url: entry['content'] for url, entry in cached.items() if entry['fresh']}
+        to_fetch = [url for url in urls if url not in contents]
+        fetched = {}
+        revalidated = 0
+
+        if to_fetch:
+            deadline = time.monotonic() + budget
+            executor = ThreadPoolExecutor(max_workers=max(1, min(self.enrich_max_workers, len(to_fetch))))
+            try:
+                futures = {}
+                for url in to_fetch:
+                    stale = cached.get(url, {})
+                    futures[executor.submit(extractor.fetch, url, self.enrich_url_timeout,
+                                            stale.get('etag'), stale.get('last_modified'))] = url
+
+                pending = set(futures)
+                while pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.warning(f"⏱️ Orçamento de extração esgotado, {len(pending)} páginas descartadas")
+                        break
+
+                    done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url = futures[future]
+                        revalidated += self._apply_fetched(url, future.result(), cached, contents, fetched)
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        content_cache.store(fetched, revalidated=revalidated)
+        logger.info(f"📄 Conteúdo completo obtido para {len(contents)}/{len(urls)} páginas")
+        return self._merge_contents(results, contents)
+
+    @staticmethod
+    def _enrich_urls(results: List[Dict[str, Any]], top_n: int) -> List[str]:
+        """URLs dos primeiros resultados, sem duplicatas"""
+        urls = []
+        seen = set()
+        for result in results:
+            url = result.get('link')
+            if not url or not url.startswith('http'):
+                continue
+            normalized = normalize_url(url)
+            if normalized not in seen:
+                seen.add(normalized)
+                urls.append(url)
+            if len(urls) >= top_n:
+                break
+        return urls
+
+    @staticmethod
+    def _apply_fetched(url: str, result: Optional[Dict[str, Any]], cached: Dict[str, Dict[str, Any]],
+                       contents: Dict[str, str], fetched: Dict[str, Dict[str, Any]]) -> int:
+        """Incorpora o resultado de uma extração; retorna 1 se foi uma revalidação (304)"""
+        if not result:
+            # Falha na extração: usar a versão vencida, se houver
+            if url in cached:
+                contents[url] = cached[url]['content']
+                FALLBACKS.inc(kind='conteudo_vencido')
+            return 0
+
+        revalidated = 0
+        if result['not_modified'] and url in cached:
+            revalidated = 1
+            result['content'] = cached[url]['content']
+
+        if result.get('content'):
+            contents[url] = result['content']
+            fetched[url] = result
+        return revalidated
+
+    def _merge_contents(self, results: List[Dict[str, Any]], contents: Dict[str, str]) -> List[Dict[str, Any]]:
+        by_url = {normalize_url(url): content for url, content in contents.items()}
+        enriched = []
+        for result in results:
+            content = by_url.get(normalize_url(result.get('link', '')))
+            enriched.append(dict(result, content=content[:self.enrich_max_chars]) if content else result)
+        return enriched
+    
+    def search_query(self, query: str, num_results: int = 5, timeout: Optional[float] = None,
+                     stop_event: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+        """Busca uma query tentando Serper e, se falhar, Google (ou na ordem de saúde dos provedores)"""
+        start = time.monotonic()
+        deadline = start + timeout if timeout else None
+        providers = registry.providers(SEARCH, self)
+        answered_by = None
+        results = []
+
+        for attempt, provider in enumerate(order_by_health(list(providers))):
+            remaining = timeout
+            if attempt > 0:
+                # Fallback apenas se ainda houver tempo e resultados forem necessários
+                if stop_event is not None and stop_event.is_set():
+                    break
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    break
+
+            results = providers[provider].search(query, num_results, timeout=remaining)
+            if results:
+                answered_by = provider
+                break
+
+        stopped = stop_event is not None and stop_event.is_set()
+        self._record_query(query, answered_by, attempt if answered_by else 0, time.monotonic() - start, stopped)
+        return results if answered_by else []
+
+    def _record_query(self, query: str, answered_by: Optional[str], attempt: int, elapsed: float,
+                      stopped: bool = False) -> None:
+        SEARCH_QUERY_SECONDS.observe(elapsed, provider=answered_by or 'nenhum')
+        if answered_by is not None and attempt > 0:
+            FALLBACKS.inc(kind='busca')
+        if answered_by is None and not stopped:
+            FAILURES.inc(component='busca')
+        self.last_query_timings.append({'query': query, 'provedor': answered_by, 'ms': round(elapsed * 1000, 1)})
+
+    @staticmethod
+    def _prefix_count(results_by_index: Dict[int, List[Dict[str, Any]]], total: int) -> int:
+        """Conta resultados do prefixo contíguo de queries já resolvidas"""
+        collected = 0
+        for index in range(total):
+            if index not in results_by_index:
+                break
+            collected += len(results_by_index[index])
+        return collected
+
+    def _search_sequential(self, queries: List[str], indexes: List[int], max_results_per_query: int,
+                           max_total_results: int, results_by_index: Dict[int, List[Dict[str, Any]]],
+                           on_query_done: Optional[QueryCallback] = None) -> Dict[int, List[Dict[str, Any]]]:
+        """Executa as queries uma após a outra"""
+        fetched = {}
+
+        for index in indexes:
+            if self._prefix_count(results_by_index, len(queries)) >= max_total_results:
+                break
+
+            logger.debug(f"🔍 Buscando: {queries[index]}")
+            fetched[index] = self.search_query(queries[index], max_results_per_query, timeout=self.query_timeout)
+            results_by_index[index] = fetched[index]
+            if on_query_done:
+                on_query_done(queries[index], len(fetched[index]), 'busca')
+
+        return fetched
+
+    def _search_parallel(self, queries: List[str], indexes: List[int], max_results_per_query: int,
+                         max_total_results: int, results_by_index: Dict[int, List[Dict[str, Any]]],
+                         on_query_done: Optional[QueryCallback] = None) -> Dict[int, List[Dict[str, Any]]]:
+        """Executa as queries em paralelo preservando a ordem original dos resultados"""
+        fetched = {}
+        stop_event = threading.Event()
+        workers = max(1, min(self.max_workers, len(indexes)))
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+        try:
+            futures = {}
+            for index in indexes:
+                logger.debug(f"🔍 Buscando: {queries[index]}")
+                future = executor.submit(self.search_query, queries[index], max_results_per_query,
+                                         self.query_timeout, stop_event)
+                futures[future] = index
+
+            # Prazo global: cada lote de workers tem no máximo query_timeout segundos
+            batches = -(-len(indexes) // workers)
+            global_deadline = time.monotonic() + self.query_timeout * batches + 1
+            pending = set(futures)
+
+            while pending:
+                # Resultados suficientes: cancelar queries pendentes e fallbacks ainda não iniciados
+                if self._prefix_count(results_by_index, len(queries)) >= max_total_results:
+                    break
+
+                remaining = global_deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"⏱️ Prazo de busca esgotado, {len(pending)} queries descartadas")
+                    break
+
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures[future]
+                    try:
+                        fetched[index] = future.result()
+                    except Exception as e:
+                        logger.error(f"Erro na busca paralela: {e}")
+                        fetched[index] = []
+                    results_by_index[index] = fetched[index]
+                    if on_query_done:
+                        on_query_done(queries[index], len(fetched[index]), 'busca')
+        finally:
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return fetched
+
+    @staticmethod
+    def cache_providers() -> List[str]:
+        """Provedores que compõem as chaves do cache (o backend stub tem chaves próprias)"""
+        if registry.backend == BACKEND_STUB:
+            return [f'stub-{name}' for name in SEARCH_PROVIDERS]
+        return SEARCH_PROVIDERS
+
+    def _cache_ttl(self, query: str) -> int:
+        """TTL por query: buscas genéricas mudam pouco e podem ficar mais tempo em cache"""
+        if query in GENERAL_QUERIES:
+            return int(os.getenv('SEARCH_CACHE_TTL_GENERAL', 7 * 24 * 3600))
+        return search_cache.default_ttl
+
+    def _resolve_queries(self, queries: List[str], max_results_per_query: int, parallel: Optional[bool],
+                         max_total_results: int, on_query_done: Optional[QueryCallback] = None,
+                         prefetched: Optional[PrefetchedResults] = None) -> Dict[int, List[Dict[str, Any]]]:
+        """Resolve as queries por resultados já obtidos, cache ou busca, indexadas pela posição"""
+        if parallel is None:
+            parallel = self.parallel_search
+
+        results_by_index = self._known_results(queries, max_results_per_query, on_query_done, prefetched)
+        indexes = [index for index in range(len(queries)) if index not in results_by_index]
+        if parallel and len(indexes) > 1:
+            fetched = self._search_parallel(queries, indexes, max_results_per_query, max_total_results,
+                                            results_by_index, on_query_done)
+        else:
+            fetched = self._search_sequential(queries, indexes, max_results_per_query, max_total_results,
+                                              results_by_index, on_query_done)
+
+        self._store_fetched(queries, fetched, max_results_per_query)
+        return results_by_index
+
+    def _known_results(self, queries: List[str], max_results_per_query: int,
+                       on_query_done: Optional[QueryCallback] = None,
+                       prefetched: Optional[PrefetchedResults] = None) -> Dict[int, List[Dict[str, Any]]]:
+        """Queries já resolvidas pelo lote ou pelo cache, indexadas pela posição"""
+        results_by_index = {}
+        if prefetched:
+            for index, query in enumerate(queries):
+                results = prefetched.get(normalize_query(query))
+                if results is not None:
+                    results_by_index[index] = results
+                    if on_query_done:
+                        on_query_done(query, len(results), 'lote')
+
+        pending = [query for index, query in enumerate(queries) if index not in results_by_index]
+        cache_providers = self.cache_providers()
+        cached = search_cache.lookup(pending, cache_providers, SEARCH_LOCALE, max_results_per_query)
+        if cached:
+            hits = 0
+            for index, query in enumerate(queries):
+                if index not in results_by_index and query in cached:
+                    results_by_index[index] = cached[query]
+                    hits += 1
+                    if on_query_done:
+                        on_query_done(query, len(cached[query]), 'cache')
+            logger.info(f"💾 {hits} queries atendidas pelo cache")
+        return results_by_index
+
+    def _store_fetched(self, queries: List[str], fetched: Dict[int, List[Dict[str, Any]]],
+                       max_results_per_query: int) -> None:
+        cache_providers = self.cache_providers()
+        search_cache.store([
+            (queries[index], results[0].get('source', cache_providers[0]), SEARCH_LOCALE,
+             max_results_per_query, results, self._cache_ttl(queries[index]))
+            for index, results in fetched.items() if results
+        ])
+
+    def collect_results(self, queries: List[str], max_results_per_query: int = 5,
+                        parallel: Optional[bool] = None, max_total_results: int = 20,
+                        on_query_done: Optional[QueryCallback] = None,
+                        prefetched: Optional[PrefetchedResults] = None) -> List[Dict[str, Any]]:
+        """Executa as queries (usando o cache quando possível) e retorna os resultados em ordem"""
+        results_by_index = self._resolve_queries(queries, max_results_per_query, parallel, max_total_results,
+                                                 on_query_done, prefetched)
+        return self._ordered_results(results_by_index, len(queries), max_total_results)
+
+    @staticmethod
+    def _ordered_results(results_by_index: Dict[int, List[Dict[str, Any]]], total: int,
+                         max_total_results: int) -> List[Dict[str, Any]]:
+        all_results = []
+        for index in range(total):
+            all_results.extend(results_by_index.get(index, []))
+
+        return all_results[:max_total_results]
+
+    def search_many(self, queries: List[str], max_results_per_query: int = 5,
+                    on_query_done: Optional[QueryCallback] = None) -> PrefetchedResults:
+        """Resolve todas as queries (sem limite total), deduplicadas, para reaproveitamento entre análises"""
+        unique = list({normalize_query(query): query for query in queries}.values())
+        results_by_index = self._resolve_queries(unique, max_results_per_query, None,
+                                                 len(unique) * max_results_per_query + 1, on_query_done)
+        return {normalize_query(unique[index]): results for index, results in results_by_index.items()}
+
+    def comprehensive_search(self, queries: List[str], max_results_per_query: int = 5,
+                             parallel: Optional[bool] = None, max_total_results: int = 20,
+                             on_query_done: Optional[QueryCallback] = None, enrich: Optional[bool] = None,
+                             prefetched: Optional[PrefetchedResults] = None) -> str:
+        """Realiza busca abrangente e retorna contexto formatado"""
+        all_results = self.collect_results(queries, max_results_per_query, parallel, max_total_results, on_query_done,
+                                           prefetched)
+        
+        # Enriquecer os principais resultados com o texto completo das páginas
+        if self.enrich_enabled if enrich is None else enrich:
+            with self.timings.stage('enriquecimento'):
+                all_results = self.enrich_results(all_results)
         
-        # Formatar contexto
+        return self.format_context(all_results)
+    
+    @staticmethod
+    def format_context(results: List[Dict[str, Any]]) -> str:
+        """Formata os resultados como contexto de pesquisa para o prompt"""
         context_parts = []
         
-        for i, result in enumerate(all_results[:20]):  # Limitar a 20 resultados
+        for i, result in enumerate(results):
             context_parts.append(f"--- FONTE {i+1}: {result['title']} ---")
             context_parts.append(f"URL: {result['link']}")
             context_parts.append(f"Conteúdo: {result['snippet']}")
+            if result.get('content'):
+                context_parts.append(f"Texto completo: {result['content']}")
             context_parts.append("")
         
         return "\n".join(context_parts)
     
-    def search_for_market_analysis(self, data: Dict[str, Any]) -> str:
+    def search_for_market_analysis(self, data: Dict[str, Any], on_query_done: Optional[QueryCallback] = None,
+                                   prefetched: Optional[PrefetchedResults] = None) -> str:
         """Busca específica para análise de mercado"""
+        return self.comprehensive_search(self.build_market_queries(data), on_query_done=on_query_done,
+                                         prefetched=prefetched)
+    
+    # Caminho assíncrono (servidor ASGI): mesma lógica com E/S não bloqueante.
+    # Caches em disco continuam síncronos e são chamados via `run_blocking`.
+    
+    async def asearch_query(self, query: str, num_results: int = 5,
+                            timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Versão assíncrona de `search_query`"""
+        start = time.monotonic()
+        deadline = start + timeout if timeout else None
+        providers = registry.providers(SEARCH, self)
+        answered_by = None
+        results = []
+
+        for attempt, provider in enumerate(order_by_health(list(providers))):
+            remaining = timeout
+            if attempt > 0:
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    break
+
+            results = await providers[provider].asearch(query, num_results, timeout=remaining)
+            if results:
+                answered_by = provider
+                break
+
+        self._record_query(query, answered_by, attempt if answered_by else 0, time.monotonic() - start)
+        return results if answered_by else []
+
+    async def _asearch_all(self, queries: List[str], indexes: List[int], max_results_per_query: int,
+                           max_total_results: int, results_by_index: Dict[int, List[Dict[str, Any]]],
+                           on_query_done: Optional[QueryCallback] = None) -> Dict[int, List[Dict[str, Any]]]:
+        """Executa as queries concorrentemente (até SEARCH_MAX_WORKERS por análise) preservando a ordem"""
+        fetched = {}
+        if not indexes:
+            return fetched
+
+        workers = max(1, min(self.max_workers, len(indexes)))
+        semaphore = asyncio.Semaphore(workers)
+
+        async def run(index: int) -> List[Dict[str, Any]]:
+            async with semaphore:
+                logger.debug(f"🔍 Buscando: {queries[index]}")
+                return await self.asearch_query(queries[index], max_results_per_query, self.query_timeout)
+
+        tasks = {asyncio.ensure_future(run(index)): index for index in indexes}
+        batches = -(-len(indexes) // workers)
+        global_deadline = time.monotonic() + self.query_timeout * batches + 1
+        pending = set(tasks)
+
+        try:
+            while pending:
+                # Resultados suficientes: cancelar as queries (e fallbacks) ainda em andamento
+                if self._prefix_count(results_by_index, len(queries)) >= max_total_results:
+                    break
+
+                remaining = global_deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"⏱️ Prazo de busca esgotado, {len(pending)} queries descartadas")
+                    break
+
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = tasks[task]
+                    try:
+                        fetched[index] = task.result()
+                    except Exception as e:
+                        logger.error(f"Erro na busca paralela: {e}")
+                        fetched[index] = []
+                    results_by_index[index] = fetched[index]
+                    if on_query_done:
+                        on_query_done(queries[index], len(fetched[index]), 'busca')
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return fetched
+
+    async def acollect_results(self, queries: List[str], max_results_per_query: int = 5,
+                               max_total_results: int = 20, on_query_done: Optional[QueryCallback] = None,
+                               prefetched: Optional[PrefetchedResults] = None,
+                               run_blocking: BlockingRunner = asyncio.to_thread) -> List[Dict[str, Any]]:
+        """Versão assíncrona de `collect_results`"""
+        results_by_index = await run_blocking(self._known_results, queries, max_results_per_query,
+                                              on_query_done, prefetched)
+        indexes = [index for index in range(len(queries)) if index not in results_by_index]
+        fetched = await self._asearch_all(queries, indexes, max_results_per_query, max_total_results,
+                                          results_by_index, on_query_done)
+        await run_blocking(self._store_fetched, queries, fetched, max_results_per_query)
+        return self._ordered_results(results_by_index, len(queries), max_total_results)
+
+    async def aenrich_results(self, results: List[Dict[str, Any]], run_blocking: BlockingRunner = asyncio.to_thread,
+                              top_n: Optional[int] = None, budget: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Versão assíncrona de `enrich_results`"""
+        top_n = self.enrich_top_n if top_n is None else top_n
+        budget = self.enrich_budget if budget is None else budget
+        extractor = next(iter(registry.providers(EXTRACTOR, self).values()), None)
+        if extractor is None or top_n <= 0 or not results:
+            return results
+
+        urls = self._enrich_urls(results, top_n)
+        if not urls:
+            return results
+
+        cached = await run_blocking(content_cache.lookup, urls)
+        contents = {url: entry['content'] for url, entry in cached.items() if entry['fresh']}
+        to_fetch = [url for url in urls if url not in contents]
+        fetched = {}
+        revalidated = 0
+
+        if to_fetch:
+            semaphore = asyncio.Semaphore(max(1, self.enrich_max_workers))
+
+            async def fetch(url: str) -> Optional[Dict[str, Any]]:
+                stale = cached.get(url, {})
+                async with semaphore:
+                    return await extractor.afetch(url, self.enrich_url_timeout, stale.get('etag'),
+                                                  stale.get('last_modified'))
+
+            tasks = {asyncio.ensure_future(fetch(url)): url for url in to_fetch}
+            done, pending = await asyncio.wait(tasks, timeout=budget)
+            if pending:
+                logger.warning(f"⏱️ Orçamento de extração esgotado, {len(pending)} páginas descartadas")
+                for task in pending:
+                    task.cancel()
+
+            for task in done:
+                result = None if task.exception() else task.result()
+                revalidated += self._apply_fetched(tasks[task], result, cached, contents, fetched)
+
+        await run_blocking(content_cache.store, fetched, revalidated)
+        logger.info(f"📄 Conteúdo completo obtido para {len(contents)}/{len(urls)} páginas")
+        return self._merge_contents(results, contents)
+
+    async def asearch_for_market_analysis(self, data: Dict[str, Any], on_query_done: Optional[QueryCallback] = None,
+                                          prefetched: Optional[PrefetchedResults] = None,
+                                          run_blocking: BlockingRunner = asyncio.to_thread) -> str:
+        """Versão assíncrona de `search_for_market_analysis`"""
+        results = await self.acollect_results(self.build_market_queries(data), on_query_done=on_query_done,
+                                              prefetched=prefetched, run_blocking=run_blocking)
+        if self.enrich_enabled:
+            with self.timings.stage('enriquecimento'):
+                results = await self.aenrich_results(results, run_blocking)
+        return self.format_context(results)
+    
+    def build_market_queries(self, data: Dict[str, Any]) -> List[str]:
+        """Queries da análise de mercado, construídas a partir dos dados fornecidos"""
         
-        # Construir queries baseadas nos dados fornecidos
         queries = []
         
         segmento = data.get("segmento", "")
@@ -169,10 +746,63 @@ class SearchService:
                     queries.append(f"{concorrente} estratégia marketing")
         
         # Queries gerais importantes
-        queries.extend([
-            "marketing digital tendências 2024",
-            "comportamento consumidor online Brasil",
-            "estratégias marketing digital eficazes"
-        ])
+        queries.extend(GENERAL_QUERIES)
         
-        return self.comprehensive_search(queries[:10])  # Máximo 10 queries
\ No newline at end of file
+        return queries[:10]  # Máximo 10 queries
+
+
+class SerperSearchProvider(SearchProvider):
+    name = 'serper'
+
+    def __init__(self, service: SearchService):
+        self.service = service
+
+    def configured(self) -> bool:
+        return bool(self.service.serper_api_key)
+
+    def search(self, query: str, num_results: int = 10, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        return self.service.search_with_serper(query, num_results, timeout=timeout)
+
+    async def asearch(self, query: str, num_results: int = 10,
+                      timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        return await self.service.asearch_with_serper(query, num_results, timeout=timeout)
+
+
+class GoogleSearchProvider(SearchProvider):
+    name = 'google'
+
+    def __init__(self, service: SearchService):
+        self.service = service
+
+    def configured(self) -> bool:
+        return bool(self.service.google_api_key and self.service.google_cse_id)
+
+    def search(self, query: str, num_results: int = 10, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        return self.service.search_with_google(query, num_results, timeout=timeout)
+
+    async def asearch(self, query: str, num_results: int = 10,
+                      timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        return await self.service.asearch_with_google(query, num_results, timeout=timeout)
+
+
+class JinaContentExtractor(ContentExtractor):
+    name = 'jina'
+
+    def __init__(self, service: SearchService):
+        self.service = service
+
+    def configured(self) -> bool:
+        return bool(self.service.jina_api_key)
+
+    def fetch(self, url: str, timeout: Optional[float] = None, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return self.service.fetch_content_with_jina(url, timeout, etag, last_modified)
+
+    async def afetch(self, url: str, timeout: Optional[float] = None, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return await self.service.afetch_content_with_jina(url, timeout, etag, last_modified)
+
+
+registry.register(SEARCH, 'serper', SerperSearchProvider)
+registry.register(SEARCH, 'google', GoogleSearchProvider)
+registry.register(EXTRACTOR, 'jina', JinaContentExtractor)
@@ -0,0 +1,195 @@
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+from flask import Request, Response, send_file
+from src.services.logging_setup import get_logger
+
+try:
+    import brotli
+except ImportError:  # opcional: sem brotli, apenas gzip
+    brotli = None
+
+logger = get_logger('static')
+
+INDEX_FILE = 'index.html'
+
+# Nome com hash de conteúdo gerado pelo build (ex.: assets/index-4f3a9c1b.js): nunca muda
+HASHED_NAME = re.compile(r'[.-](?=[A-Za-z0-9_]*\d)[A-Za-z0-9_]{8,}\.[A-Za-z0-9]+$')
+
+CACHE_IMMUTABLE = 'public, max-age=31536000, immutable'
+# Demais arquivos (index.html) sempre revalidados pelo ETag
+CACHE_REVALIDATE = 'no-cache'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml',
+                      'image/svg+xml', 'application/manifest+json', 'image/x-icon', 'image/vnd.microsoft.icon')
+
+# Extensões de variantes pré-comprimidas pelo build, por codificação
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+@dataclass
+class _Variant:
+    etag: str
+    body: Optional[bytes] = None
+
+
+@dataclass
+class StaticAsset:
+    """Arquivo indexado: metadados, cabeçalhos e variantes (identity, gzip, br) já calculados"""
+    path: str
+    mimetype: str
+    last_modified: float
+    cache_control: str
+    variants: Dict[str, _Variant] = field(default_factory=dict)
+
+    @property
+    def compressed(self) -> bool:
+        return len(self.variants) > 1
+
+
+class StaticAssetIndex:
+    """Índice em memória da pasta estática, montado uma vez na inicialização
+
+    Arquivos até STATIC_MEMORY_MAX_BYTES ficam em memória junto com as variantes
+    comprimidas; os maiores são enviados do disco, com o ETag já calculado.
+    """
+
+    def __init__(self, root: Optional[str]):
+        self.root = root
+        self.memory_max_bytes = int(os.getenv('STATIC_MEMORY_MAX_BYTES', 2 * 1024 * 1024))
+        self.compress_min_bytes = int(os.getenv('STATIC_COMPRESS_MIN_BYTES', 1024))
+        self.assets: Dict[str, StaticAsset] = {}
+        self.build()
+
+    def build(self) -> None:
+        assets = {}
+        if self.root and os.path.isdir(self.root):
+            for directory, _, files in os.walk(self.root):
+                for name in files:
+                    full_path = os.path.join(directory, name)
+                    relative = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                    # Variantes pré-comprimidas pertencem ao arquivo original
+                    if any(relative.endswith(suffix) and os.path.exists(full_path[:-len(suffix)])
+                           for suffix in ENCODING_SUFFIXES.values()):
+                        continue
+                    try:
+                        assets[relative] = self._index_file(full_path, relative)
+                    except OSError as e:
+                        logger.warning(f"⚠️ Arquivo estático ignorado ({relative}): {str(e)}")
+
+        self.assets = assets
+        compressed = sum(1 for asset in assets.values() if asset.compressed)
+        logger.info(f"📦 {len(assets)} arquivos estáticos indexados ({compressed} com variantes comprimidas)")
+
+    def _index_file(self, full_path: str, relative: str) -> StaticAsset:
+        stat = os.stat(full_path)
+        mimetype = mimetypes.guess_type(relative)[0] or 'application/octet-stream'
+        hashed = bool(HASHED_NAME.search(relative.rsplit('/', 1)[-1]))
+        asset = StaticAsset(path=full_path, mimetype=mimetype, last_modified=stat.st_mtime,
+                            cache_control=CACHE_IMMUTABLE if hashed else CACHE_REVALIDATE)
+
+        in_memory = stat.st_size <= self.memory_max_bytes
+        digest = hashlib.blake2b(digest_size=16)
+        with open(full_path, 'rb') as f:
+            if in_memory:
+                content = f.read()
+                digest.update(content)
+            else:
+                content = None
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        etag = digest.hexdigest()
+        asset.variants['identity'] = _Variant(f'"{etag}"', content)
+
+        if content is None or len(content) < self.compress_min_bytes or not mimetype.startswith(COMPRESSIBLE_TYPES):
+            return asset
+
+        # ETag forte diferente por codificação: os bytes enviados são outros
+        for encoding, body in self._compressed_variants(full_path, content).items():
+            if len(body) < len(content):
+                asset.variants[encoding] = _Variant(f'"{etag}-{encoding}"', body)
+        return asset
+
+    @staticmethod
+    def _compressed_variants(full_path: str, content: bytes) -> Dict[str, bytes]:
+        """Variantes geradas pelo build (.br/.gz) ou comprimidas aqui, uma única vez"""
+        variants = {}
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            if os.path.exists(full_path + suffix):
+                with open(full_path + suffix, 'rb') as f:
+                    variants[encoding] = f.read()
+
+        if 'br' not in variants and brotli is not None:
+            variants['br'] = brotli.compress(content, quality=11)
+        if 'gzip' not in variants:
+            variants['gzip'] = gzip.compress(content, compresslevel=9, mtime=0)
+        return variants
+
+    def resolve(self, path: str) -> Optional[StaticAsset]:
+        """Arquivo pedido ou, para rotas do SPA, o index.html"""
+        return self.assets.get(path) or self.assets.get(INDEX_FILE)
+
+    def respond(self, asset: StaticAsset, request: Request) -> Response:
+        encoding = self._negotiate(asset, request.headers.get('Accept-Encoding', ''))
+        variant = asset.variants[encoding]
+        headers = {
+            'ETag': variant.etag,
+            'Cache-Control': asset.cache_control,
+            'Last-Modified': formatdate(asset.last_modified, usegmt=True),
+        }
+        if asset.compressed:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if self._not_modified(asset, variant, request):
+            return Response(status=304, headers=headers)
+
+        if variant.body is None:
+            response = send_file(asset.path, mimetype=asset.mimetype, etag=False, conditional=True,
+                                 last_modified=asset.last_modified, max_age=None)
+            response.headers.update(headers)
+            return response
+
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(variant.body, mimetype=asset.mimetype, headers=headers)
+
+    @staticmethod
+    def _negotiate(asset: StaticAsset, accept_encoding: str) -> str:
+        """Melhor variante aceita pelo cliente (br, depois gzip), respeitando q=0"""
+        accepted = {}
+        for item in accept_encoding.split(','):
+            name, _, params = item.strip().partition(';')
+            quality = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            if name:
+                accepted[name.strip().lower()] = quality
+
+        for encoding in ('br', 'gzip'):
+            if encoding in asset.variants and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return encoding
+        return 'identity'
+
+    @staticmethod
+    def _not_modified(asset: StaticAsset, variant: _Variant, request: Request) -> bool:
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or variant.etag in tags or f'W/{variant.etag}' in tags
+
+        if_modified_since = request.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return int(asset.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
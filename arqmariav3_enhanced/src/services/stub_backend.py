@@ -0,0 +1,310 @@
+import os
+import json
+import math
+import time
+import asyncio
+import random
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from src.services.circuit_breaker import aguarded_call, guarded_call
+from src.services.json_extractor import EXPECTED_SECTIONS
+from src.services.providers import (registry, SearchProvider, ContentExtractor, LLMProvider,
+                                    SEARCH, EXTRACTOR, LLM, BACKEND_STUB, PROVIDER_ORDER)
+from src.services.logging_setup import get_logger
+
+logger = get_logger('stub')
+
+# Distribuições padrão por tipo (latência em ms, tamanho em caracteres)
+DEFAULT_LATENCY = {
+    SEARCH: 'uniform:50-150',
+    EXTRACTOR: 'uniform:100-300',
+    LLM: 'lognormal:1000,0.4',
+}
+DEFAULT_PAYLOAD = {
+    SEARCH: 'normal:160,40',
+    EXTRACTOR: 'normal:2500,800',
+    LLM: 'normal:600,150',
+}
+
+WORDS = (
+    'mercado consumidor digital estratégia crescimento canal marca produto serviço público pesquisa '
+    'tendência oportunidade concorrência preço valor jornada conversão retenção conteúdo campanha '
+    'lançamento receita margem segmento nicho dados comportamento engajamento autoridade oferta'
+).split()
+
+
+class StubError(Exception):
+    """Falha simulada pelo backend stub"""
+
+
+class StubThrottled(StubError):
+    """429 simulado, com Retry-After, como o de um provedor real"""
+    status_code = 429
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f'Limite de requisições simulado em {name} (429)')
+        self.headers = {'Retry-After': f'{retry_after:g}'}
+
+
+class Distribution:
+    """Distribuição configurável: fixed:N, uniform:A-B, normal:média,desvio ou lognormal:mediana,sigma"""
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(':')
+        self.spec = spec
+        self.kind = kind.strip().lower()
+        separator = '-' if self.kind == 'uniform' else ','
+        self.params = [float(value) for value in params.split(separator) if value.strip()]
+        if self.kind not in ('fixed', 'uniform', 'normal', 'lognormal') or not self.params:
+            raise ValueError(f'Distribuição inválida: {spec}')
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == 'fixed':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return rng.uniform(self.params[0], self.params[-1])
+        if self.kind == 'normal':
+            return max(0.0, rng.gauss(self.params[0], self.params[1] if len(self.params) > 1 else 0))
+        sigma = self.params[1] if len(self.params) > 1 else 0.5
+        return rng.lognormvariate(math.log(max(self.params[0], 1e-3)), sigma)
+
+
+class StubSettings:
+    """Parâmetros do stub por provedor (STUB_<PARÂMETRO>_<PROVEDOR>, depois _<TIPO>, depois global)"""
+
+    def __init__(self, kind: str, name: str):
+        self.seed = os.getenv('STUB_SEED', '42')
+        self.latency = Distribution(self._get('LATENCY', kind, name, DEFAULT_LATENCY[kind]))
+        self.payload = Distribution(self._get('PAYLOAD', kind, name, DEFAULT_PAYLOAD[kind]))
+        self.error_rate = float(self._get('ERROR_RATE', kind, name, '0'))
+        self.throttle_rate = float(self._get('THROTTLE_RATE', kind, name, '0'))
+        self.retry_after = float(self._get('RETRY_AFTER', kind, name, '1'))
+
+    @staticmethod
+    def _get(parameter: str, kind: str, name: str, default: str) -> str:
+        for env in (f'STUB_{parameter}_{name.upper()}', f'STUB_{parameter}_{kind.upper()}', f'STUB_{parameter}'):
+            value = os.getenv(env)
+            if value:
+                return value
+        return default
+
+
+class _StubProvider:
+    """Base dos stubs: cada chamada sorteia latência, erro e tamanho de forma determinística
+
+    O sorteio depende da semente, do provedor, da entrada e de quantas vezes a
+    mesma entrada já foi pedida, então repetições do benchmark são idênticas e
+    novas tentativas podem ter resultado diferente.
+    """
+    kind = ''
+    _attempts: Dict[str, int] = {}
+    _attempts_lock = threading.Lock()
+
+    def __init__(self, name: str):
+        self.name = name
+        self.settings = StubSettings(self.kind, name)
+
+    def configured(self) -> bool:
+        return True
+
+    def _rng(self, key: str) -> random.Random:
+        with self._attempts_lock:
+            if len(self._attempts) > 100000:
+                self._attempts.clear()
+            attempt = self._attempts.get(f'{self.name}|{key}', 0)
+            self._attempts[f'{self.name}|{key}'] = attempt + 1
+        raw = f'{self.settings.seed}|{self.name}|{key}|{attempt}'.encode('utf-8')
+        return random.Random(int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), 'big'))
+
+    def _failure(self, rng: random.Random) -> Optional[StubError]:
+        if rng.random() < self.settings.error_rate:
+            return StubError(f'Erro simulado em {self.name}')
+        # Só sorteia se configurado, para não mudar as sequências das sementes existentes
+        if self.settings.throttle_rate and rng.random() < self.settings.throttle_rate:
+            return StubThrottled(self.name, self.settings.retry_after)
+        return None
+
+    def _draw(self, rng: random.Random, timeout: Optional[float]) -> Tuple[float, Optional[StubError]]:
+        """Sorteia a espera (limitada ao timeout) e a falha, se houver, a levantar depois dela"""
+        latency = self.settings.latency.sample(rng) / 1000
+        error = self._failure(rng)
+        if timeout is not None and latency > timeout:
+            return max(0.0, timeout), StubError(f'Timeout simulado em {self.name} ({latency:.2f}s > {timeout:.2f}s)')
+        return latency, error
+
+    def _simulate(self, rng: random.Random, timeout: Optional[float]) -> None:
+        delay, error = self._draw(rng, timeout)
+        time.sleep(delay)
+        if error:
+            raise error
+
+    async def _asimulate(self, rng: random.Random, timeout: Optional[float]) -> None:
+        delay, error = self._draw(rng, timeout)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+
+    @staticmethod
+    def _text(rng: random.Random, chars: float) -> str:
+        words = []
+        size = 0
+        while size < chars:
+            word = rng.choice(WORDS)
+            words.append(word)
+            size += len(word) + 1
+        return ' '.join(words).capitalize() + '.'
+
+
+class StubSearchProvider(_StubProvider, SearchProvider):
+    kind = SEARCH
+
+    def search(self, query: str, num_results: int = 10, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        rng = self._rng(f'{query}|{num_results}')
+        try:
+            with guarded_call(self.name):
+                self._simulate(rng, timeout)
+        except Exception as e:
+            logger.warning(f"Erro na busca {self.name} (stub): {e}")
+            return []
+        return self._results(query, num_results, rng)
+
+    async def asearch(self, query: str, num_results: int = 10,
+                      timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        rng = self._rng(f'{query}|{num_results}')
+        try:
+            async with aguarded_call(self.name):
+                await self._asimulate(rng, timeout)
+        except Exception as e:
+            logger.warning(f"Erro na busca {self.name} (stub): {e}")
+            return []
+        return self._results(query, num_results, rng)
+
+    def _results(self, query: str, num_results: int, rng: random.Random) -> List[Dict[str, Any]]:
+        digest = hashlib.sha1(query.encode('utf-8')).hexdigest()[:10]
+        return [{
+            'title': f'{query} - resultado {i + 1}',
+            'link': f'https://stub.local/{digest}/{i + 1}',
+            'snippet': self._text(rng, self.settings.payload.sample(rng)),
+            'source': f'stub-{self.name}',
+        } for i in range(num_results)]
+
+
+class StubContentExtractor(_StubProvider, ContentExtractor):
+    kind = EXTRACTOR
+
+    def fetch(self, url: str, timeout: Optional[float] = None, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        rng = self._rng(url)
+        try:
+            with guarded_call(self.name):
+                self._simulate(rng, timeout)
+        except Exception as e:
+            logger.warning(f"Erro ao extrair conteúdo com {self.name} (stub): {e}")
+            return None
+        return self._content(url, etag, last_modified)
+
+    async def afetch(self, url: str, timeout: Optional[float] = None, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        rng = self._rng(url)
+        try:
+            async with aguarded_call(self.name):
+                await self._asimulate(rng, timeout)
+        except Exception as e:
+            logger.warning(f"Erro ao extrair conteúdo com {self.name} (stub): {e}")
+            return None
+        return self._content(url, etag, last_modified)
+
+    def _content(self, url: str, etag: Optional[str], last_modified: Optional[str]) -> Dict[str, Any]:
+        # Conteúdo estável por URL: o ETag permite simular revalidação (304)
+        stable = random.Random(hashlib.sha1(url.encode('utf-8')).hexdigest())
+        content = self._text(stable, self.settings.payload.sample(stable))
+        content_etag = '"' + hashlib.sha1(content.encode('utf-8')).hexdigest()[:16] + '"'
+        if etag == content_etag:
+            return {'not_modified': True, 'etag': etag, 'last_modified': last_modified}
+        return {'not_modified': False, 'content': content, 'etag': content_etag, 'last_modified': None}
+
+
+class StubLLMProvider(_StubProvider, LLMProvider):
+    kind = LLM
+    streaming = True
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.model = f'stub-{name}'
+        self.chunk_chars = int(os.getenv('STUB_STREAM_CHUNK_CHARS', 40))
+
+    def _analysis(self, prompt: str, rng: random.Random) -> str:
+        # Prompts por seção listam só as seções pedidas
+        sections = [section for section in EXPECTED_SECTIONS if f'**{section}**' in prompt] or EXPECTED_SECTIONS
+        return json.dumps({
+            section: {
+                'resumo': self._text(rng, self.settings.payload.sample(rng)),
+                'itens': [self._text(rng, 60) for _ in range(3)],
+            } for section in sections
+        }, ensure_ascii=False, indent=2)
+
+    def generate(self, prompt: str, timeout: Optional[float] = None, max_tokens: int = 4000) -> Optional[str]:
+        rng = self._rng(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        try:
+            with guarded_call(self.name):
+                self._simulate(rng, timeout)
+        except Exception as e:
+            logger.warning(f"Erro ao usar {self.name} (stub): {e}")
+            return None
+        return self._analysis(prompt, rng)
+
+    async def agenerate(self, prompt: str, timeout: Optional[float] = None, max_tokens: int = 4000) -> Optional[str]:
+        rng = self._rng(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        try:
+            async with aguarded_call(self.name):
+                await self._asimulate(rng, timeout)
+        except Exception as e:
+            logger.warning(f"Erro ao usar {self.name} (stub): {e}")
+            return None
+        return self._analysis(prompt, rng)
+
+    def stream(self, prompt: str, max_tokens: int = 4000) -> Iterator[str]:
+        """Primeiro trecho após ~20% da latência sorteada; o restante distribuído entre os trechos"""
+        rng = self._rng(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        latency = self.settings.latency.sample(rng) / 1000
+        error = self._failure(rng)
+        if error:
+            time.sleep(latency * 0.2)
+            raise error
+
+        text = self._analysis(prompt, rng)
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+        time.sleep(latency * 0.2)
+        pause = latency * 0.8 / max(1, len(chunks))
+        for chunk in chunks:
+            yield chunk
+            time.sleep(pause)
+
+    async def astream(self, prompt: str, max_tokens: int = 4000) -> AsyncIterator[str]:
+        rng = self._rng(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        latency = self.settings.latency.sample(rng) / 1000
+        error = self._failure(rng)
+        if error:
+            await asyncio.sleep(latency * 0.2)
+            raise error
+
+        text = self._analysis(prompt, rng)
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+        await asyncio.sleep(latency * 0.2)
+        pause = latency * 0.8 / max(1, len(chunks))
+        for chunk in chunks:
+            yield chunk
+            await asyncio.sleep(pause)
+
+
+def _register():
+    for name in PROVIDER_ORDER[SEARCH]:
+        registry.register(SEARCH, name, lambda owner, name=name: StubSearchProvider(name), backend=BACKEND_STUB)
+    for name in PROVIDER_ORDER[EXTRACTOR]:
+        registry.register(EXTRACTOR, name, lambda owner, name=name: StubContentExtractor(name), backend=BACKEND_STUB)
+    for name in PROVIDER_ORDER[LLM]:
+        registry.register(LLM, name, lambda owner, name=name: StubLLMProvider(name), backend=BACKEND_STUB)
+
+
+_register()
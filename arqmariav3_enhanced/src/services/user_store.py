@@ -0,0 +1,342 @@
+import os
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from src.models.user import User, db
+from src.services.logging_setup import get_logger
+
+logger = get_logger('user_store')
+
+# Campos que podem ser pedidos em ?fields= (o id sempre é lido: é o cursor)
+USER_FIELDS = {
+    'id': User.id,
+    'username': User.username,
+    'email': User.email,
+}
+UNIQUE_FIELDS = ('username', 'email')
+MAX_LENGTHS = {'username': 80, 'email': 120}
+
+# Item do lote: posição no payload e valores já validados
+BulkItem = Tuple[int, Dict[str, Any]]
+
+
+class InvalidUserRequest(ValueError):
+    """Parâmetros de listagem inválidos"""
+
+
+class BulkTooLarge(Exception):
+    """Lote com mais itens que o permitido"""
+
+
+def _chunks(items: List[BulkItem], size: int) -> Iterator[List[BulkItem]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _validate_fields(item: Dict[str, Any], required: bool) -> Optional[str]:
+    for name, max_length in MAX_LENGTHS.items():
+        value = item.get(name)
+        if value is None:
+            if required:
+                return f'Campo obrigatório: {name}'
+            continue
+        if not isinstance(value, str) or not value.strip():
+            return f'Campo inválido: {name}'
+        if len(value) > max_length:
+            return f'{name} excede {max_length} caracteres'
+    return None
+
+
+def _summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        'total': len(results),
+        'summary': dict(Counter(result['status'] for result in results)),
+        'results': results,
+    }
+
+
+class UserStore:
+    """Listagem por cursor e operações em lote sobre os usuários
+
+    Os lotes são gravados em transações de USER_BULK_BATCH_SIZE itens. Conflitos
+    de username/email são detectados antes da escrita e informados por item;
+    se outra requisição gravar o mesmo valor no meio tempo, a transação do lote
+    é refeita item a item para isolar o conflito.
+    """
+
+    def __init__(self):
+        self.page_size = int(os.getenv('USER_PAGE_SIZE', 50))
+        self.max_page_size = int(os.getenv('USER_PAGE_MAX_SIZE', 500))
+        self.max_items = int(os.getenv('USER_BULK_MAX_ITEMS', 1000))
+        self.batch_size = max(1, int(os.getenv('USER_BULK_BATCH_SIZE', 200)))
+
+    @staticmethod
+    def parse_fields(fields: Optional[str]) -> List[str]:
+        if not fields:
+            return list(USER_FIELDS)
+
+        names = list(dict.fromkeys(name.strip() for name in fields.split(',') if name.strip()))
+        unknown = [name for name in names if name not in USER_FIELDS]
+        if unknown or not names:
+            raise InvalidUserRequest(f'Campos inválidos: {", ".join(unknown) or fields}; '
+                                     f'disponíveis: {", ".join(USER_FIELDS)}')
+        return names
+
+    def list(self, limit: Optional[int] = None, after: Optional[int] = None,
+             fields: Optional[str] = None) -> Dict[str, Any]:
+        """Página ordenada por id a partir do cursor `after`, lendo só as colunas pedidas"""
+        limit = self.page_size if limit is None else limit
+        if limit < 1:
+            raise InvalidUserRequest('limit deve ser maior que zero')
+        limit = min(limit, self.max_page_size)
+        names = self.parse_fields(fields)
+
+        columns = [USER_FIELDS[name] for name in dict.fromkeys(['id'] + names)]
+        query = db.session.query(*columns).order_by(User.id)
+        if after is not None:
+            query = query.filter(User.id > after)
+
+        # Um registro a mais indica se existe próxima página, sem COUNT
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return {
+            'items': [{name: getattr(row, name) for name in names} for row in rows],
+            'limit': limit,
+            'next_cursor': rows[-1].id if has_more else None,
+        }
+
+    def check_size(self, items: List[Any]) -> None:
+        if len(items) > self.max_items:
+            raise BulkTooLarge(f'Lote com {len(items)} itens; máximo de {self.max_items}')
+
+    def bulk_create(self, items: List[Any]) -> Dict[str, Any]:
+        self.check_size(items)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            error = _validate_fields(item, required=True) if isinstance(item, dict) else 'Item deve ser um objeto'
+            if error:
+                results[index] = {'index': index, 'status': 'invalid', 'error': error}
+            else:
+                pending.append((index, {'username': item['username'], 'email': item['email']}))
+
+        seen = {field: {} for field in UNIQUE_FIELDS}
+        for batch in _chunks(pending, self.batch_size):
+            batch = self._drop_conflicts(batch, results, seen)
+            if not batch:
+                continue
+
+            users = [User(**values) for _, values in batch]
+            db.session.add_all(users)
+            if self._commit_batch(batch, results, self._create_one):
+                for (index, _), user in zip(batch, users):
+                    results[index] = {'index': index, 'status': 'created', 'id': user.id}
+
+        return _summary(results)
+
+    def bulk_update(self, items: List[Any]) -> Dict[str, Any]:
+        self.check_size(items)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        pending = []
+        updated_ids = set()
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                error = 'Item deve ser um objeto'
+            elif not isinstance(item.get('id'), int) or isinstance(item.get('id'), bool):
+                error = 'Campo obrigatório: id'
+            elif item['id'] in updated_ids:
+                error = f"id {item['id']} repetido no lote"
+            elif not any(field in item for field in UNIQUE_FIELDS):
+                error = 'Informe username e/ou email'
+            else:
+                error = _validate_fields(item, required=False)
+
+            if error:
+                results[index] = {'index': index, 'status': 'invalid', 'error': error}
+            else:
+                updated_ids.add(item['id'])
+                pending.append((index, {key: item[key] for key in ('id',) + UNIQUE_FIELDS if key in item}))
+
+        seen = {field: {} for field in UNIQUE_FIELDS}
+        for batch in _chunks(pending, self.batch_size):
+            batch = self._drop_conflicts(batch, results, seen)
+            ids = [values['id'] for _, values in batch]
+            users = {user.id: user for user in User.query.filter(User.id.in_(ids))} if ids else {}
+
+            found = []
+            for index, values in batch:
+                user = users.get(values['id'])
+                if user is None:
+                    results[index] = {'index': index, 'status': 'not_found', 'id': values['id']}
+                    continue
+                found.append((index, values))
+
+            if found:
+                self._release_swapped(found, users)
+            for _, values in found:
+                user = users[values['id']]
+                for field in UNIQUE_FIELDS:
+                    if field in values:
+                        setattr(user, field, values[field])
+
+            if found and self._commit_batch(found, results, self._update_one):
+                for index, values in found:
+                    results[index] = {'index': index, 'status': 'updated', 'id': values['id']}
+
+        return _summary(results)
+
+    def bulk_delete(self, ids: List[Any]) -> Dict[str, Any]:
+        self.check_size(ids)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(ids)
+        pending = []
+        seen = set()
+        for index, user_id in enumerate(ids):
+            if not isinstance(user_id, int) or isinstance(user_id, bool):
+                results[index] = {'index': index, 'status': 'invalid', 'error': 'id deve ser inteiro'}
+            elif user_id in seen:
+                results[index] = {'index': index, 'status': 'invalid', 'error': f'id {user_id} repetido no lote'}
+            else:
+                seen.add(user_id)
+                pending.append((index, {'id': user_id}))
+
+        for batch in _chunks(pending, self.batch_size):
+            ids_in_batch = [values['id'] for _, values in batch]
+            existing = {user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(ids_in_batch))}
+
+            found = []
+            for index, values in batch:
+                if values['id'] in existing:
+                    found.append((index, values))
+                else:
+                    results[index] = {'index': index, 'status': 'not_found', 'id': values['id']}
+            if not found:
+                continue
+
+            db.session.execute(delete(User).where(User.id.in_([values['id'] for _, values in found])))
+            if self._commit_batch(found, results, self._delete_one):
+                for index, values in found:
+                    results[index] = {'index': index, 'status': 'deleted', 'id': values['id']}
+
+        return _summary(results)
+
+    @staticmethod
+    def _drop_conflicts(batch: List[BulkItem], results: List[Optional[Dict[str, Any]]],
+                        seen: Dict[str, Dict[Any, int]]) -> List[BulkItem]:
+        """Remove do lote (marcando como conflito) os valores únicos já usados no banco ou no próprio payload
+
+        Vale o estado final do lote: o valor de um usuário que também está no lote
+        trocando esse campo fica livre (A assume o email de B enquanto B muda o seu).
+        Se a troca de B cair por conflito, o valor volta a ser de B e A é reavaliado.
+        """
+        owners = {}
+        for field in UNIQUE_FIELDS:
+            values = [values[field] for _, values in batch if field in values]
+            column = USER_FIELDS[field]
+            rows = db.session.query(User.id, column).filter(column.in_(values)).all() if values else []
+            owners[field] = {value: user_id for user_id, value in rows}
+
+        kept = dict(batch)
+        while True:
+            changing = {values['id']: values for values in kept.values() if 'id' in values}
+            in_batch = {field: {} for field in UNIQUE_FIELDS}
+            conflicts = {}
+            for index, values in kept.items():
+                conflict = None
+                for field in UNIQUE_FIELDS:
+                    if field not in values:
+                        continue
+                    value = values[field]
+                    owner = owners[field].get(value)
+                    released = owner in changing and changing[owner].get(field, value) != value
+                    if owner is not None and owner != values.get('id') and not released:
+                        conflict = (field, f'{field} já cadastrado')
+                    elif value in seen[field] or value in in_batch[field]:
+                        conflict = (field, f'{field} repetido no lote '
+                                           f'(item {seen[field].get(value, in_batch[field].get(value))})')
+                    if conflict:
+                        break
+
+                if conflict:
+                    conflicts[index] = conflict
+                    continue
+                for field in UNIQUE_FIELDS:
+                    if field in values:
+                        in_batch[field][values[field]] = index
+
+            if not conflicts:
+                break
+            for index, (field, error) in conflicts.items():
+                results[index] = {'index': index, 'status': 'conflict', 'field': field, 'error': error}
+                del kept[index]
+
+        for field in UNIQUE_FIELDS:
+            seen[field].update(in_batch[field])
+        return list(kept.items())
+
+    @staticmethod
+    def _release_swapped(found: List[BulkItem], users: Dict[int, User]) -> None:
+        """Troca valores que outro item do lote vai assumir por temporários antes da gravação final
+
+        O índice único é verificado a cada UPDATE, então numa troca (A ↔ B) o
+        primeiro UPDATE colidiria com o valor ainda gravado no outro usuário.
+        """
+        targets = {field: {values[field] for _, values in found if field in values} for field in UNIQUE_FIELDS}
+        released = False
+        for _, values in found:
+            user = users[values['id']]
+            for field in UNIQUE_FIELDS:
+                current = getattr(user, field)
+                if field in values and values[field] != current and current in targets[field]:
+                    setattr(user, field, f'~troca:{user.id}')
+                    released = True
+        if released:
+            db.session.flush()
+
+    def _commit_batch(self, batch: List[BulkItem], results: List[Optional[Dict[str, Any]]],
+                      write_one: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]) -> bool:
+        """Confirma o lote; em violação de integridade, refaz item a item. Retorna se o lote passou inteiro"""
+        try:
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+            logger.warning(f"⚠️ Conflito ao gravar lote de {len(batch)} usuários; gravando item a item")
+
+        for index, values in batch:
+            try:
+                result = write_one(values)
+                db.session.commit()
+            except IntegrityError as e:
+                db.session.rollback()
+                result = {'status': 'conflict', 'error': f'Violação de integridade: {e.orig}'}
+            results[index] = {'index': index, **result}
+        return False
+
+    @staticmethod
+    def _create_one(values: Dict[str, Any]) -> Dict[str, Any]:
+        user = User(**values)
+        db.session.add(user)
+        db.session.flush()
+        return {'status': 'created', 'id': user.id}
+
+    @staticmethod
+    def _update_one(values: Dict[str, Any]) -> Dict[str, Any]:
+        user = db.session.get(User, values['id'])
+        if user is None:
+            return {'status': 'not_found', 'id': values['id']}
+        for field in UNIQUE_FIELDS:
+            if field in values:
+                setattr(user, field, values[field])
+        db.session.flush()
+        return {'status': 'updated', 'id': user.id}
+
+    @staticmethod
+    def _delete_one(values: Dict[str, Any]) -> Dict[str, Any]:
+        deleted = db.session.execute(delete(User).where(User.id == values['id'])).rowcount
+        return {'status': 'deleted' if deleted else 'not_found', 'id': values['id']}
+
+
+user_store = UserStore()
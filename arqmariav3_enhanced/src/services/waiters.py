@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+
+class ThreadWaiter:
+    """Lugar numa fila de espera ocupado por uma thread; `wake` entrega a vaga"""
+
+    def __init__(self):
+        self.admitted = False
+        self._event = threading.Event()
+
+    def wake(self) -> bool:
+        self.admitted = True
+        self._event.set()
+        return True
+
+    def wait(self, timeout: float) -> None:
+        self._event.wait(timeout)
+
+
+class AsyncWaiter:
+    """Lugar numa fila de espera ocupado por uma corrotina (pode ser acordada de outra thread)"""
+
+    def __init__(self):
+        self.admitted = False
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.create_future()
+
+    def wake(self) -> bool:
+        if self._future.done():
+            return False
+        self.admitted = True
+        self._loop.call_soon_threadsafe(self._set_result)
+        return True
+
+    def _set_result(self):
+        if not self._future.done():
+            self._future.set_result(True)
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(asyncio.shield(self._future), timeout)
+        except asyncio.TimeoutError:
+            pass
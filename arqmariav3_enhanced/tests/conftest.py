@@ -0,0 +1,18 @@
+import pytest
+from flask import Flask
+from src.models.user import db
+# Registra as tabelas no metadata antes do create_all
+from src.models.search_cache import SearchCacheEntry  # noqa: F401
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Aplicação mínima com SQLite temporário e contexto ativo"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
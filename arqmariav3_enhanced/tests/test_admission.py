@@ -0,0 +1,187 @@
+import time
+import asyncio
+import threading
+import pytest
+from src.services.admission import LIMITED, SATURATED, AdmissionController, AdmissionRejected, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_refills():
+    bucket = TokenBucket(rate=1, burst=2)
+
+    assert bucket.take() == (True, 0.0)
+    assert bucket.take() == (True, 0.0)
+    allowed, wait = bucket.take()
+    assert not allowed
+    assert 0.9 < wait <= 1
+
+    bucket.updated -= 1  # um segundo depois
+    assert bucket.take()[0]
+
+
+def test_token_bucket_never_exceeds_burst():
+    bucket = TokenBucket(rate=1, burst=2)
+    bucket.updated -= 3600
+
+    assert bucket.take(2)[0]
+    assert not bucket.take()[0]
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    monkeypatch.setenv('ADMISSION_ENABLED', 'true')
+    monkeypatch.setenv('ADMISSION_MAX_IN_FLIGHT', '1')
+    monkeypatch.setenv('ADMISSION_QUEUE_SIZE', '1')
+    monkeypatch.setenv('ADMISSION_QUEUE_TIMEOUT', '2')
+    monkeypatch.setenv('RATE_LIMIT_PER_MINUTE', '60')
+    monkeypatch.setenv('RATE_LIMIT_BURST', '2')
+    monkeypatch.setenv('ADMISSION_API_KEYS', 'segredo, outra-chave')
+    return AdmissionController()
+
+
+def test_rate_limit_is_off_by_default(monkeypatch):
+    monkeypatch.delenv('RATE_LIMIT_PER_MINUTE', raising=False)
+    controller = AdmissionController()
+
+    for _ in range(100):
+        controller.check_rate('ip:1.1.1.1')
+    assert controller.stats()['tracked_clients'] == 0
+
+
+def test_rate_limit_is_per_client(controller):
+    controller.check_rate('ip:1.1.1.1')
+    controller.check_rate('ip:1.1.1.1')
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.check_rate('ip:1.1.1.1')
+    assert rejected.value.reason == LIMITED
+    assert rejected.value.retry_after == 1
+    controller.check_rate('ip:2.2.2.2')
+
+
+def test_batch_pays_one_token_per_brief(controller):
+    controller.check_rate('ip:1.1.1.1', cost=2)
+
+    with pytest.raises(AdmissionRejected):
+        controller.check_rate('ip:1.1.1.1')
+
+
+def test_batch_larger_than_burst_is_rejected(controller):
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.check_rate('ip:1.1.1.1', cost=3)
+
+    assert rejected.value.reason == LIMITED
+    assert 'máximo de 2' in str(rejected.value)
+    # Nada foi cobrado: um lote dentro do máximo ainda passa
+    controller.check_rate('ip:1.1.1.1', cost=2)
+
+
+def test_client_id_hashes_known_api_key(controller):
+    client = controller.client_id('segredo', None, '1.1.1.1')
+
+    assert client.startswith('key:')
+    assert 'segredo' not in client
+    assert client == controller.client_id('segredo', '9.9.9.9', '2.2.2.2')
+    assert client != controller.client_id('outra-chave', None, '1.1.1.1')
+
+
+def test_unknown_api_key_falls_back_to_ip(controller):
+    assert controller.client_id('inventada', None, '1.1.1.1') == 'ip:1.1.1.1'
+    assert controller.client_id('segredo-nao', None, '1.1.1.1') == 'ip:1.1.1.1'
+
+
+def test_rotating_api_key_does_not_reset_the_limit(controller):
+    for index in range(2):
+        controller.check_rate(controller.client_id(f'aleatoria-{index}', None, '1.1.1.1'))
+
+    with pytest.raises(AdmissionRejected):
+        controller.check_rate(controller.client_id('aleatoria-2', None, '1.1.1.1'))
+    assert controller.stats()['tracked_clients'] == 1
+
+
+@pytest.mark.parametrize('trusted, forwarded_for, expected', [
+    (0, '6.6.6.6', 'ip:10.0.0.1'),
+    (1, '6.6.6.6, 203.0.113.7', 'ip:203.0.113.7'),
+    (2, '6.6.6.6, 203.0.113.7, 10.0.0.2', 'ip:203.0.113.7'),
+    (2, '203.0.113.7', 'ip:203.0.113.7'),
+    (1, None, 'ip:10.0.0.1'),
+])
+def test_client_id_trusts_only_the_configured_proxy_hops(monkeypatch, trusted, forwarded_for, expected):
+    monkeypatch.setenv('ADMISSION_TRUSTED_PROXIES', str(trusted))
+
+    assert AdmissionController().client_id(None, forwarded_for, '10.0.0.1') == expected
+
+
+def test_queued_request_gets_the_released_slot(controller):
+    first = controller.acquire('a')
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(controller.acquire('b')))
+    waiter.start()
+    while controller.stats()['waiting'] == 0:
+        time.sleep(0.01)
+
+    first.release()
+    first.release()  # liberar de novo não devolve outra vaga
+    waiter.join(2)
+
+    assert len(admitted) == 1
+    assert controller.stats()['in_flight'] == 1
+    admitted[0].release()
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_full_queue_is_rejected_immediately(controller):
+    first = controller.acquire('a')
+    waiter = threading.Thread(target=lambda: controller.acquire('b').release())
+    waiter.start()
+    while controller.stats()['waiting'] == 0:
+        time.sleep(0.01)
+
+    start = time.monotonic()
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire('c')
+    assert rejected.value.reason == SATURATED
+    assert rejected.value.retry_after >= 1
+    assert time.monotonic() - start < 1
+
+    first.release()
+    waiter.join(2)
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_queue_timeout_rejects_and_leaves_the_queue(controller):
+    controller.queue_timeout = 0.05
+    controller.acquire('a')
+
+    with pytest.raises(AdmissionRejected):
+        controller.acquire('b')
+    assert controller.stats()['waiting'] == 0
+    assert controller.stats()['in_flight'] == 1
+
+
+def test_cancelled_async_waiter_leaves_the_queue(controller):
+    async def scenario():
+        ticket = await controller.aacquire('a')
+        task = asyncio.create_task(controller.aacquire('b'))
+        await asyncio.sleep(0.05)
+        assert controller.stats()['waiting'] == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        ticket.release()
+
+    asyncio.run(scenario())
+
+    assert controller.stats()['waiting'] == 0
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_disabled_admits_everything(monkeypatch):
+    monkeypatch.setenv('ADMISSION_ENABLED', 'false')
+    monkeypatch.setenv('ADMISSION_MAX_IN_FLIGHT', '1')
+    controller = AdmissionController()
+
+    tickets = [controller.acquire('a') for _ in range(5)]
+
+    assert controller.stats()['in_flight'] == 0
+    for ticket in tickets:
+        ticket.release()
@@ -0,0 +1,90 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.services.analysis_cache import (BYPASS, DISABLED, HIT, MISS, SHARED, AnalysisCache, make_analysis_key)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setenv('ANALYSIS_CACHE_ENABLED', 'true')
+    monkeypatch.setenv('ANALYSIS_CACHE_WAIT_TIMEOUT', '5')
+    return AnalysisCache()
+
+
+def test_key_ignores_trailing_whitespace_but_not_model():
+    prompt = 'Analise o mercado\nde cafés especiais'
+    assert make_analysis_key(prompt, 'gpt') == make_analysis_key(f'  {prompt}  \n', 'gpt')
+    assert make_analysis_key(prompt + '   ', 'gpt') == make_analysis_key(prompt, 'gpt')
+    assert make_analysis_key(prompt, 'gpt') != make_analysis_key(prompt, 'gemini')
+
+
+def test_second_call_is_a_hit(cache):
+    assert cache.get_or_compute('k', lambda: 'análise') == ('análise', MISS)
+    assert cache.get_or_compute('k', lambda: pytest.fail('não deveria gerar')) == ('análise', HIT)
+
+
+def test_empty_result_is_not_cached(cache):
+    cache.get_or_compute('k', lambda: None)
+
+    assert cache.get_or_compute('k', lambda: 'análise') == ('análise', MISS)
+
+
+def test_bypass_regenerates_and_refreshes(cache):
+    cache.get_or_compute('k', lambda: 'antiga')
+
+    assert cache.get_or_compute('k', lambda: 'nova', bypass=True) == ('nova', BYPASS)
+    assert cache.get('k') == 'nova'
+
+
+def test_disabled_always_computes(monkeypatch):
+    monkeypatch.setenv('ANALYSIS_CACHE_ENABLED', 'false')
+    cache = AnalysisCache()
+
+    assert cache.get_or_compute('k', lambda: 'análise') == ('análise', DISABLED)
+    assert cache.get('k') is None
+
+
+def concurrent_calls(cache, compute, callers=5):
+    """Dispara chamadas idênticas enquanto a primeira geração está em andamento"""
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def leader_compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return compute()
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        leader = executor.submit(cache.get_or_compute, 'k', leader_compute)
+        started.wait(5)
+        followers = [executor.submit(cache.get_or_compute, 'k', leader_compute) for _ in range(callers - 1)]
+        deadline = time.monotonic() + 5
+        while cache.shared < callers - 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+    return leader, followers, calls
+
+
+def test_identical_concurrent_calls_share_one_generation(cache):
+    leader, followers, calls = concurrent_calls(cache, lambda: 'análise')
+
+    assert len(calls) == 1
+    assert leader.result() == ('análise', MISS)
+    assert [future.result() for future in followers] == [('análise', SHARED)] * len(followers)
+    assert cache.stats()['in_flight'] == 0
+
+
+def test_leader_error_propagates_to_waiters_and_is_not_cached(cache):
+    def fail():
+        raise RuntimeError('provedor indisponível')
+
+    leader, followers, calls = concurrent_calls(cache, fail)
+
+    assert len(calls) == 1
+    for future in [leader] + followers:
+        with pytest.raises(RuntimeError):
+            future.result()
+    assert cache.get_or_compute('k', lambda: 'análise') == ('análise', MISS)
@@ -0,0 +1,140 @@
+import pytest
+from src.services import circuit_breaker, concurrency_limiter
+from src.services.circuit_breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, get_breaker,
+                                          guarded_call, order_by_health)
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    monkeypatch.setenv('CB_MIN_CALLS', '2')
+    monkeypatch.setenv('CB_ERROR_THRESHOLD', '0.5')
+    monkeypatch.setenv('CB_OPEN_SECONDS', '30')
+    monkeypatch.setenv('CB_HALF_OPEN_CALLS', '1')
+    return CircuitBreaker('serper')
+
+
+def expire_open_period(breaker):
+    breaker.opened_at -= breaker.open_seconds
+
+
+def trip(breaker):
+    breaker.record_failure(0.1)
+    breaker.record_failure(0.1)
+    assert breaker.state == OPEN
+
+
+def test_opens_when_error_rate_reaches_threshold(breaker):
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+    breaker.record_failure(0.1)
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.health_score() == 0.0
+
+
+def test_opens_on_slow_calls(breaker):
+    breaker.record_success(breaker.slow_call_seconds)
+    breaker.record_success(breaker.slow_call_seconds)
+
+    assert breaker.state == OPEN
+
+
+def test_half_open_admits_a_single_probe(breaker):
+    trip(breaker)
+    expire_open_period(breaker)
+
+    assert breaker.ready_for_probe()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    assert not breaker.ready_for_probe()
+
+
+def test_successful_probe_closes_and_resets_window(breaker):
+    trip(breaker)
+    expire_open_period(breaker)
+    breaker.allow()
+
+    breaker.record_success(0.1)
+
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['calls_in_window'] == 1
+    assert breaker.snapshot()['error_rate'] == 0
+
+
+@pytest.mark.parametrize('record', [
+    lambda breaker: breaker.record_failure(0.1),
+    lambda breaker: breaker.record_success(breaker.slow_call_seconds),
+])
+def test_failed_or_slow_probe_reopens(breaker, record):
+    trip(breaker)
+    expire_open_period(breaker)
+    breaker.allow()
+
+    record(breaker)
+
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    assert not breaker.allow()
+
+
+def test_released_probe_can_be_taken_again(breaker):
+    trip(breaker)
+    expire_open_period(breaker)
+    breaker.allow()
+
+    breaker.release_probe()
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Disjuntores e limitadores novos para cada teste"""
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+    monkeypatch.setattr(concurrency_limiter, '_limiters', {})
+    monkeypatch.setenv('CB_MIN_CALLS', '1')
+
+
+class Throttled(Exception):
+    status_code = 429
+    headers = {'Retry-After': '0'}
+
+
+def test_guarded_call_records_failures_and_blocks_when_open(registry, monkeypatch):
+    monkeypatch.setenv('LIMITER_ENABLED', 'false')
+    with pytest.raises(RuntimeError):
+        with guarded_call('serper'):
+            raise RuntimeError('falha')
+
+    assert get_breaker('serper').state == OPEN
+    with pytest.raises(CircuitOpenError):
+        with guarded_call('serper'):
+            pass
+
+
+def test_throttled_probe_is_released_without_reopening(registry):
+    breaker = get_breaker('serper')
+    breaker.record_failure(0.1)
+    expire_open_period(breaker)
+
+    with pytest.raises(Throttled):
+        with guarded_call('serper'):
+            raise Throttled()
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.times_opened == 1
+    assert breaker.ready_for_probe()
+    assert concurrency_limiter.get_limiter('serper').in_flight == 0
+
+
+def test_order_by_health_moves_open_providers_last(registry):
+    get_breaker('serper').record_failure(0.1)
+
+    assert order_by_health(['serper', 'google']) == ['google', 'serper']
+
+    expire_open_period(get_breaker('serper'))
+    assert order_by_health(['serper', 'google']) == ['serper', 'google']
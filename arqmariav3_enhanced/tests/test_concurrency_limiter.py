@@ -0,0 +1,256 @@
+import time
+import asyncio
+import threading
+from email.utils import formatdate
+import pytest
+from src.services.concurrency_limiter import AdaptiveLimiter, ProviderThrottled, parse_retry_after, throttle_info
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setenv('LIMITER_INITIAL_TESTE', '2')
+    monkeypatch.setenv('LIMITER_MAX_TESTE', '4')
+    monkeypatch.setenv('LIMITER_QUEUE_SIZE_TESTE', '1')
+    monkeypatch.setenv('LIMITER_QUEUE_TIMEOUT_TESTE', '2')
+    monkeypatch.setenv('LIMITER_LATENCY_TOLERANCE_TESTE', '2')
+    return AdaptiveLimiter('teste')
+
+
+def test_settings_accept_provider_suffix(limiter):
+    assert (limiter.limit, limiter.max_limit, limiter.queue_size) == (2, 4, 1)
+
+
+@pytest.mark.parametrize('value, expected', [('3', 3), ('0.5', 0.5), ('-1', 0), ('', None), ('amanhã', None)])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert 25 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+
+
+class Response:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class HTTPError(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def test_throttle_info_reads_status_and_retry_after():
+    assert throttle_info(HTTPError(Response(429, {'Retry-After': '7'}))) == (True, 7)
+    assert throttle_info(HTTPError(Response(503, {'Retry-After': '7'}))) == (False, None)
+    assert throttle_info(ValueError('sem resposta')) == (False, None)
+
+
+def wait_for_queue(limiter):
+    deadline = time.monotonic() + 2
+    while limiter.snapshot()['waiting'] == 0:
+        assert time.monotonic() < deadline, 'nenhuma chamada entrou na fila'
+        time.sleep(0.01)
+
+
+def saturate(limiter):
+    """Ocupa todas as vagas e devolve quantas foram"""
+    slots = limiter._capacity()
+    for _ in range(slots):
+        limiter.acquire()
+    return slots
+
+
+def test_additive_increase_only_when_saturated(limiter):
+    limiter.acquire()
+    limiter.release(latency=0.1)
+    assert limiter.limit == 2
+
+    saturate(limiter)
+    limiter.release(latency=0.1)
+    # A segunda chamada terminou com uma vaga livre: o limite não estava em uso
+    limiter.release(latency=0.1)
+
+    assert limiter.limit == pytest.approx(2 + 1 / 2)
+
+
+def test_limit_never_exceeds_maximum(limiter):
+    for _ in range(100):
+        for _ in range(saturate(limiter)):
+            limiter.release(latency=0.1)
+
+    assert limiter.limit == limiter.max_limit
+
+
+def test_throttle_halves_limit_once_per_interval(limiter):
+    limiter.limit = 4.0
+    saturate(limiter)
+
+    for _ in range(4):
+        limiter.release(throttled=True, retry_after=0)
+
+    assert limiter.limit == 2
+    assert limiter.throttled == 4
+
+
+def test_limit_never_drops_below_one(limiter):
+    for _ in range(5):
+        limiter.acquire()
+        limiter.last_decrease -= 60
+        limiter.release(throttled=True, retry_after=0)
+
+    assert limiter.limit == 1
+
+
+def test_latency_above_tolerance_decreases_limit(limiter):
+    limiter.acquire()
+    limiter.release(latency=0.1)
+
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(latency=5)
+
+    assert limiter.limit == pytest.approx(2 * 0.9)
+
+
+def test_queued_call_gets_released_slot(limiter):
+    saturate(limiter)
+    admitted = threading.Event()
+    waiter = threading.Thread(target=lambda: (limiter.acquire(), admitted.set()))
+    waiter.start()
+    wait_for_queue(limiter)
+
+    limiter.release(latency=0.1)
+    waiter.join(2)
+
+    assert admitted.is_set()
+    assert limiter.in_flight == 2
+
+
+def test_full_queue_raises(limiter):
+    saturate(limiter)
+    waiter = threading.Thread(target=limiter.acquire)
+    waiter.start()
+    wait_for_queue(limiter)
+
+    with pytest.raises(ProviderThrottled):
+        limiter.acquire()
+
+    limiter.release()
+    waiter.join(2)
+
+
+def test_retry_after_pauses_new_calls(limiter):
+    limiter.acquire()
+    limiter.release(throttled=True, retry_after=0.3)
+
+    start = time.monotonic()
+    limiter.acquire()
+
+    assert time.monotonic() - start >= 0.25
+    assert limiter.in_flight == 1
+
+
+def test_pause_longer_than_queue_timeout_fails_fast(limiter):
+    limiter.acquire()
+    limiter.release(throttled=True, retry_after=60)
+
+    start = time.monotonic()
+    with pytest.raises(ProviderThrottled) as throttled:
+        limiter.acquire()
+
+    assert time.monotonic() - start < 1
+    assert throttled.value.retry_after > 50
+
+
+def test_queue_timeout_raises_and_leaves_the_queue(limiter):
+    limiter.queue_timeout = 0.05
+    saturate(limiter)
+
+    with pytest.raises(ProviderThrottled):
+        limiter.acquire()
+    assert limiter.snapshot()['waiting'] == 0
+
+
+def test_cancelled_async_waiter_leaves_the_queue(limiter):
+    async def scenario():
+        saturate(limiter)
+        task = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0.05)
+        assert limiter.snapshot()['waiting'] == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+    assert limiter.snapshot()['waiting'] == 0
+    assert limiter.in_flight == 2
+
+
+class FakeStreamer:
+    """Provedor de streaming mínimo: dois trechos, entregues quando o consumidor pede"""
+    streaming = True
+    model = 'teste'
+
+    def __init__(self):
+        self.calls = 0
+
+    def stream(self, prompt, max_tokens=4000):
+        self.calls += 1
+        yield '{"avatar_ultra_detalhado": '
+        yield '{}}'
+
+
+@pytest.fixture
+def streaming(monkeypatch):
+    from src.services import ai_service, circuit_breaker, concurrency_limiter
+
+    monkeypatch.setattr(concurrency_limiter, '_limiters', {})
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+    monkeypatch.setenv('LIMITER_ENABLED', 'true')
+    monkeypatch.setenv('LIMITER_INITIAL_TESTE', '1')
+    monkeypatch.setenv('LIMITER_MAX_TESTE', '1')
+    provider = FakeStreamer()
+    monkeypatch.setattr(ai_service.registry, 'providers', lambda kind, owner=None: {'teste': provider})
+
+    def start():
+        return ai_service.AIService().stream_market_analysis(
+            {'segmento': 'cafés', 'produto': 'assinatura'}, bypass_cache=True)
+
+    return start, provider, concurrency_limiter.get_limiter('teste')
+
+
+def test_second_stream_waits_while_the_first_is_yielding(streaming):
+    start, provider, limiter = streaming
+    first = start()
+    assert next(first) == ('provider', 'teste')
+    next(first)
+
+    second_events = []
+    second = threading.Thread(target=lambda: second_events.extend(start()))
+    second.start()
+    wait_for_queue(limiter)
+
+    assert provider.calls == 1
+    assert limiter.in_flight == 1
+
+    list(first)
+    second.join(2)
+
+    assert provider.calls == 2
+    assert second_events[0] == ('provider', 'teste')
+    assert limiter.in_flight == 0
+
+
+def test_closing_a_stream_early_releases_the_slot(streaming):
+    start, provider, limiter = streaming
+    stream = start()
+    next(stream)
+    assert limiter.in_flight == 1
+
+    stream.close()
+
+    assert limiter.in_flight == 0
+    # Fechamento pelo cliente não diz nada sobre a latência do provedor
+    assert limiter.snapshot()['recent_latency_seconds'] is None
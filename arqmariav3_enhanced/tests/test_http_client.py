@@ -0,0 +1,82 @@
+import asyncio
+import httpx
+import pytest
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+from urllib3.response import HTTPResponse
+from src.services import async_http
+from src.services.http_client import _build_retry
+
+
+def test_retry_repeats_transient_errors_of_idempotent_requests_only():
+    retry = _build_retry()
+
+    assert retry.is_retry('GET', 503)
+    assert not retry.is_retry('POST', 503)
+    # 429 fica com o limitador de concorrência
+    assert not retry.is_retry('GET', 429)
+
+
+def test_retry_never_repeats_read_timeouts():
+    error = ReadTimeoutError(None, '/busca', 'Read timed out.')
+
+    with pytest.raises(MaxRetryError):
+        _build_retry().increment(method='GET', url='/busca', error=error)
+
+
+def test_retry_after_is_capped(monkeypatch):
+    monkeypatch.setenv('HTTP_RETRY_MAX_DELAY', '2')
+    response = HTTPResponse(body=b'', status=503, headers={'Retry-After': '600'})
+
+    assert _build_retry().get_retry_after(response) == 2
+
+
+def serve(monkeypatch, handler):
+    """Aponta o cliente assíncrono para um transporte em memória que responde com `handler`"""
+    calls = []
+
+    def handle(request):
+        calls.append(request.method)
+        return handler(request, len(calls))
+
+    monkeypatch.setattr(async_http, 'get_async_client',
+                        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+    monkeypatch.setenv('HTTP_MAX_RETRIES', '2')
+    monkeypatch.setenv('HTTP_RETRY_BACKOFF', '0')
+    return calls
+
+
+def test_async_get_is_retried_until_success(monkeypatch):
+    calls = serve(monkeypatch, lambda request, n: httpx.Response(503 if n < 3 else 200))
+
+    response = asyncio.run(async_http.request('GET', 'https://provedor.test/'))
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+
+
+def test_async_post_is_not_retried(monkeypatch):
+    calls = serve(monkeypatch, lambda request, n: httpx.Response(503))
+
+    response = asyncio.run(async_http.request('POST', 'https://provedor.test/', json={}))
+
+    assert response.status_code == 503
+    assert calls == ['POST']
+
+
+def test_async_long_retry_after_returns_without_waiting(monkeypatch):
+    calls = serve(monkeypatch, lambda request, n: httpx.Response(503, headers={'Retry-After': '600'}))
+
+    response = asyncio.run(asyncio.wait_for(async_http.request('GET', 'https://provedor.test/'), timeout=5))
+
+    assert response.status_code == 503
+    assert len(calls) == 1
+
+
+def test_async_retry_wait_must_fit_in_the_deadline(monkeypatch):
+    monkeypatch.setenv('HTTP_RETRY_MAX_DELAY', '5')
+    calls = serve(monkeypatch, lambda request, n: httpx.Response(503, headers={'Retry-After': '2'}))
+
+    response = asyncio.run(async_http.request('GET', 'https://provedor.test/', timeout=1))
+
+    assert response.status_code == 503
+    assert len(calls) == 1
@@ -0,0 +1,84 @@
+import json
+import pytest
+from src.services.json_extractor import (EXPECTED_SECTIONS, METHOD_DIRECT, METHOD_EXTRACTED, METHOD_FAILED,
+                                         METHOD_FENCED, METHOD_REPAIRED, IncrementalJSONParser, JSONScanner,
+                                         extract_json)
+
+ANALYSIS = {
+    'avatar_ultra_detalhado': {'nome': 'Ana', 'dores': ['tempo', 'preço "justo"'], 'idade': 34},
+    'escopo_posicionamento': {'nicho': 'cafés {especiais}', 'ativo': True, 'nota': None},
+}
+TEXT = json.dumps(ANALYSIS, ensure_ascii=False, indent=2)
+
+
+def test_direct_json():
+    result = extract_json(TEXT)
+
+    assert result.method == METHOD_DIRECT
+    assert result.data == ANALYSIS
+    assert result.sections_found == ['avatar_ultra_detalhado', 'escopo_posicionamento']
+    assert len(result.sections_missing) == len(EXPECTED_SECTIONS) - 2
+
+
+@pytest.mark.parametrize('fence', ['```json', '```JSON', '```'])
+def test_markdown_fences(fence):
+    result = extract_json(f'Segue a análise:\n{fence}\n{TEXT}\n```\nBom trabalho!')
+
+    assert result.method == METHOD_FENCED
+    assert result.data == ANALYSIS
+
+
+def test_object_cut_out_of_prose():
+    result = extract_json(f'Claro! Aqui está {{a análise}} pedida: {TEXT} Espero ter ajudado.')
+
+    assert result.method == METHOD_EXTRACTED
+    assert result.data == ANALYSIS
+
+
+def test_truncated_response_is_closed_at_last_complete_value():
+    cut = TEXT.index('"ativo"')
+
+    result = extract_json(TEXT[:cut])
+
+    assert result.method == METHOD_REPAIRED
+    assert result.repaired
+    assert result.data['avatar_ultra_detalhado'] == ANALYSIS['avatar_ultra_detalhado']
+    assert result.data['escopo_posicionamento'] == {'nicho': 'cafés {especiais}'}
+
+
+def test_truncated_inside_a_string_drops_the_partial_value():
+    cut = TEXT.index('justo')
+
+    result = extract_json(TEXT[:cut])
+
+    assert result.method == METHOD_REPAIRED
+    assert result.data == {'avatar_ultra_detalhado': {'nome': 'Ana', 'dores': ['tempo']}}
+
+
+@pytest.mark.parametrize('text', ['', '   ', 'sem json aqui', '[1, 2, 3]'])
+def test_failure_without_an_object(text):
+    result = extract_json(text)
+
+    assert result.method == METHOD_FAILED
+    assert result.data is None
+    assert result.error
+
+
+def test_scanner_handles_chunks_split_anywhere():
+    scanner = JSONScanner()
+    completed = []
+    for index in range(0, len(TEXT), 3):
+        completed += scanner.feed(TEXT[index:index + 3])
+
+    assert scanner.done
+    assert json.loads(scanner.complete_text()) == ANALYSIS
+    assert completed == ['avatar_ultra_detalhado', 'escopo_posicionamento']
+
+
+def test_incremental_parser_reports_sections_as_they_finish():
+    parser = IncrementalJSONParser()
+    first_section_end = TEXT.index('"escopo_posicionamento"')
+
+    assert parser.feed('```json\n' + TEXT[:first_section_end]) == ['avatar_ultra_detalhado']
+    assert parser.feed(TEXT[first_section_end:] + '\n```') == ['escopo_posicionamento']
+    assert parser.result().data == ANALYSIS
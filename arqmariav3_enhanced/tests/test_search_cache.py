@@ -0,0 +1,105 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from src.models.search_cache import SearchCacheEntry
+from src.models.user import db
+from src.services.cache import LRUCache
+from src.services.search_cache import SearchCache, make_cache_key
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'a' passa a ser o mais recente
+
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_lru_entries_expire():
+    cache = LRUCache()
+    cache.set('a', 1, ttl=60)
+    cache.set('b', 2, expires_at=time.time() - 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert len(cache) == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_cache_key_ignores_case_and_spacing():
+    assert make_cache_key('  Mercado  DIGITAL ', 'serper', 'pt-BR', 5) == \
+        make_cache_key('mercado digital', 'serper', 'pt-BR', 5)
+    assert make_cache_key('mercado digital', 'serper', 'pt-BR', 5) != \
+        make_cache_key('mercado digital', 'google', 'pt-BR', 5)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setenv('SEARCH_CACHE_ENABLED', 'true')
+    monkeypatch.setenv('SEARCH_CACHE_DISK_MAX_ENTRIES', '2')
+    return SearchCache()
+
+
+def results(query):
+    return [{'title': query, 'url': f'https://exemplo.com/{query}', 'snippet': ''}]
+
+
+def test_lookup_prefers_providers_in_order(cache):
+    cache.store([
+        ('mercado', 'google', 'pt-BR', 5, results('google'), 60),
+        ('mercado', 'serper', 'pt-BR', 5, results('serper'), 60),
+    ])
+
+    found = cache.lookup(['mercado', 'outra'], ['serper', 'google'], 'pt-BR', 5)
+
+    assert found == {'mercado': results('serper')}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_disk_hit_is_promoted_to_memory(app, cache):
+    cache.store([('mercado', 'serper', 'pt-BR', 5, results('mercado'), 60)])
+    cache.memory.clear()
+
+    assert cache.lookup(['mercado'], ['serper'], 'pt-BR', 5) == {'mercado': results('mercado')}
+    assert cache.disk_hits == 1
+    assert cache.memory.get(make_cache_key('mercado', 'serper', 'pt-BR', 5)) == results('mercado')
+
+
+def test_expired_disk_entry_is_a_miss(app, cache):
+    cache.store([('mercado', 'serper', 'pt-BR', 5, results('mercado'), 60)])
+    cache.memory.clear()
+    SearchCacheEntry.query.update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+
+    assert cache.lookup(['mercado'], ['serper'], 'pt-BR', 5) == {}
+    assert SearchCacheEntry.query.count() == 0
+
+
+def test_disk_evicts_least_recently_accessed_above_limit(app, cache):
+    cache.store([('q1', 'serper', 'pt-BR', 5, results('q1'), 60)])
+    cache.store([('q2', 'serper', 'pt-BR', 5, results('q2'), 60)])
+    # q1 acessada depois de q2: q2 passa a ser a menos recente
+    SearchCacheEntry.query.filter_by(query_text='q1').update(
+        {'last_accessed': datetime.utcnow() + timedelta(seconds=10)})
+    db.session.commit()
+
+    cache.store([('q3', 'serper', 'pt-BR', 5, results('q3'), 60)])
+
+    remaining = {entry.query_text for entry in SearchCacheEntry.query}
+    assert remaining == {'q1', 'q3'}
+    assert cache.disk_evictions == 1
+
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    monkeypatch.setenv('SEARCH_CACHE_ENABLED', 'false')
+    cache = SearchCache()
+    cache.store([('mercado', 'serper', 'pt-BR', 5, results('mercado'), 60)])
+
+    assert cache.lookup(['mercado'], ['serper'], 'pt-BR', 5) == {}
+    assert len(cache.memory) == 0
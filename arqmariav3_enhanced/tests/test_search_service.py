@@ -0,0 +1,79 @@
+import time
+import threading
+import pytest
+from src.services.search_cache import search_cache
+from src.services.search_service import SearchService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(search_cache, 'enabled', False)
+    service = SearchService()
+    service.enrich_enabled = False
+    return service
+
+
+def fake_search(delays, calls=None):
+    """search_query falso: cada query demora o tempo indicado e devolve um resultado com o próprio nome"""
+    def search_query(query, num_results=5, timeout=None, stop_event=None):
+        if calls is not None:
+            calls.append(query)
+        time.sleep(delays.get(query, 0))
+        return [{'title': query, 'url': f'https://exemplo.com/{query}', 'snippet': '', 'source': 'serper'}]
+    return search_query
+
+
+def test_parallel_results_keep_query_order(service, monkeypatch):
+    # A primeira query termina por último; a ordem do contexto não pode mudar
+    monkeypatch.setattr(service, 'search_query', fake_search({'q0': 0.2, 'q1': 0.1, 'q2': 0}))
+
+    results = service.collect_results(['q0', 'q1', 'q2'], parallel=True)
+
+    assert [result['title'] for result in results] == ['q0', 'q1', 'q2']
+
+
+def test_parallel_fan_out_runs_queries_concurrently(service, monkeypatch):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def search_query(query, num_results=5, timeout=None, stop_event=None):
+        with lock:
+            active.append(query)
+            peak.append(len(active))
+        time.sleep(0.1)
+        with lock:
+            active.remove(query)
+        return [{'title': query, 'url': '', 'snippet': '', 'source': 'serper'}]
+
+    monkeypatch.setattr(service, 'search_query', search_query)
+    service.max_workers = 4
+
+    service.collect_results([f'q{i}' for i in range(4)], parallel=True)
+
+    assert max(peak) == 4
+
+
+def test_sequential_stops_once_enough_results(service, monkeypatch):
+    calls = []
+    monkeypatch.setattr(service, 'search_query', fake_search({}, calls))
+
+    results = service.collect_results(['q0', 'q1', 'q2', 'q3'], parallel=False, max_total_results=2)
+
+    assert [result['title'] for result in results] == ['q0', 'q1']
+    assert calls == ['q0', 'q1']
+
+
+def test_failed_query_does_not_drop_the_others(service, monkeypatch):
+    search = fake_search({})
+
+    def search_query(query, *args, **kwargs):
+        if query == 'q1':
+            raise RuntimeError('falha do provedor')
+        return search(query, *args, **kwargs)
+
+    monkeypatch.setattr(service, 'search_query', search_query)
+
+    results = service.collect_results(['q0', 'q1', 'q2'], parallel=True)
+
+    assert [result['title'] for result in results] == ['q0', 'q2']
@@ -0,0 +1,160 @@
+import pytest
+from src.models.user import User, db
+from src.routes.user import user_bp
+from src.services.user_store import BulkTooLarge, InvalidUserRequest, UserStore
+
+
+@pytest.fixture
+def store(app, monkeypatch):
+    monkeypatch.setenv('USER_BULK_BATCH_SIZE', '3')
+    monkeypatch.setenv('USER_BULK_MAX_ITEMS', '10')
+    return UserStore()
+
+
+def create(count):
+    db.session.add_all([User(username=f'u{i}', email=f'u{i}@x.com') for i in range(count)])
+    db.session.commit()
+
+
+def statuses(result):
+    return [item['status'] for item in result['results']]
+
+
+def emails():
+    return {user.id: user.email for user in User.query}
+
+
+def test_keyset_pagination_walks_every_row_once(store):
+    create(7)
+    seen = []
+    after = None
+    while True:
+        page = store.list(limit=3, after=after)
+        seen += [item['id'] for item in page['items']]
+        after = page['next_cursor']
+        if after is None:
+            break
+
+    assert seen == list(range(1, 8))
+
+
+def test_last_full_page_has_no_cursor(store):
+    create(3)
+
+    assert store.list(limit=3)['next_cursor'] is None
+
+
+def test_fields_select_columns(store):
+    create(1)
+
+    assert store.list(fields='username')['items'] == [{'username': 'u0'}]
+    with pytest.raises(InvalidUserRequest):
+        store.list(fields='username,senha')
+    with pytest.raises(InvalidUserRequest):
+        store.list(limit=0)
+
+
+def test_bulk_create_reports_per_item(store):
+    create(1)
+
+    result = store.bulk_create([
+        {'username': 'novo', 'email': 'novo@x.com'},
+        {'username': 'u0', 'email': 'outro@x.com'},
+        {'username': 'dup', 'email': 'novo@x.com'},
+        {'username': 'sem email'},
+        'texto',
+    ])
+
+    assert statuses(result) == ['created', 'conflict', 'conflict', 'invalid', 'invalid']
+    assert result['results'][1]['field'] == 'username'
+    assert result['results'][2]['error'].startswith('email repetido no lote')
+    assert User.query.count() == 2
+
+
+def test_bulk_create_spans_batches(store):
+    result = store.bulk_create([{'username': f'n{i}', 'email': f'n{i}@x.com'} for i in range(7)])
+
+    assert result['summary'] == {'created': 7}
+    assert [item['id'] for item in result['results']] == list(range(1, 8))
+
+
+def test_bulk_size_limit(store):
+    with pytest.raises(BulkTooLarge):
+        store.bulk_create([{}] * 11)
+
+
+def test_bulk_update_swaps_emails_within_a_batch(store):
+    create(2)
+
+    result = store.bulk_update([{'id': 1, 'email': 'u1@x.com'}, {'id': 2, 'email': 'u0@x.com'}])
+
+    assert statuses(result) == ['updated', 'updated']
+    db.session.expire_all()
+    assert emails() == {1: 'u1@x.com', 2: 'u0@x.com'}
+
+
+def test_bulk_update_takes_value_freed_later_in_the_batch(store):
+    create(2)
+
+    result = store.bulk_update([{'id': 1, 'username': 'u1'}, {'id': 2, 'username': 'livre'}])
+
+    assert statuses(result) == ['updated', 'updated']
+    db.session.expire_all()
+    assert {user.id: user.username for user in User.query} == {1: 'u1', 2: 'livre'}
+
+
+def test_bulk_update_value_not_freed_when_its_owner_conflicts(store):
+    create(3)
+
+    # u1 não libera o email (conflito com u2), então u0 também não pode assumi-lo
+    result = store.bulk_update([{'id': 1, 'email': 'u1@x.com'}, {'id': 2, 'email': 'u2@x.com'}])
+
+    assert statuses(result) == ['conflict', 'conflict']
+    db.session.expire_all()
+    assert emails() == {1: 'u0@x.com', 2: 'u1@x.com', 3: 'u2@x.com'}
+
+
+def test_bulk_update_validation_and_missing_ids(store):
+    create(1)
+
+    result = store.bulk_update([
+        {'id': 1, 'username': 'renomeado'},
+        {'id': 99, 'username': 'fantasma'},
+        {'id': 1, 'username': 'de novo'},
+        {'id': True, 'username': 'bool'},
+        {'id': 2},
+    ])
+
+    assert statuses(result) == ['updated', 'not_found', 'invalid', 'invalid', 'invalid']
+
+
+def test_bulk_delete(store):
+    create(2)
+
+    result = store.bulk_delete([1, 1, 5, 'x', 2])
+
+    assert statuses(result) == ['deleted', 'invalid', 'not_found', 'invalid', 'deleted']
+    assert User.query.count() == 0
+
+
+@pytest.fixture
+def client(app):
+    app.register_blueprint(user_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def test_list_route_keeps_bare_list_without_pagination_params(client):
+    create(2)
+
+    assert client.get('/api/users').json == [
+        {'id': 1, 'username': 'u0', 'email': 'u0@x.com'},
+        {'id': 2, 'username': 'u1', 'email': 'u1@x.com'},
+    ]
+
+
+def test_list_route_paginates_with_params(client):
+    create(2)
+
+    page = client.get('/api/users?limit=1&fields=id').json
+    assert page == {'items': [{'id': 1}], 'limit': 1, 'next_cursor': 1}
+    assert client.get('/api/users?fields=senha').status_code == 400
@@ -0,0 +1,113 @@
+"""Microbenchmark da montagem do prompt de análise: antes e depois do template pré-compilado
+
+Uso: python bench_analysis_prompt.py [--iterations N] [--json saida.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'arqmariav3_enhanced'))
+
+import analysis_prompt  # noqa: E402
+from analysis_prompt import ANALYSIS_STRUCTURE, build_comprehensive_analysis_prompt  # noqa: E402
+from src.services.context_builder import build_context, estimate_tokens, token_budget_for_model  # noqa: E402
+
+TOKEN_BUDGET = token_budget_for_model('gpt-4-turbo-preview')
+
+SAMPLE_DATA = {
+    "segmento": "Educação Online - Habilidades Futuro do Trabalho",
+    "produto": "Plataforma de Desenvolvimento de Carreira",
+    "publico": "Profissionais 28-45 anos, classe média-alta",
+    "preco": "197.00",
+    "objetivo_receita": "197000.00",
+    "orcamento_marketing": "50000.00",
+    "prazo_lancamento": "3 meses",
+    "concorrentes": "Coursera, Udemy, Alura",
+    "dados_adicionais": "Foco em IA, blockchain, cibersegurança. Medo de obsolescência."
+}
+
+SAMPLE_CONTEXT = "\n".join(
+    f"--- FONTE {i}: Fonte de pesquisa {i} ---\nURL: https://example.com/{i}\n"
+    f"Conteúdo: Dados de mercado sobre educação online e carreira, item {i}. " * 3
+    for i in range(1, 16)
+)
+
+# O caminho antigo montava o dict literal a cada chamada; compilar o literal reproduz esse custo
+_LEGACY_LITERAL = compile(repr(ANALYSIS_STRUCTURE), '<analysis_structure>', 'eval')
+
+
+def legacy_render(values):
+    """Montagem como era antes: dict recriado e json.dumps(indent=2) a cada chamada"""
+    analysis_structure = eval(_LEGACY_LITERAL)
+    schema = json.dumps(analysis_structure, indent=2, ensure_ascii=False)
+    return analysis_prompt.PromptTemplate(analysis_prompt.PROMPT_TEXT.replace('{{schema}}', schema)).render(values)
+
+
+def legacy_prompt(data, search_context):
+    context_pack = build_context(search_context, data, TOKEN_BUDGET)
+    values = {field: data.get(field, "Não informado") for field in analysis_prompt.INPUT_FIELDS}
+    values['contexto_pesquisa'] = context_pack.text
+    values['fontes_consultadas'] = len(search_context.split("---\n"))
+    values['atualizacao'] = datetime.now().strftime("%d/%m/%Y %H:%M")
+    return legacy_render(values)
+
+
+def new_prompt(data, search_context, compact_schema):
+    context_pack = build_context(search_context, data, TOKEN_BUDGET)
+    return build_comprehensive_analysis_prompt(data, context_pack, compact_schema=compact_schema)
+
+
+SLOT_VALUES = {
+    **{field: SAMPLE_DATA[field] for field in analysis_prompt.INPUT_FIELDS},
+    'contexto_pesquisa': SAMPLE_CONTEXT, 'fontes_consultadas': 15, 'atualizacao': '01/01/2024 00:00'
+}
+
+
+def measure(fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = fn()
+    elapsed = time.perf_counter() - start
+    return {
+        'us_per_call': round(elapsed / iterations * 1e6, 1),
+        'chars': len(result),
+        'tokens_estimados': estimate_tokens(result),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--json', help='grava os resultados em JSON')
+    args = parser.parse_args()
+
+    cases = {
+        'template_antes': lambda: legacy_render(SLOT_VALUES),
+        'template_novo': lambda: analysis_prompt.get_prompt_template(False).render(SLOT_VALUES),
+        'template_novo_compacto': lambda: analysis_prompt.get_prompt_template(True).render(SLOT_VALUES),
+        'prompt_antes': lambda: legacy_prompt(SAMPLE_DATA, SAMPLE_CONTEXT),
+        'prompt_template': lambda: new_prompt(SAMPLE_DATA, SAMPLE_CONTEXT, compact_schema=False),
+        'prompt_template_compacto': lambda: new_prompt(SAMPLE_DATA, SAMPLE_CONTEXT, compact_schema=True),
+    }
+
+    results = {}
+    for name, fn in cases.items():
+        # O prompt completo inclui o empacotamento do contexto, que é mais caro
+        iterations = args.iterations if name.startswith('template') else max(1, args.iterations // 20)
+        results[name] = measure(fn, iterations)
+        r = results[name]
+        print(f"{name:<26} {r['us_per_call']:>10.1f} µs/chamada  {r['chars']:>7} chars  ~{r['tokens_estimados']} tokens")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados gravados em {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())